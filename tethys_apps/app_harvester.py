@@ -8,19 +8,260 @@
 ********************************************************************************
 """
 
+import hashlib
+import json
 import os
+import re
 import inspect
+import signal
+import sys
+import threading
+import time
 
-from tethys_apps.base import TethysAppBase
+from django.conf import settings
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from tethys_apps.base import TethysAppBase, PersistentStore
+from tethys_apps.base.url_map import url_map_maker, django_url_format
+from tethys_apps.helpers import get_installed_tethys_apps, get_app_entry_points, get_discovery_backend, \
+    ENTRY_POINTS_DISCOVERY
+from tethys_apps.signals import apps_reharvested
 from terminal_colors import TerminalColors
 
+# Version of the harvest manifest format. Manifests written with another version are ignored.
+HARVEST_MANIFEST_VERSION = 3
+
+# App attributes recorded in the harvest manifest
+APP_ATTRIBUTES = ('name', 'index', 'icon', 'package', 'root_url', 'color')
+
+# Items of the tethysapp directory that are not app packages
+IGNORED_APP_PACKAGES = ('__init__.py', '__init__.pyc', '.gitignore', '.DS_Store', '.tethys_reload')
+
+# Files of the app packages that are not part of the package signature, they are written when the modules are imported
+UNSIGNED_FILE_EXTENSIONS = ('.pyc', '.pyo')
+UNSIGNED_DIRECTORIES = ('__pycache__',)
+
+
+def get_resident_memory():
+    """
+    Returns the resident memory of the process in bytes. Falls back to the peak resident memory where /proc is not
+    available.
+    """
+    try:
+        with open('/proc/self/statm') as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, IndexError, ValueError, AttributeError):
+        pass
+
+    if resource is None:
+        return 0
+
+    # The peak resident memory is reported in kilobytes on Linux and in bytes on OS X
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def get_resource_usage():
+    """
+    Returns a snapshot of the wall time, CPU time and resident memory of the process and the number of modules
+    imported.
+    """
+    times = os.times()
+
+    return {'wall_time': time.time(),
+            'cpu_time': times[0] + times[1],
+            'rss': get_resident_memory(),
+            'modules': len([module for module in sys.modules.values() if module is not None])}
+
+
+def get_resource_usage_delta(start):
+    """
+    Returns the resources used since the snapshot given was taken.
+    """
+    end = get_resource_usage()
+
+    return {'wall_time': end['wall_time'] - start['wall_time'],
+            'cpu_time': end['cpu_time'] - start['cpu_time'],
+            'rss_delta': end['rss'] - start['rss'],
+            'new_modules': end['modules'] - start['modules']}
+
+
+class AppPackageAliasImporter(object):
+    """
+    Import hook that imports the modules of the app packages discovered from entry points under their alias (e.g.:
+    "tethys_apps.tethysapp.my_app.model") as the module of their own name (e.g.: "tethysapp.my_app.model"). Without it
+    the modules imported through the alias would be copies of the modules that the app imports by their own name.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        # Maps alias package names to module names
+        self.aliases = dict()
+
+    def get_module_name(self, fullname):
+        """
+        Returns the module name of the alias given or None if it is not an alias.
+        """
+        alias, _, submodule = fullname.partition('.tethysapp.')
+
+        if alias != 'tethys_apps' or not submodule:
+            return None
+
+        app_package, _, submodule = submodule.partition('.')
+        module_name = self.aliases.get('.'.join(['tethys_apps.tethysapp', app_package]))
+
+        if module_name is None:
+            return None
+
+        return '.'.join([module_name, submodule]) if submodule else module_name
+
+    def find_module(self, fullname, path=None):
+        return self if self.get_module_name(fullname) else None
+
+    def load_module(self, fullname):
+        if fullname not in sys.modules:
+            sys.modules[fullname] = __import__(self.get_module_name(fullname), fromlist=[''])
+
+        return sys.modules[fullname]
+
+
+app_package_alias_importer = AppPackageAliasImporter()
+
+
+def alias_app_packages(app_entry_points):
+    """
+    Register the app packages discovered from entry points as "tethys_apps.tethysapp.<app_package>" modules, which is
+    how url maps and persistent store initializers refer to them. The modules of the app packages are the same module
+    objects under both names.
+
+    Args:
+      app_entry_points(dict): Module name and path of each app package keyed by app package name.
+    """
+    tethysapp = __import__('tethys_apps.tethysapp', fromlist=[''])
+
+    if app_package_alias_importer not in sys.meta_path:
+        sys.meta_path.insert(0, app_package_alias_importer)
+
+    for app_package, (module_name, package_dir) in app_entry_points.items():
+        alias = '.'.join(['tethys_apps.tethysapp', app_package])
+        app_package_alias_importer.aliases[alias] = module_name
+
+        if alias not in sys.modules:
+            sys.modules[alias] = __import__(module_name, fromlist=[''])
+            setattr(tethysapp, app_package, sys.modules[alias])
+
+
+def import_app_module(app_package):
+    """
+    Import the app.py module of the app package given and return the time it took in seconds. Runs in the processes
+    that pre-warm app imports.
+    """
+    start = time.time()
+    __import__('.'.join(['tethys_apps.tethysapp', app_package, 'app']), fromlist=[''])
+    return time.time() - start
+
+
+class LazyTethysApp(object):
+    """
+    Stands in for an app loaded from the harvest manifest. The app metadata, url maps and persistent stores are
+    answered from the manifest. The app module is only imported when any other attribute is used.
+    """
+
+    def __init__(self, spec):
+        """
+        Constructor
+        """
+        self._spec = spec
+        self._app = None
+
+        for attribute, value in spec['attributes'].items():
+            setattr(self, attribute, value)
+
+    def __repr__(self):
+        """
+        String representation
+        """
+        return '<TethysApp: {0}>'.format(self.name)
+
+    def __getattr__(self, name):
+        """
+        Import the app module and instantiate the app when an attribute not in the manifest is used.
+        """
+        if name.startswith('__') or name in ('_spec', '_app'):
+            raise AttributeError(name)
+
+        if self._app is None:
+            module_name, class_name = self._spec['class'].split(':')
+            app_module = __import__(module_name, fromlist=[class_name])
+            self._app = SingletonAppHarvester._validate_app(getattr(app_module, class_name)())
+
+        return getattr(self._app, name)
+
+    def url_maps(self):
+        """
+        Returns the url maps recorded in the manifest.
+        """
+        UrlMap = url_map_maker(self.root_url)
+        url_maps = []
+
+        for url_map_spec in self._spec['url_maps']:
+            url_map = UrlMap.__new__(UrlMap)
+            url_map.__dict__.update(url_map_spec)
+            url_maps.append(url_map)
+
+        return url_maps
+
+    def persistent_stores(self):
+        """
+        Returns the persistent stores recorded in the manifest.
+        """
+        if self._spec['persistent_stores'] is None:
+            return None
+
+        persistent_stores = []
+
+        for persistent_store_spec in self._spec['persistent_stores']:
+            persistent_store = PersistentStore.__new__(PersistentStore)
+            persistent_store.__dict__.update(persistent_store_spec)
+            persistent_stores.append(persistent_store)
+
+        return persistent_stores
+
 
 class SingletonAppHarvester(object):
     """
-    Collects information for initiating apps
+    Collects information for initiating apps. Set TETHYS_APPS_HARVEST_MANIFEST to the path of a JSON file to record
+    the harvested apps and load unchanged apps from it on later harvests without importing their app module.
+
+    Set TETHYS_APPS_HARVEST_WORKERS to pre-warm the app imports in that many forked processes at a time. The main
+    process still imports the app modules one at a time, the processes only write their bytecode and load their files
+    into the file cache of the OS beforehand. Each pre-warm process is killed after TETHYS_APPS_HARVEST_TIMEOUT seconds
+    (60 by default).
+
+    The resources used to import, discover and instantiate each app are recorded in the harvest report (see the
+    harvestreport management command).
+
+    Call reharvest() to replace the apps of the app packages that changed since they were harvested without restarting
+    the process (see TethysAppsReloadMiddleware).
     """
 
     apps = []
+    app_contexts = {}
+    reverse_table = {}
+    version = None
+    import_times = {}
+    harvest_report = []
+    package_apps = {}
+    package_dirs = {}
+    package_signatures = None
+    harvested_at = None
+    _reharvest_lock = threading.Lock()
     _instance = None
 
     def harvest_apps(self):
@@ -29,21 +270,24 @@ class SingletonAppHarvester(object):
         """
         # Notify user harvesting is taking place
         print(TerminalColors.BLUE + 'Loading Tethys Apps...' + TerminalColors.ENDC)
+        self.harvested_at = time.time()
 
-        # List the apps packages in directory
-        apps_dir = os.path.join(os.path.dirname(__file__), 'tethysapp')
-        app_packages_list = os.listdir(apps_dir)
+        # List the apps packages with the discovery backend
+        self.package_dirs = get_installed_tethys_apps()
+
+        if get_discovery_backend() == ENTRY_POINTS_DISCOVERY:
+            alias_app_packages(get_app_entry_points())
 
         # Harvest App Instances
-        self._harvest_app_instances(app_packages_list)
-        
+        self._harvest_app_instances(list(self.package_dirs))
+
     def __new__(self):
         """
         Make App Harvester a Singleton
         """
         if not self._instance:
             self._instance = super(SingletonAppHarvester, self).__new__(self)
-            
+
         return self._instance
 
     @staticmethod
@@ -66,51 +310,535 @@ class SingletonAppHarvester(object):
 
         return app
 
+    @staticmethod
+    def _index_app_contexts(apps):
+        """
+        Returns a dictionary mapping the root url of each app to the app metadata added to the template context.
+        """
+        app_contexts = dict()
+
+        for app in apps:
+            app_contexts[app.root_url] = {'name': app.name,
+                                          'index': app.index,
+                                          'icon': app.icon,
+                                          'color': app.color}
+
+        return app_contexts
+
+    @staticmethod
+    def _get_apps_version(apps):
+        """
+        Returns the SHA-1 hash of the metadata of the apps given, which changes whenever the list of apps shown in the
+        apps library changes.
+        """
+        apps_metadata = [[getattr(app, attribute) for attribute in APP_ATTRIBUTES] for app in apps]
+        return hashlib.sha1(json.dumps(apps_metadata).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _index_app_urls(apps):
+        """
+        Returns a dictionary mapping the "namespace:name" of each url map of the apps given to a format string of its
+        url relative to the apps root, the names of the url variables and their compiled expressions.
+        """
+        reverse_table = dict()
+
+        for app in apps:
+            if hasattr(app, 'url_maps'):
+                url_maps = app.url_maps()
+            elif hasattr(app, 'controllers'):
+                url_maps = app.controllers()
+            else:
+                url_maps = None
+
+            namespace = app.root_url.replace('-', '_')
+            app_root = '{0}/'.format(namespace.replace('_', '-'))
+
+            for url_map in url_maps or ():
+                url_format = django_url_format(url_map.url)
+
+                # Later url maps with the same name win, like they do for the resolver
+                if url_format is None:
+                    reverse_table.pop(':'.join((namespace, url_map.name)), None)
+                    continue
+
+                url_format, variable_names, expressions = url_format
+                reverse_table[':'.join((namespace, url_map.name))] = (
+                    app_root + url_format,
+                    variable_names,
+                    [re.compile(r'^(?:{0})$'.format(expression), re.UNICODE) for expression in expressions]
+                )
+
+        return reverse_table
+
+    @classmethod
+    def _get_app_signature(cls, package_dir):
+        """
+        Returns the SHA-1 hash of the path and contents of the Python modules of the app package directory given or None
+        if it cannot be read. The url maps and persistent stores of the app may depend on any of its modules.
+        """
+        signature = hashlib.sha1()
+
+        try:
+            for module_path, module_stat in cls._walk_package_files(package_dir):
+                if module_path.endswith('.py'):
+                    with open(module_path, 'rb') as module_file:
+                        signature.update(os.path.relpath(module_path, package_dir).encode('utf-8') + b'\0' +
+                                         module_file.read() + b'\0')
+        except (IOError, OSError):
+            return None
+
+        return signature.hexdigest()
+
+    @staticmethod
+    def _walk_package_files(package_dir):
+        """
+        Yields the path and status of each file of the app package directory given that is part of its signature.
+        """
+        for root, dirs, files in os.walk(package_dir, followlinks=True):
+            dirs[:] = sorted(directory for directory in dirs if directory not in UNSIGNED_DIRECTORIES)
+
+            for filename in sorted(files):
+                if not filename.endswith(UNSIGNED_FILE_EXTENSIONS):
+                    file_path = os.path.join(root, filename)
+                    yield file_path, os.stat(file_path)
+
+    @classmethod
+    def _get_package_signature(cls, package_dir):
+        """
+        Returns the SHA-1 hash of the location, size and modification and change times of the files of the app package
+        directory given, including its templates and static files, or None if the app package does not exist.
+        """
+        if not package_dir or not os.path.isdir(package_dir):
+            return None
+
+        # Develop installs link to the package, so a new link target is a new package
+        signature = hashlib.sha1(os.path.realpath(package_dir).encode('utf-8'))
+
+        for file_path, file_stat in cls._walk_package_files(package_dir):
+            # Installs copy the modification time of the files, not their change time
+            signature.update('{0}:{1}:{2}:{3}\n'.format(os.path.relpath(file_path, package_dir),
+                                                        file_stat.st_size,
+                                                        file_stat.st_mtime,
+                                                        file_stat.st_ctime).encode('utf-8'))
+
+        return signature.hexdigest()
+
+    @classmethod
+    def _is_package_changed_since(cls, package_dir, timestamp):
+        """
+        Returns True if the link to the app package directory given or any file of its signature was written after the
+        time given. The times of the directories are not compared, importing the modules writes their bytecode in them.
+        """
+        if os.path.islink(package_dir):
+            package_stat = os.lstat(package_dir)
+
+            if max(package_stat.st_mtime, package_stat.st_ctime) >= timestamp:
+                return True
+
+        return any(max(file_stat.st_mtime, file_stat.st_ctime) >= timestamp
+                   for file_path, file_stat in cls._walk_package_files(package_dir))
+
+    def _get_changed_app_packages(self, package_dirs, package_signatures):
+        """
+        Returns the app packages that were added, changed or removed since they were harvested. The signatures of the
+        app packages are only computed from the first reharvest on. Until then, the app packages with files written
+        after the harvest started are the changed ones.
+        """
+        app_packages = set(package_signatures) | set(self.package_dirs)
+
+        if self.package_signatures is None:
+            return sorted(app_package for app_package in app_packages
+                          if package_signatures.get(app_package) is None
+                          or app_package not in self.package_dirs
+                          or os.path.realpath(package_dirs[app_package]) !=
+                          os.path.realpath(self.package_dirs[app_package])
+                          or self._is_package_changed_since(package_dirs[app_package], self.harvested_at))
+
+        return sorted(app_package for app_package in app_packages
+                      if package_signatures.get(app_package) != self.package_signatures.get(app_package))
+
+    @staticmethod
+    def _get_app_spec(app):
+        """
+        Returns the harvest manifest entry of the app instance given.
+        """
+        if hasattr(app, 'url_maps'):
+            url_maps = app.url_maps()
+        elif hasattr(app, 'controllers'):
+            url_maps = app.controllers()
+        else:
+            url_maps = None
+
+        persistent_stores = app.persistent_stores()
+
+        # Record the public attributes of the url map and persistent store objects
+        def public_attributes(obj):
+            return dict((key, value) for key, value in vars(obj).items() if not key.startswith('_'))
+
+        return {'class': ':'.join((app.__class__.__module__, app.__class__.__name__)),
+                'attributes': dict((attribute, getattr(app, attribute)) for attribute in APP_ATTRIBUTES),
+                'url_maps': [public_attributes(url_map) for url_map in url_maps or ()],
+                'persistent_stores': [public_attributes(persistent_store) for persistent_store in persistent_stores]
+                                     if persistent_stores is not None else None}
+
+    @staticmethod
+    def _load_manifest():
+        """
+        Returns the harvest manifest entries keyed by app package or an empty dictionary.
+        """
+        manifest_path = getattr(settings, 'TETHYS_APPS_HARVEST_MANIFEST', None)
+
+        if not manifest_path or not os.path.isfile(manifest_path):
+            return {}
+
+        try:
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+
+            if manifest.get('version') != HARVEST_MANIFEST_VERSION:
+                return {}
+
+            return manifest['apps']
+
+        except (IOError, ValueError, KeyError):
+            return {}
+
+    @staticmethod
+    def _save_manifest(manifest_apps):
+        """
+        Write the harvest manifest entries given. Failing to write it is reported, not raised.
+        """
+        manifest_path = getattr(settings, 'TETHYS_APPS_HARVEST_MANIFEST', None)
+
+        if not manifest_path:
+            return
+
+        # Write to a temporary file first so that other processes never read a partial manifest
+        temporary_path = '{0}.{1}.tmp'.format(manifest_path, os.getpid())
+
+        # The manifest is only an optimization, the apps are harvested from their modules without it
+        try:
+            with open(temporary_path, 'w') as manifest_file:
+                json.dump({'version': HARVEST_MANIFEST_VERSION, 'apps': manifest_apps}, manifest_file, indent=2)
+
+            os.rename(temporary_path, manifest_path)
+        except (IOError, OSError) as e:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+            print('{0}WARNING:{1} Could not write the harvest manifest "{2}": {3}'.format(
+                TerminalColors.WARNING, TerminalColors.ENDC, manifest_path, e))
+
+    def _harvest_app_package(self, app_package):
+        """
+        Import the app.py module of the app package given. Returns its validated app instances and the resources used
+        to import, discover and instantiate them.
+        """
+        app_instances = []
+        phases = dict()
+
+        # Create the path to the app module in the custom app package
+        app_module_name = '.'.join(['tethys_apps.tethysapp', app_package, 'app'])
+
+        # Import the app.py module from the custom app package programmatically
+        # (e.g.: apps.apps.<custom_package>.app)
+        usage = get_resource_usage()
+        app_module = __import__(app_module_name, fromlist=[''])
+        phases['import'] = get_resource_usage_delta(usage)
+
+        # Retrieve the members of the app_module and iterate through
+        # them to find the the class that inherits from AppBase.
+        usage = get_resource_usage()
+        app_classes = []
+
+        for name, obj in inspect.getmembers(app_module):
+            try:
+                # issubclass() will fail if obj is not a class
+                if (issubclass(obj, TethysAppBase)) and (obj is not TethysAppBase):
+                    # Assign a handle to the class
+                    app_classes.append(getattr(app_module, name))
+
+            except TypeError:
+                '''DO NOTHING'''
+
+        phases['discovery'] = get_resource_usage_delta(usage)
+
+        usage = get_resource_usage()
+
+        for _appClass in app_classes:
+            try:
+                # Instantiate app and validate
+                app_instance = _appClass()
+                validated_app_instance = self._validate_app(app_instance)
+
+                # compile valid apps
+                if validated_app_instance:
+                    app_instances.append(validated_app_instance)
+
+            except TypeError:
+                '''DO NOTHING'''
+
+        phases['instantiation'] = get_resource_usage_delta(usage)
+
+        return app_instances, phases
+
+    @classmethod
+    def _prewarm_app_modules(cls, app_packages):
+        """
+        Import the app modules of the app packages given in forked processes. Returns a dictionary with the time each
+        import took in seconds. Threads would not help: the apps are harvested while models.py is imported, so the
+        import lock is held and the imports would run one at a time anyway.
+        """
+        workers = getattr(settings, 'TETHYS_APPS_HARVEST_WORKERS', 0)
+
+        if not workers or len(app_packages) < 2 or not hasattr(os, 'fork'):
+            return {}
+
+        timeout = getattr(settings, 'TETHYS_APPS_HARVEST_TIMEOUT', 60)
+        import_times = cls._prewarm_in_processes(app_packages, workers, timeout)
+
+        # Report the slowest imports first
+        for app_package in sorted(import_times, key=import_times.get, reverse=True):
+            print('  {0}: {1:.2f}s'.format(app_package, import_times[app_package]))
+
+        return import_times
+
+    @staticmethod
+    def _prewarm_in_processes(app_packages, workers, timeout):
+        """
+        Import the app modules of the app packages given in forked processes. The processes are forked directly rather
+        than with a multiprocessing pool, which cannot start its workers while the import lock is held.
+        """
+        import_times = dict()
+        pending = list(app_packages)
+        running = dict()
+
+        # Output buffered before forking would be written again by each process
+        sys.stdout.flush()
+
+        while pending or running:
+            while pending and len(running) < workers:
+                app_package = pending.pop(0)
+                read_fd, write_fd = os.pipe()
+                pid = os.fork()
+
+                if pid == 0:
+                    os.close(read_fd)
+                    status = 1
+
+                    try:
+                        os.write(write_fd, repr(import_app_module(app_package)))
+                        status = 0
+                    except BaseException as e:
+                        os.write(write_fd, str(e)[:1024])
+                    finally:
+                        os._exit(status)
+
+                os.close(write_fd)
+                running[pid] = (app_package, read_fd, time.time())
+
+            for pid, (app_package, read_fd, start) in running.items():
+                finished_pid, status = os.waitpid(pid, os.WNOHANG)
+
+                if finished_pid:
+                    output = os.read(read_fd, 4096)
+
+                    if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+                        import_times[app_package] = float(output)
+                    else:
+                        # The error is raised again when the app is harvested
+                        print('{0}WARNING:{1} Import of app "{2}" failed: {3}'.format(
+                            TerminalColors.WARNING, TerminalColors.ENDC, app_package, output))
+
+                elif time.time() - start > timeout:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                    print('{0}WARNING:{1} Import of app "{2}" did not finish within {3} seconds.'.format(
+                        TerminalColors.WARNING, TerminalColors.ENDC, app_package, timeout))
+
+                else:
+                    continue
+
+                os.close(read_fd)
+                del running[pid]
+
+            if running:
+                time.sleep(0.01)
+
+        return import_times
+
     def _harvest_app_instances(self, app_packages_list):
         """
         Search each app package for the app.py module. Find the AppBase class in the app.py
-        module and instantiate it. Save the list of instantiated AppBase classes.
+        module and instantiate it. Save the list of instantiated AppBase classes. Apps of packages
+        whose Python modules have not changed since the manifest was written are loaded from the manifest.
         """
         valid_app_instance_list = []
         loaded_apps = []
-        
+        package_apps = dict()
+        use_manifest = bool(getattr(settings, 'TETHYS_APPS_HARVEST_MANIFEST', None))
+        manifest_apps = self._load_manifest() if use_manifest else {}
+        new_manifest_apps = dict()
+        harvest_report = []
+
+        # Collect data from each app package in the apps directory
+        app_packages_list = [app_package for app_package in app_packages_list
+                             if app_package not in IGNORED_APP_PACKAGES]
+        signatures = dict()
+
         for app_package in app_packages_list:
-            # Collect data from each app package in the apps directory
-            if app_package not in ['__init__.py', '__init__.pyc', '.gitignore', '.DS_Store']:
-                # Create the path to the app module in the custom app package
-                app_module_name = '.'.join(['tethys_apps.tethysapp', app_package, 'app'])
-
-                # Import the app.py module from the custom app package programmatically
-                # (e.g.: apps.apps.<custom_package>.app)
-                app_module = __import__(app_module_name, fromlist=[''])
-                
-                for name, obj in inspect.getmembers(app_module):
-                    # Retrieve the members of the app_module and iterate through
-                    # them to find the the class that inherits from AppBase.
-                    try:
-                        # issubclass() will fail if obj is not a class
-                        if (issubclass(obj, TethysAppBase)) and (obj is not TethysAppBase):
-                            # Assign a handle to the class
-                            _appClass = getattr(app_module, name)
+            signatures[app_package] = self._get_app_signature(self.package_dirs[app_package]) if use_manifest else None
 
-                            # Instantiate app and validate
-                            app_instance = _appClass()
-                            validated_app_instance = self._validate_app(app_instance)
+        # Pre-warm the imports of the app modules that cannot be loaded from the manifest
+        self.import_times = self._prewarm_app_modules(
+            [app_package for app_package in app_packages_list
+             if not signatures[app_package]
+             or manifest_apps.get(app_package, {}).get('signature') != signatures[app_package]]
+        )
 
-                            # compile valid apps
-                            if validated_app_instance:
-                                valid_app_instance_list.append(validated_app_instance)
+        for app_package in app_packages_list:
+            signature = signatures[app_package]
+            manifest_entry = manifest_apps.get(app_package)
+
+            if signature and manifest_entry and manifest_entry['signature'] == signature:
+                usage = get_resource_usage()
+                app_instances = [LazyTethysApp(spec) for spec in manifest_entry['apps']]
+                source = 'manifest'
+                phases = {'instantiation': get_resource_usage_delta(usage)}
+            else:
+                app_instances, phases = self._harvest_app_package(app_package)
+                source = 'module'
+
+                if signature:
+                    manifest_entry = {'signature': signature,
+                                      'apps': [self._get_app_spec(app) for app in app_instances]}
+
+            if signature:
+                new_manifest_apps[app_package] = manifest_entry
 
-                                # Notify user that the app has been loaded
-                                loaded_apps.append(app_package)
+            valid_app_instance_list.extend(app_instances)
+            package_apps[app_package] = app_instances
+            harvest_report.append({'package': app_package,
+                                   'source': source,
+                                   'apps': [app.name for app in app_instances],
+                                   'prewarm_time': self.import_times.get(app_package),
+                                   'phases': phases})
 
-                    except TypeError:
-                        '''DO NOTHING'''
-                    except:
-                        raise
+            # Notify user that the app has been loaded
+            loaded_apps.extend([app_package] * len(app_instances))
+
+        # Record the apps harvested if anything changed
+        if use_manifest and new_manifest_apps != manifest_apps:
+            self._save_manifest(new_manifest_apps)
 
         # Save valid apps
         self.apps = valid_app_instance_list
+        self.harvest_report = harvest_report
+        self.package_apps = package_apps
+
+        # Computed on the first reharvest, walking the app packages would slow down the startup of every process
+        self.package_signatures = None
+
+        # Index the template context of each app by root url. The index is replaced, never modified.
+        self.app_contexts = self._index_app_contexts(valid_app_instance_list)
+        self.reverse_table = self._index_app_urls(valid_app_instance_list)
+        self.version = self._get_apps_version(valid_app_instance_list)
 
         # Update user
         print('Tethys Apps Loaded: {0}'.format(' '.join(loaded_apps)))
+
+    def reharvest(self):
+        """
+        Harvest the app packages that were added, changed or removed since the apps were harvested and send the
+        apps_reharvested signal. The apps of the other app packages are kept. The previous apps of an app package that
+        fails to import are kept as well. Returns the names of the app packages that were reharvested.
+        """
+        with self._reharvest_lock:
+            harvested_at = time.time()
+            package_dirs = get_installed_tethys_apps(refresh=True)
+            app_packages_list = [app_package for app_package in package_dirs
+                                 if app_package not in IGNORED_APP_PACKAGES]
+            app_entry_points = get_app_entry_points() if get_discovery_backend() == ENTRY_POINTS_DISCOVERY else {}
+
+            package_signatures = dict((app_package, self._get_package_signature(package_dirs[app_package]))
+                                      for app_package in app_packages_list)
+            changed_app_packages = self._get_changed_app_packages(package_dirs, package_signatures)
+
+            self.harvested_at = harvested_at
+
+            if not changed_app_packages:
+                self.package_signatures = dict((app_package, signature)
+                                               for app_package, signature in package_signatures.items()
+                                               if signature is not None)
+                return []
+
+            print(TerminalColors.BLUE + 'Reloading Tethys Apps: {0}'.format(' '.join(changed_app_packages)) +
+                  TerminalColors.ENDC)
+
+            package_apps = dict(self.package_apps)
+            harvest_report = dict((entry['package'], entry) for entry in self.harvest_report)
+            reharvested_app_packages = []
+
+            for app_package in changed_app_packages:
+                # Forget the modules of the previous version of the app package so that they are imported again
+                package_module_names = ['.'.join(['tethys_apps.tethysapp', app_package])]
+
+                if app_package in app_entry_points:
+                    package_module_names.append(app_entry_points[app_package][0])
+
+                previous_modules = dict((module_name, sys.modules.pop(module_name))
+                                        for module_name in list(sys.modules)
+                                        for package_module_name in package_module_names
+                                        if module_name == package_module_name
+                                        or module_name.startswith(package_module_name + '.'))
+
+                if package_signatures.get(app_package) is None:
+                    package_apps.pop(app_package, None)
+                    harvest_report.pop(app_package, None)
+                    reharvested_app_packages.append(app_package)
+                    continue
+
+                try:
+                    if app_package in app_entry_points:
+                        alias_app_packages({app_package: app_entry_points[app_package]})
+
+                    app_instances, phases = self._harvest_app_package(app_package)
+
+                except Exception as e:
+                    sys.modules.update(previous_modules)
+                    package_signatures[app_package] = (self.package_signatures or {}).get(app_package)
+                    print('{0}ERROR:{1} Could not reload app "{2}", keeping the previous version: {3}'.format(
+                        TerminalColors.FAIL, TerminalColors.ENDC, app_package, e))
+                    continue
+
+                package_apps[app_package] = app_instances
+                harvest_report[app_package] = {'package': app_package,
+                                               'source': 'module',
+                                               'apps': [app.name for app in app_instances],
+                                               'prewarm_time': None,
+                                               'phases': phases}
+                reharvested_app_packages.append(app_package)
+
+            # Keep the directory order of the harvest
+            apps = []
+
+            for app_package in app_packages_list:
+                apps.extend(package_apps.get(app_package, ()))
+
+            # Replace rather than modify, requests being served keep a consistent view of the apps
+            self.apps = apps
+            self.app_contexts = self._index_app_contexts(apps)
+            self.reverse_table = self._index_app_urls(apps)
+            self.version = self._get_apps_version(apps)
+            self.package_apps = package_apps
+            self.package_dirs = package_dirs
+            self.package_signatures = dict((app_package, signature)
+                                           for app_package, signature in package_signatures.items()
+                                           if signature is not None)
+            self.harvest_report = [harvest_report[app_package] for app_package in app_packages_list
+                                   if app_package in harvest_report]
+
+        if reharvested_app_packages:
+            apps_reharvested.send(sender=self.__class__, app_packages=reharvested_app_packages)
+
+        return reharvested_app_packages
@@ -5,6 +5,9 @@ import subprocess
 from setuptools.command.develop import develop
 from setuptools.command.install import install
 
+# Touched after an app is installed so that running servers reload their apps (see TethysAppsReloadMiddleware)
+RELOAD_MARKER_NAME = '.tethys_reload'
+
 
 def get_tethysapp_directory():
     """
@@ -13,6 +16,21 @@ def get_tethysapp_directory():
     return os.path.join(os.path.abspath(os.path.dirname(__file__)), 'tethysapp')
 
 
+def get_reload_marker_path():
+    """
+    Return the absolute path to the file that is touched when an app is installed.
+    """
+    return os.path.join(get_tethysapp_directory(), RELOAD_MARKER_NAME)
+
+
+def touch_reload_marker():
+    """
+    Update the modification time of the reload marker, creating it if needed.
+    """
+    with open(get_reload_marker_path(), 'a'):
+        os.utime(get_reload_marker_path(), None)
+
+
 def _run_install(self):
     """
     The definition of the "run" method for the CustomInstallCommand metaclass.
@@ -43,6 +61,9 @@ def _run_install(self):
     # Run the original install command
     install.run(self)
 
+    # Notify running servers
+    touch_reload_marker()
+
 
 def _run_develop(self):
     """
@@ -74,6 +95,9 @@ def _run_develop(self):
     # Run the original develop command
     develop.run(self)
 
+    # Notify running servers
+    touch_reload_marker()
+
 
 def custom_install_command(app_package, app_package_dir, dependencies):
     """
@@ -8,10 +8,17 @@
 ********************************************************************************
 """
 
+import os
 import sys
+import threading
+import time
 
 from django.conf import settings
-from sqlalchemy import create_engine
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.dispatch import receiver
+from sqlalchemy import create_engine, text
+
+from tethys_apps.signals import apps_reharvested
 
 
 class PersistentStore(object):
@@ -51,9 +58,388 @@ class PersistentStore(object):
                                                                                        self.postgis)
 
 
+# Maps the pool option keys accepted in the TETHYS_DATABASES setting to SQLAlchemy create_engine arguments
+ENGINE_POOL_OPTIONS = {'POOL_SIZE': 'pool_size',
+                       'MAX_OVERFLOW': 'max_overflow',
+                       'POOL_RECYCLE': 'pool_recycle',
+                       'POOL_TIMEOUT': 'pool_timeout'}
+
+
+def get_database_manager_url(database_name=None):
+    """
+    Assemble the url for the database manager user connected to the database given.
+
+    Args:
+      database_name(string, optional): Name of the database to connect to. Defaults to the database manager database.
+
+    Returns:
+      string: An SQLAlchemy database url.
+    """
+    database_manager_db = settings.TETHYS_DATABASES['tethys_db_manager']
+
+    if not database_name:
+        database_name = database_manager_db['NAME'] if 'NAME' in database_manager_db else 'tethys_db_manager'
+
+    return 'postgresql://{0}:{1}@{2}:{3}/{4}'.format(database_manager_db['USER'] if 'USER' in database_manager_db else 'tethys_db_manager',
+                                                    database_manager_db['PASSWORD'] if 'PASSWORD' in database_manager_db else 'pass',
+                                                    database_manager_db['HOST'] if 'HOST' in database_manager_db else '127.0.0.1',
+                                                    database_manager_db['PORT'] if 'PORT' in database_manager_db else '5435',
+                                                    database_name)
+
+
+def get_engine_pool_options(unique_store_name):
+    """
+    Get the SQLAlchemy pool arguments for a persistent store. Pool options given in the "tethys_db_manager" entry of
+    the TETHYS_DATABASES setting apply to all stores and can be overridden for a single store with an entry named after
+    the unique store name (e.g.: "my_app_example_db").
+
+    Args:
+      unique_store_name(string): Name of the persistent store database.
+
+    Returns:
+      dict: Keyword arguments for create_engine.
+    """
+    pool_options = dict()
+
+    for database_settings in (settings.TETHYS_DATABASES['tethys_db_manager'],
+                              settings.TETHYS_DATABASES.get(unique_store_name, {})):
+        for option, argument in ENGINE_POOL_OPTIONS.items():
+            if option in database_settings:
+                pool_options[argument] = database_settings[option]
+
+    return pool_options
+
+
+class PersistentStoreEngineRegistry(object):
+    """
+    Process-wide registry of the SQLAlchemy engines for persistent stores. Engines are created once per app package
+    and persistent store and reused afterwards so that connections are pooled between requests. Engines inherited from
+    a parent process are discarded without closing their connections, which the parent still uses, when the registry
+    is first used after a fork.
+
+    Attributes:
+      hits(int): Number of engine requests answered by the registry.
+      misses(int): Number of engine requests that were not in the registry.
+      creations(int): Number of engines created by the registry.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """
+        Make the registry a Singleton
+        """
+        if not cls._instance:
+            instance = super(PersistentStoreEngineRegistry, cls).__new__(cls)
+            instance._lock = threading.RLock()
+            instance._pid = os.getpid()
+            instance._engines = dict()
+            instance._manager_engine = None
+            instance._inherited_engines = []
+            instance.hits = 0
+            instance.misses = 0
+            instance.creations = 0
+            cls._instance = instance
+
+        return cls._instance
+
+    def _check_process(self):
+        """
+        Discard the engines inherited from the parent process after a fork. Connections cannot be shared across
+        processes, but closing them in the child would close the sockets of the parent.
+        """
+        if self._pid == os.getpid():
+            return
+
+        # A lock held by another thread of the parent at the fork would never be released in the child
+        self._lock = threading.RLock()
+
+        with self._lock:
+            inherited_engines = list(self._engines.values())
+
+            if self._manager_engine is not None:
+                inherited_engines.append(self._manager_engine)
+
+            for engine in inherited_engines:
+                try:
+                    # SQLAlchemy >= 1.4.33 replaces the pool without closing the connections
+                    engine.dispose(close=False)
+                except TypeError:
+                    # Keep the pools referenced, collecting them would close the connections
+                    self._inherited_engines.append(engine)
+
+            self._engines = dict()
+            self._manager_engine = None
+            self._pid = os.getpid()
+
+    def get_manager_engine(self):
+        """
+        Get the engine for the database manager database.
+        """
+        self._check_process()
+
+        with self._lock:
+            if self._manager_engine is None:
+                self._manager_engine = create_engine(get_database_manager_url(), pool_size=1)
+
+            return self._manager_engine
+
+    def get_engine(self, app_name, persistent_store_name):
+        """
+        Get the engine for the persistent store given, creating it on the first request.
+
+        Args:
+          app_name(string): Name of the app package to which the persistent store belongs.
+          persistent_store_name(string): Name of the persistent store.
+
+        Returns:
+          object: An SQLAlchemy engine object or None if the persistent store database does not exist.
+        """
+        self._check_process()
+        key = (app_name, persistent_store_name)
+
+        # Databases may have been dropped and created again by syncstores in another process
+        if PersistentStoreIndex().check_version():
+            self.dispose()
+
+        with self._lock:
+            engine = self._engines.get(key)
+
+            if engine is not None:
+                self.hits += 1
+                return engine
+
+            self.misses += 1
+
+        unique_store_name = '_'.join([app_name, persistent_store_name])
+
+        # Looked up without the lock so that the engines of other stores are served meanwhile
+        if not PersistentStoreIndex().exists(unique_store_name):
+            return None
+
+        with self._lock:
+            engine = self._engines.get(key)
+
+            # Another thread may have created the engine during the lookup
+            if engine is None:
+                # The database manager database user is the owner of all the app databases.
+                engine = create_engine(get_database_manager_url(unique_store_name),
+                                       **get_engine_pool_options(unique_store_name))
+                self._engines[key] = engine
+                self.creations += 1
+
+            return engine
+
+    def dispose(self, app_name=None, persistent_store_name=None):
+        """
+        Dispose of the engines in the registry and close their pooled connections. All engines are disposed of if no
+        app is given. Call this before forking worker processes.
+
+        Args:
+          app_name(string, optional): Name of the app package of the engines to dispose of.
+          persistent_store_name(string, optional): Name of the persistent store of the engine to dispose of.
+        """
+        # Engines inherited from the parent process must be discarded, not closed
+        self._check_process()
+
+        with self._lock:
+            for key in list(self._engines.keys()):
+                if app_name and key[0] != app_name:
+                    continue
+
+                if persistent_store_name and key[1] != persistent_store_name:
+                    continue
+
+                self._engines.pop(key).dispose()
+
+            if not app_name and self._manager_engine is not None:
+                self._manager_engine.dispose()
+                self._manager_engine = None
+
+    def stats(self):
+        """
+        Returns a dictionary with the registry counters and the number of engines held.
+        """
+        self._check_process()
+
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'creations': self.creations,
+                    'engines': len(self._engines)}
+
+
+class PersistentStoreIndex(object):
+    """
+    Process-wide index of the persistent store databases that are known to exist. Names are kept in memory for a
+    limited time (TETHYS_PERSISTENT_STORE_INDEX_TTL seconds, 300 by default) and looked up in the database manager
+    with a targeted query when they are missing or expired. The syncstores command updates the index as databases are
+    created and dropped and then bumps a version stamp in the cache named by TETHYS_PERSISTENT_STORE_INDEX_CACHE
+    ("default"). Other processes check the stamp at most once every VERSION_CHECK_INTERVAL seconds and empty their
+    index when it changed. The stamp only reaches other processes through a shared cache backend (e.g.: memcached),
+    with a per-process cache they see the changes once the names expire or after a restart.
+    """
+
+    VERSION_CACHE_KEY = 'tethys_apps:persistent_store_index:version'
+    VERSION_CHECK_INTERVAL = 1
+
+    # Version stamp value before the first check
+    _UNKNOWN_VERSION = object()
+
+    _instance = None
+
+    def __new__(cls):
+        """
+        Make the index a Singleton
+        """
+        if not cls._instance:
+            instance = super(PersistentStoreIndex, cls).__new__(cls)
+            instance._lock = threading.Lock()
+            instance._expires = dict()
+            instance._version = cls._UNKNOWN_VERSION
+            instance._next_version_check = 0
+            cls._instance = instance
+
+        return cls._instance
+
+    @property
+    def ttl(self):
+        """
+        Number of seconds a database name is trusted without querying the database manager.
+        """
+        return getattr(settings, 'TETHYS_PERSISTENT_STORE_INDEX_TTL', 300)
+
+    @property
+    def cache(self):
+        """
+        The cache that holds the version stamp shared by all processes.
+        """
+        return caches[getattr(settings, 'TETHYS_PERSISTENT_STORE_INDEX_CACHE', DEFAULT_CACHE_ALIAS)]
+
+    def check_version(self):
+        """
+        Empty the index if another process changed the databases since the last check.
+
+        Returns:
+          bool: True if the index was emptied.
+        """
+        now = time.time()
+
+        if now < self._next_version_check:
+            return False
+
+        self._next_version_check = now + self.VERSION_CHECK_INTERVAL
+        version = self.cache.get(self.VERSION_CACHE_KEY)
+
+        with self._lock:
+            if version == self._version:
+                return False
+
+            changed = self._version is not self._UNKNOWN_VERSION
+            self._version = version
+
+            if changed:
+                self._expires.clear()
+
+            return changed
+
+    def invalidate(self):
+        """
+        Empty the index and bump the shared version stamp so that other processes empty theirs.
+        """
+        try:
+            version = self.cache.incr(self.VERSION_CACHE_KEY)
+        except ValueError:
+            # Start from the time so that an evicted stamp is never reused
+            version = int(time.time() * 1000)
+            self.cache.set(self.VERSION_CACHE_KEY, version, None)
+
+        with self._lock:
+            self._version = version
+            self._expires.clear()
+
+    def exists(self, database_name):
+        """
+        Check whether the persistent store database with the name given exists.
+
+        Args:
+          database_name(string): Name of the persistent store database (e.g.: "my_app_example_db").
+
+        Returns:
+          bool: True if the database exists.
+        """
+        self.check_version()
+        expires = self._expires.get(database_name)
+
+        if expires is not None and expires > time.time():
+            return True
+
+        return database_name in self.refresh((database_name,))
+
+    def refresh(self, database_names):
+        """
+        Query the database manager for the databases given and update the index with the result.
+
+        Args:
+          database_names(iterable): Names of the databases to look up.
+
+        Returns:
+          set: The names of the databases given that exist.
+        """
+        database_names = list(database_names)
+
+        if not database_names:
+            return set()
+
+        existing_dbs_statement = text('SELECT d.datname as name '
+                                      'FROM pg_catalog.pg_database d '
+                                      'WHERE d.datname = ANY(:names)')
+
+        connection = PersistentStoreEngineRegistry().get_manager_engine().connect()
+
+        try:
+            existing_dbs = connection.execute(existing_dbs_statement, names=database_names)
+            existing_db_names = set(existing_db.name for existing_db in existing_dbs)
+        finally:
+            connection.close()
+
+        expires = time.time() + self.ttl
+
+        with self._lock:
+            for database_name in database_names:
+                if database_name in existing_db_names:
+                    self._expires[database_name] = expires
+                else:
+                    self._expires.pop(database_name, None)
+
+        return existing_db_names
+
+    def add(self, database_name):
+        """
+        Record that the database given was created.
+        """
+        with self._lock:
+            self._expires[database_name] = time.time() + self.ttl
+
+    def discard(self, database_name):
+        """
+        Record that the database given was dropped.
+        """
+        with self._lock:
+            self._expires.pop(database_name, None)
+
+    def clear(self):
+        """
+        Empty the index.
+        """
+        with self._lock:
+            self._expires.clear()
+
+
 def get_persistent_store_engine(app_name, persistent_store_name):
     """
-    Creates an SQLAlchemy engine object for the app and persistent store given.
+    Retrieves the SQLAlchemy engine object for the app and persistent store given. The engine is created on the first
+    call and reused for the life of the process.
 
     Args:
       app_name(string): Name of the app to which the persistent store belongs. More specifically, the app package name.
@@ -62,54 +448,30 @@ def get_persistent_store_engine(app_name, persistent_store_name):
     Returns:
       object: An SQLAlchemy engine object for the persistent store requested.
     """
-    # Create the unique store name
-    unique_store_name = '_'.join([app_name, persistent_store_name])
+    engine = PersistentStoreEngineRegistry().get_engine(app_name, persistent_store_name)
 
-    # Get database manager
-    database_manager_db = settings.TETHYS_DATABASES['tethys_db_manager']
-    database_manager_url = 'postgresql://{0}:{1}@{2}:{3}/{4}'.format(database_manager_db['USER'] if 'USER' in database_manager_db else 'tethys_db_manager',
-                                                                     database_manager_db['PASSWORD'] if 'PASSWORD' in database_manager_db else 'pass',
-                                                                     database_manager_db['HOST'] if 'HOST' in database_manager_db else '127.0.0.1',
-                                                                     database_manager_db['PORT'] if 'PORT' in database_manager_db else '5435',
-                                                                     database_manager_db['NAME'] if 'NAME' in database_manager_db else 'tethys_db_manager')
-
-    # Create connection engine
-    engine = create_engine(database_manager_url)
-    connection = engine.connect()
-
-    # Check for Database
-    existing_dbs_statement = '''
-                             SELECT d.datname as name
-                             FROM pg_catalog.pg_database d
-                             LEFT JOIN pg_catalog.pg_user u ON d.datdba = u.usesysid
-                             ORDER BY 1;
-                             '''
-
-    existing_dbs = connection.execute(existing_dbs_statement)
-
-    # Compile list of db names
-    existing_db_names = []
-
-    for existing_db in existing_dbs:
-        existing_db_names.append(existing_db.name)
-
-    # Check to make sure that the persistent store exists
-    if unique_store_name in existing_db_names:
-        # Retrieve the database manager url.
-        # The database manager database user is the owner of all the app databases.
-        database_manager_db = settings.TETHYS_DATABASES['tethys_db_manager']
-
-        # Assemble url for persistent store with that name
-        persistent_store_url = 'postgresql://{0}:{1}@{2}:{3}/{4}'.format(database_manager_db['USER'] if 'USER' in database_manager_db else 'tethys_db_manager',
-                                                                         database_manager_db['PASSWORD'] if 'PASSWORD' in database_manager_db else 'pass',
-                                                                         database_manager_db['HOST'] if 'HOST' in database_manager_db else '127.0.0.1',
-                                                                         database_manager_db['PORT'] if 'PORT' in database_manager_db else '5435',
-                                                                         unique_store_name)
-
-        # Return SQLAlchemy Engine
-        return create_engine(persistent_store_url)
-
-    else:
+    if engine is None:
         print('ERROR: No persistent store "{0}" for app "{1}". Make sure you register the persistent store in app.py '
               'and reinstall app.'.format(persistent_store_name, app_name))
-        sys.exit()
\ No newline at end of file
+        sys.exit()
+
+    return engine
+
+
+def dispose_persistent_store_engines():
+    """
+    Dispose of all persistent store engines held by this process. Call this in the pre-fork hook of the application
+    server so that worker processes do not inherit open connections.
+    """
+    PersistentStoreEngineRegistry().dispose()
+
+
+@receiver(apps_reharvested)
+def dispose_reharvested_app_engines(sender, app_packages, **kwargs):
+    """
+    Dispose of the engines of the reharvested apps, their persistent stores may have changed.
+    """
+    registry = PersistentStoreEngineRegistry()
+
+    for app_package in app_packages:
+        registry.dispose(app_name=app_package)
@@ -1,19 +1,126 @@
+import re
+import threading
+import time
+import uuid
+from importlib import import_module
+
+from django.core.exceptions import ViewDoesNotExist
+from django.http import Http404
+
+# Default Django expression that will be matched by untyped url variables
+DEFAULT_EXPRESSION = '[0-9A-Za-z-]+'
+
+# Variable part generated by django_url_preprocessor (e.g.: '(?P<item_id>[0-9]+)')
+URL_VARIABLE = re.compile(r'^\(\?P<(\w+)>(.+)\)$')
+
+# Expression and conversion of the typed url variables (e.g.: '{item_id:int}'). Path variables match several segments.
+URL_VARIABLE_TYPES = {
+    'int': ('[0-9]+', int),
+    'float': (r'-?[0-9]+\.?[0-9]*', float),
+    'uuid': ('[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}', uuid.UUID),
+    'slug': ('[-a-zA-Z0-9_]+', None),
+    'path': ('.+', None),
+}
+
+
+class LazyController(object):
+    """
+    Stands in for the controller function given as a dotted path. The controller is imported on the first call or
+    attribute lookup (e.g.: csrf_exempt) and kept for the life of the process. The time the import took is recorded
+    per controller. The url variables of the types given are converted before they are passed to the controller.
+    """
+
+    # Time each controller import took in seconds keyed by dotted path
+    import_times = {}
+
+    def __init__(self, controller_path, converters=None):
+        """
+        Constructor
+        """
+        self.controller_path = controller_path
+        self.converters = dict((name, URL_VARIABLE_TYPES[variable_type][1])
+                               for name, variable_type in (converters or {}).items()
+                               if URL_VARIABLE_TYPES[variable_type][1] is not None)
+        self.import_time = None
+        self._controller = None
+        self._lock = threading.Lock()
+
+        # Django names views by module and name, answer without importing
+        self.__module__, _, self.__name__ = controller_path.rpartition('.')
+
+    def __repr__(self):
+        """
+        String representation
+        """
+        return '<LazyController: {0}>'.format(self.controller_path)
+
+    def resolve(self):
+        """
+        Returns the controller function, importing it on the first call.
+        """
+        if self._controller is None:
+            with self._lock:
+                if self._controller is None:
+                    start = time.time()
+
+                    try:
+                        controller = getattr(import_module(self.__module__), self.__name__)
+                    except (ImportError, AttributeError, ValueError) as e:
+                        raise ViewDoesNotExist('Could not import controller "{0}": {1}'.format(self.controller_path,
+                                                                                              e))
+
+                    if not callable(controller):
+                        raise ViewDoesNotExist('Controller "{0}" is not callable.'.format(self.controller_path))
+
+                    self.import_time = time.time() - start
+                    LazyController.import_times[self.controller_path] = self.import_time
+                    self._controller = controller
+
+        return self._controller
+
+    def __call__(self, *args, **kwargs):
+        controller = self.resolve()
+
+        for name, converter in self.converters.items():
+            if name in kwargs:
+                try:
+                    kwargs[name] = converter(kwargs[name])
+                except (ValueError, OverflowError):
+                    raise Http404('Invalid value for url variable "{0}".'.format(name))
+
+        return controller(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the proxy (e.g.: csrf_exempt)
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return getattr(self.resolve(), name)
 
 
 class UrlMapBase(object):
     """
     Abstract base class for Tethys app controllers
+
+    Give a cache_timeout in seconds to cache the successful responses of the controller to GET requests. Responses are
+    cached per url, and per cookie for authenticated users, so list the other request headers the response depends on
+    in vary_on (e.g.: ['Accept-Language']). Responses that set cookies, use the CSRF token or read the session are not
+    cached. Responses are cached in the "default" cache unless another cache_alias is given.
     """
 
     root_url = ''
 
-    def __init__(self, name, url, controller):
+    def __init__(self, name, url, controller, cache_timeout=None, vary_on=None, cache_alias=None):
         """
         Constructor
         """
         self.name = name
         self.url = django_url_preprocessor(url, self.root_url)
         self.controller = '.'.join(['tethys_apps.tethysapp', controller])
+        self.converters = get_url_variable_types(url)
+        self.cache_timeout = cache_timeout
+        self.vary_on = list(vary_on) if vary_on else None
+        self.cache_alias = cache_alias
 
     def __repr__(self):
         """
@@ -21,6 +128,17 @@ class UrlMapBase(object):
         """
         return '<UrlMap: name={0}, url={1}, controller={2}>'.format(self.name, self.url, self.controller)
 
+    @property
+    def view(self):
+        """
+        The controller as a callable that is imported on first use.
+        """
+        # Url maps loaded from the harvest manifest are created without calling the constructor
+        if getattr(self, '_view', None) is None:
+            self._view = LazyController(self.controller, getattr(self, 'converters', None))
+
+        return self._view
+
 
 def url_map_maker(root_url):
     """
@@ -30,18 +148,49 @@ def url_map_maker(root_url):
     return type('UrlMap', (UrlMapBase,), properties)
 
 
+def parse_url_variable(part):
+    """
+    Returns the name and type of the url variable in the url part given (e.g.: '{item_id:int}'). The type is None for
+    untyped variables.
+    """
+    variable_name, _, variable_type = part.replace('{', '').replace('}', '').partition(':')
+
+    if variable_type and variable_type not in URL_VARIABLE_TYPES:
+        raise ValueError('Invalid type "{0}" of url variable "{1}". Valid types are: {2}.'.format(
+            variable_type, variable_name, ', '.join(sorted(URL_VARIABLE_TYPES))))
+
+    return variable_name, variable_type or None
+
+
+def get_url_variable_types(url):
+    """
+    Returns a dictionary mapping the name of each typed variable of the url given to its type.
+    """
+    variable_types = dict()
+
+    for part in url.split('/'):
+        if '{' in part or '}' in part:
+            variable_name, variable_type = parse_url_variable(part)
+
+            if variable_type:
+                variable_types[variable_name] = variable_type
+
+    return variable_types
+
+
 def django_url_preprocessor(url, root_url):
     """
-    Convert url from the simplified string version for app developers to Django regular expression.
+    Convert url from the simplified string version for app developers to Django regular expression. Variables may be
+    given a type to match a tighter expression: int, float, uuid, slug or path (which matches several segments).
 
     e.g.:
 
         '/example/resource/{variable_name}/'
         r'^/example/resource/?P<variable_name>[1-9A-Za-z\-]+/$'
-    """
-    # Default Django expression that will be matched
-    DEFAULT_EXPRESSION = '[0-9A-Za-z-]+'
 
+        '/example/resource/{resource_id:int}/'
+        r'^/example/resource/?P<resource_id>[0-9]+/$'
+    """
     # Split the url into parts
     url_parts = url.split('/')
     django_url_parts = []
@@ -55,8 +204,9 @@ def django_url_preprocessor(url, root_url):
     for part in url_parts:
         # Process variables
         if '{' in part or '}' in part:
-            variable_name = part.replace('{', '').replace('}', '')
-            part = '(?P<{0}>{1})'.format(variable_name, DEFAULT_EXPRESSION)
+            variable_name, variable_type = parse_url_variable(part)
+            expression = URL_VARIABLE_TYPES[variable_type][0] if variable_type else DEFAULT_EXPRESSION
+            part = '(?P<{0}>{1})'.format(variable_name, expression)
 
         # Collect processed parts
         django_url_parts.append(part)
@@ -72,3 +222,170 @@ def django_url_preprocessor(url, root_url):
         django_url = r'^$'
 
     return django_url
+
+
+def django_url_format(regex):
+    """
+    Convert a Django regular expression generated by django_url_preprocessor to a format string with a positional slot
+    for each variable. Returns None if the expression cannot be converted.
+
+    e.g.:
+
+        r'^example/resource/(?P<resource_id>[0-9]+)/$'
+        ('example/resource/{0}/', ['resource_id'], ['[0-9]+'])
+
+    Returns:
+      tuple: The format string, the names of the variables and their expressions.
+    """
+    if regex == r'^$':
+        return '', [], []
+
+    if not regex.startswith('^') or not regex.endswith('/$'):
+        return None
+
+    format_parts = []
+    variable_names = []
+    expressions = []
+
+    for part in regex[1:-2].split('/'):
+        variable = URL_VARIABLE.match(part)
+
+        if variable:
+            format_parts.append('{{{0}}}'.format(len(variable_names)))
+            variable_names.append(variable.group(1))
+            expressions.append(variable.group(2))
+
+        elif UrlMapTrie.REGEX_CHARACTERS.intersection(part):
+            return None
+
+        else:
+            format_parts.append(part)
+
+    return '/'.join(format_parts) + '/', variable_names, expressions
+
+
+class UrlMapTrie(object):
+    """
+    Prefix tree of url patterns keyed on the literal path segments of their regular expressions. Variable segments
+    are stored as wildcard nodes. Looking up a path returns the patterns that could match it in O(depth), in the order
+    they were inserted. Patterns that were not generated by django_url_preprocessor cannot be indexed and are always
+    returned as candidates.
+    """
+
+    # Characters that mark a segment as a regular expression rather than a literal
+    REGEX_CHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+    # Variable segment generated by django_url_preprocessor. Path variables (e.g.: '(?P<file_path>.+)') match several
+    # segments and are not indexed.
+    VARIABLE_SEGMENT = re.compile(r'^\(\?P<\w+>(?!\.)[^/()]+\)$')
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.root = UrlMapTrieNode()
+        self.unindexed = []
+
+    def insert(self, regex, entry, index):
+        """
+        Add an entry to the tree under the path segments of the regular expression given.
+
+        Args:
+          regex(string): Django url regular expression (e.g.: '^example/(?P<variable_name>[0-9A-Za-z-]+)/$').
+          entry(object): Object to return when a path may match the expression.
+          index(int): Position of the entry in the original url pattern list.
+        """
+        segments = self._split_regex(regex)
+
+        if segments is None:
+            self.unindexed.append((index, entry))
+            return
+
+        node = self.root
+
+        for segment in segments:
+            if self.VARIABLE_SEGMENT.match(segment):
+                if node.wildcard is None:
+                    node.wildcard = UrlMapTrieNode()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(segment, UrlMapTrieNode())
+
+        node.entries.append((index, entry))
+
+    def candidates(self, path):
+        """
+        Get the entries that could match the path given in the order they were inserted.
+
+        Args:
+          path(string): Url path relative to the app root (e.g.: 'example/resource/').
+
+        Returns:
+          list: Entries that may match the path.
+        """
+        matches = list(self.unindexed)
+
+        if path == '':
+            matches.extend(self.root.entries)
+
+        # All indexed expressions end with a slash
+        elif path.endswith('/'):
+            nodes = [self.root]
+
+            for segment in path[:-1].split('/'):
+                next_nodes = []
+
+                for node in nodes:
+                    if segment in node.children:
+                        next_nodes.append(node.children[segment])
+
+                    if segment and node.wildcard is not None:
+                        next_nodes.append(node.wildcard)
+
+                nodes = next_nodes
+
+                if not nodes:
+                    break
+
+            for node in nodes:
+                matches.extend(node.entries)
+
+        if len(matches) > 1:
+            matches.sort(key=lambda match: match[0])
+
+        return [entry for index, entry in matches]
+
+    def _split_regex(self, regex):
+        """
+        Split a regular expression generated by django_url_preprocessor into path segments. Returns None if the
+        expression cannot be indexed.
+        """
+        if regex == r'^$':
+            return []
+
+        if not regex.startswith('^') or not regex.endswith('/$'):
+            return None
+
+        segments = regex[1:-2].split('/')
+
+        for segment in segments:
+            if not self.VARIABLE_SEGMENT.match(segment) and self.REGEX_CHARACTERS.intersection(segment):
+                return None
+
+        return segments
+
+
+class UrlMapTrieNode(object):
+    """
+    Node of an UrlMapTrie.
+    """
+
+    __slots__ = ('children', 'wildcard', 'entries')
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.children = dict()
+        self.wildcard = None
+        self.entries = []
@@ -11,7 +11,8 @@ from django.conf import settings
 
 from tethys_apps.terminal_colors import TerminalColors
 from .docker_commands import *
-from tethys_apps.helpers import get_tethysapp_dir, get_installed_tethys_apps
+from tethys_apps.helpers import get_tethysapp_dir, get_installed_tethys_apps, get_discovery_backend, \
+    ENTRY_POINTS_DISCOVERY
 
 # Module level variables
 GEN_SETTINGS_OPTION = 'settings'
@@ -21,8 +22,9 @@ DEFAULT_INSTALLATION_DIRECTORY = '/usr/lib/tethys/src'
 DEVELOPMENT_DIRECTORY = '/usr/lib/tethys/tethys'
 PREFIX = 'tethysapp'
 
-# Setup Django settings
-settings.configure()
+# Setup Django settings, unless the cli is imported by a configured project (e.g.: the tests)
+if not settings.configured:
+    settings.configure()
 
 
 def get_manage_path(args):
@@ -210,12 +212,14 @@ def uninstall_command(args):
         print('Uninstall cancelled by user.')
         exit(0)
 
-    try:
-        # Remove directory
-        shutil.rmtree(installed_apps[app_name])
-    except OSError:
-        # Remove symbolic link
-        os.remove(installed_apps[app_name])
+    # Apps discovered from entry points are only removed by pip
+    if get_discovery_backend() != ENTRY_POINTS_DISCOVERY:
+        try:
+            # Remove directory
+            shutil.rmtree(installed_apps[app_name])
+        except OSError:
+            # Remove symbolic link
+            os.remove(installed_apps[app_name])
 
     # Uninstall using pip
     process = ['pip', 'uninstall', '-y', '{0}-{1}'.format(PREFIX, app_name)]
@@ -243,13 +247,13 @@ def docker_command(args):
         docker_init(container=args.container, defaults=args.defaults)
 
     elif args.command == 'start':
-        docker_start(container=args.container)
+        docker_start(container=args.container, wait=args.wait, timeout=args.timeout)
 
     elif args.command == 'stop':
         docker_stop(container=args.container, boot2docker=args.boot2docker)
 
     elif args.command == 'status':
-        docker_status()
+        docker_status(as_json=args.json)
 
     elif args.command == 'update':
         docker_update(container=args.container, defaults=args.defaults)
@@ -261,7 +265,7 @@ def docker_command(args):
         docker_ip()
 
     elif args.command == 'restart':
-        docker_restart(container=args.container)
+        docker_restart(container=args.container, wait=args.wait, timeout=args.timeout)
 
 
 def syncstores_command(args):
@@ -299,6 +303,12 @@ def syncstores_command(args):
     if args.database:
         process.extend(['-d', args.database])
 
+    if args.jobs:
+        process.extend(['-j', str(args.jobs)])
+
+    if args.template:
+        process.extend(['-t'])
+
     if args.app:
         process.extend(args.app)
 
@@ -362,6 +372,13 @@ def tethys_command():
                                    action='store_true',
                                    dest='firsttime')
     syncstores_parser.add_argument('-d', '--database', help='Name of database to sync.')
+    syncstores_parser.add_argument('-j', '--jobs', type=int,
+                                   help='Number of persistent stores to provision in parallel.')
+    syncstores_parser.add_argument('-t', '--template',
+                                   help='Create refreshed databases from golden template copies of the initialized '
+                                        'databases. Initializers are only run again when their module has changed.',
+                                   action='store_true',
+                                   dest='template')
     syncstores_parser.add_argument('-m', '--manage', help='Absolute path to manage.py for Tethys Platform installation.')
     syncstores_parser.set_defaults(func=syncstores_command, refresh=False, firstime=False)
 
@@ -381,6 +398,20 @@ def tethys_command():
                                action='store_true',
                                dest='boot2docker',
                                help="Stop boot2docker on container stop. Only applicable to stop command.")
+    docker_parser.add_argument('-w', '--wait',
+                               action='store_true',
+                               dest='wait',
+                               help="Wait for the services to be ready after starting the containers. Only "
+                                    "applicable to start and restart commands.")
+    docker_parser.add_argument('-t', '--timeout',
+                               type=int,
+                               default=DEFAULT_WAIT_TIMEOUT,
+                               help="Seconds to wait for the services to be ready. Defaults to {0}.".format(
+                                   DEFAULT_WAIT_TIMEOUT))
+    docker_parser.add_argument('--json',
+                               action='store_true',
+                               dest='json',
+                               help="Print the status of the containers as JSON. Only applicable to status command.")
     docker_parser.set_defaults(func=docker_command)
 
     # Parse the args and call the default function
@@ -4,16 +4,26 @@ import os
 import sys
 import json
 import getpass
+import httplib
 import inspect, pprint
+import socket
+import struct
+import threading
+import time
+import urllib2
 from exceptions import OSError
+from multiprocessing.pool import ThreadPool
 from functools import cmp_to_key
 from docker.utils import kwargs_from_env, compare_version
 from docker.client import Client as DockerClient, DEFAULT_DOCKER_API_VERSION as MAX_CLIENT_DOCKER_API_VERSION
 
+from tethys_apps.helpers import format_table
+
 __all__ = ['docker_init', 'docker_start',
            'docker_stop', 'docker_status',
            'docker_update', 'docker_remove',
            'docker_ip', 'docker_restart',
+           'DEFAULT_WAIT_TIMEOUT',
            'POSTGIS_INPUT', 'GEOSERVER_INPUT', 'N52WPS_INPUT']
 
 MINIMUM_API_VERSION = '1.12'
@@ -48,6 +58,24 @@ REQUIRED_DOCKER_CONTAINERS = [POSTGIS_CONTAINER,
 
 DEFAULT_DOCKER_HOST = '127.0.0.1'
 
+# Cache of the negotiated API version and resolved host settings of the Docker client, valid for the Docker
+# environmental variables it was created with and for DOCKER_CLIENT_CACHE_TTL seconds
+DOCKER_CLIENT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.tethys', 'docker_client.json')
+DOCKER_CLIENT_CACHE_TTL = 300
+DOCKER_ENVIRONMENT_VARIABLES = ('DOCKER_HOST', 'DOCKER_CERT_PATH', 'DOCKER_TLS_VERIFY')
+
+# Maximum number of images pulled at the same time
+MAX_PULL_WORKERS = 3
+
+# Seconds between redraws of the pull progress on terminals and between progress lines in logs
+PULL_FRAME_INTERVAL = 0.1
+PULL_SUMMARY_INTERVAL = 10
+
+# Seconds to wait for the services to be ready and the bounds of the delay between readiness checks
+DEFAULT_WAIT_TIMEOUT = 300
+WAIT_INITIAL_DELAY = 0.5
+WAIT_MAX_DELAY = 10
+
 
 def get_api_version(*versions):
     """
@@ -60,10 +88,117 @@ def get_api_version(*versions):
     return min(versions, key=cmp_to_key(cmp))
 
 
+def get_docker_client_cache_key():
+    """
+    Returns the key of the cached Docker client settings: the values of the Docker environmental variables.
+    """
+    return '|'.join(os.environ.get(variable, '') for variable in DOCKER_ENVIRONMENT_VARIABLES)
+
+
+def read_docker_client_cache():
+    """
+    Returns the cached Docker client settings or None if there are none for the current environment or they expired.
+    """
+    try:
+        with open(DOCKER_CLIENT_CACHE_PATH) as cache_file:
+            cached = json.load(cache_file)
+    except (IOError, ValueError):
+        return None
+
+    if not isinstance(cached, dict) or cached.get('key') != get_docker_client_cache_key() or \
+            not 0 <= time.time() - cached.get('cached_at', 0) < DOCKER_CLIENT_CACHE_TTL:
+        return None
+
+    return cached
+
+
+def write_docker_client_cache(key, version, host, base_url=None, environment=None):
+    """
+    Cache the settings of a Docker client. The cache is only an optimization, so failing to write it is ignored.
+
+    Args:
+      key(str): The cache key of the environment the settings were resolved in.
+      version(str): The negotiated API version.
+      host(str): The address of the Docker host.
+      base_url(str): The url of the Docker daemon, if not given by the environment.
+      environment(dict): The Docker environmental variables resolved for boot2docker.
+    """
+    cached = {'key': key,
+              'cached_at': time.time(),
+              'version': version,
+              'host': host,
+              'base_url': base_url,
+              'environment': environment}
+
+    try:
+        cache_dir = os.path.dirname(DOCKER_CLIENT_CACHE_PATH)
+
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        # Replace the file at once, other commands may be reading it
+        temp_path = '{0}.{1}'.format(DOCKER_CLIENT_CACHE_PATH, os.getpid())
+
+        with open(temp_path, 'w') as cache_file:
+            json.dump(cached, cache_file)
+
+        os.rename(temp_path, DOCKER_CLIENT_CACHE_PATH)
+    except (IOError, OSError):
+        pass
+
+
+def clear_docker_client_cache():
+    """
+    Remove the cached Docker client settings.
+    """
+    try:
+        os.remove(DOCKER_CLIENT_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def get_cached_docker_client():
+    """
+    Returns a Docker client created with the cached settings or None if there are none.
+    """
+    cached = read_docker_client_cache()
+
+    if cached is None:
+        return None
+
+    if cached.get('environment'):
+        for variable, value in cached['environment'].items():
+            os.environ[str(variable)] = str(value)
+
+        client_kwargs = kwargs_from_env(assert_hostname=False)
+    else:
+        client_kwargs = {'base_url': str(cached['base_url'])}
+
+    client_kwargs['version'] = str(cached['version'])
+
+    docker_client = DockerClient(**client_kwargs)
+    docker_client.host = str(cached['host'])
+
+    return docker_client
+
+
 def get_docker_client():
     """
     Try to fire up boot2docker and set any environmental variables
     """
+    # Reuse the settings negotiated by a recent command
+    docker_client = get_cached_docker_client()
+
+    if docker_client is not None:
+        try:
+            # The boot2docker VM may have been stopped since, without stop_boot2docker
+            docker_client.ping()
+            return docker_client
+        except IOError:
+            clear_docker_client_cache()
+
+    cache_key = get_docker_client_cache_key()
+
     # For Mac
     try:
         # Get boot2docker info (will fail if not Mac)
@@ -121,6 +256,10 @@ def get_docker_client():
         # Derive the host address only from string formatted: "tcp://<host>:<port>"
         docker_client.host = docker_host.split(':')[1].strip('//')
 
+        write_docker_client_cache(cache_key, client_kwargs['version'], docker_client.host,
+                                  environment=dict((variable, os.environ.get(variable, ''))
+                                                   for variable in DOCKER_ENVIRONMENT_VARIABLES))
+
         return docker_client
 
     # For Linux
@@ -133,6 +272,8 @@ def get_docker_client():
         docker_client = DockerClient(base_url='unix://var/run/docker.sock', version=version)
         docker_client.host = DEFAULT_DOCKER_HOST
 
+        write_docker_client_cache(cache_key, version, docker_client.host, base_url='unix://var/run/docker.sock')
+
         return docker_client
 
     except:
@@ -147,6 +288,9 @@ def stop_boot2docker():
         process = ['boot2docker', 'stop']
         subprocess.call(process)
         print('Boot2Docker VM Stopped')
+
+        # The next command has to start the VM again
+        clear_docker_client_cache()
     except OSError:
         pass
 
@@ -202,13 +346,13 @@ def get_images_to_install(docker_client, container=None):
     return images_to_install
 
 
-def get_containers_to_create(docker_client, container=None):
+def get_containers_to_create(docker_client, container=None, snapshot=None):
     """
     Get a list of containers that need to be created.
     """
     # All assumed to need creating by default
     if not container:
-        containers_to_create = REQUIRED_DOCKER_CONTAINERS
+        containers_to_create = list(REQUIRED_DOCKER_CONTAINERS)
     elif container == POSTGIS_INPUT:
         containers_to_create = [POSTGIS_CONTAINER]
     elif container == GEOSERVER_INPUT:
@@ -219,137 +363,346 @@ def get_containers_to_create(docker_client, container=None):
         containers_to_create = []
 
     # Create containers for each image if not done already
-    containers = docker_client.containers(all=True)
+    snapshot = snapshot or ContainerSnapshot(docker_client)
 
-    for c in containers:
-        names = c['Names']
+    return [c for c in containers_to_create if not snapshot.is_installed(c)]
 
-        # If one of the required containers is listed, remove it from the list of containers to create
-        if not container:
-            required_docker_containers = REQUIRED_DOCKER_CONTAINERS
-        elif container == POSTGIS_INPUT:
-            required_docker_containers = [POSTGIS_CONTAINER]
-        elif container == GEOSERVER_INPUT:
-            required_docker_containers = [GEOSERVER_CONTAINER]
-        elif container == N52WPS_INPUT:
-            required_docker_containers = [N52WPS_CONTAINER]
-        else:
-            required_docker_containers = []
-
-        for required_docker_container in required_docker_containers:
-            if '/' + required_docker_container in names:
-                containers_to_create.pop(containers_to_create.index(required_docker_container))
 
-    return containers_to_create
-
-
-def log_pull_stream(stream):
+def get_terminal_width(stream, default=80):
     """
-    Handle the printing of pull statuses
+    Returns the number of columns of the terminal of the stream given or the default if it is not a terminal.
     """
-    # Experimental printing
-    previous_id = ''
-    previous_message = ''
-
-    for line in stream:
-        json_line = json.loads(line)
-        current_id = json_line['id'] if 'id' in json_line else ''
-        current_status = json_line['status'] if 'status' in json_line else ''
+    try:
+        import fcntl
+        import termios
+        rows, columns = struct.unpack('hh', fcntl.ioctl(stream.fileno(), termios.TIOCGWINSZ, b'\0' * 4))
+        return columns or default
+    except Exception:
+        return default
 
-        # Update prompt
-        backspaces = '\b' * len(previous_message)
-        spaces = ' ' * len(previous_message)
-        current_message = '\n{0}: {1}'.format(current_id, current_status)
 
-        if current_status == 'Downloading' or current_status == 'Extracting':
-            current_message = '{0} {1}'.format(current_message, json_line['progress'])
+class ImagePullProgress(object):
+    """
+    Progress of images pulled at the same time. The pull events only update the state of their layer, the aggregated
+    progress of all images is drawn at most PULL_FRAME_INTERVAL seconds apart on one status line on terminals and
+    printed every PULL_SUMMARY_INTERVAL seconds otherwise (e.g.: CI logs). Records the duration and errors of each
+    image pull. Thread-safe.
+    """
 
-        # Handle no id case
-        if not current_id:
-            sys.stdout.write('\n{0}'.format(current_status))
+    def __init__(self, images, stream=None):
+        """
+        Constructor
+        """
+        self.images = list(images)
+        self.layers = dict()
+        self.statuses = dict((image, 'Waiting') for image in self.images)
+        self.start_times = dict()
+        self.durations = dict()
+        self.errors = dict()
+        self.stream = stream or sys.stdout
+        self.is_tty = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self.render_interval = PULL_FRAME_INTERVAL if self.is_tty else PULL_SUMMARY_INTERVAL
+        self._last_render = 0
+        self._previous_length = 0
+        self._lock = threading.Lock()
+
+    def start(self, image):
+        """
+        Record the start of the pull of the image given.
+        """
+        with self._lock:
+            self.start_times[image] = time.time()
+            self.statuses[image] = 'Pulling'
+
+            if not self._last_render:
+                self._render()
+
+    def update(self, image, json_line):
+        """
+        Update the progress of the image given with a line of its pull stream.
+        """
+        with self._lock:
+            if 'error' in json_line:
+                self.errors[image] = json_line['error']
+                self.statuses[image] = 'Failed'
+                return
+
+            layer_id = json_line.get('id')
+            status = json_line.get('status', '')
+
+            if layer_id:
+                layer = self.layers.setdefault((image, layer_id), [0, 0])
+                progress_detail = json_line.get('progressDetail') or {}
+
+                # Only the downloaded bytes count, extracting reports the same layer sizes again
+                if status == 'Downloading':
+                    layer[0] = progress_detail.get('current', layer[0])
+                    layer[1] = progress_detail.get('total', layer[1])
+                elif status in ('Download complete', 'Pull complete'):
+                    layer[0] = layer[1]
+
+            self.statuses[image] = status
+
+            if time.time() - self._last_render >= self.render_interval:
+                self._render()
+
+    def finish(self, image, error=None):
+        """
+        Record the end of the pull of the image given.
+        """
+        with self._lock:
+            now = time.time()
+            self.durations[image] = now - self.start_times.get(image, now)
+
+            if error is not None:
+                self.errors[image] = error
+
+            self.statuses[image] = 'Failed' if image in self.errors else 'Done'
+
+            if self.is_tty:
+                self._render()
+            else:
+                self.stream.write('{0} {1} in {2:.2f} seconds.\n'.format(
+                    image, 'failed' if image in self.errors else 'pulled', self.durations[image]))
+                self.stream.flush()
+
+    def close(self):
+        """
+        Draw the final progress and end the status line.
+        """
+        with self._lock:
+            self._render()
+
+            if self.is_tty:
+                self.stream.write('\n')
+                self.stream.flush()
+
+    def get_image_bytes(self, image):
+        """
+        Returns the downloaded and total bytes of the layers of the image given.
+        """
+        current = total = 0
+
+        for (layer_image, layer_id), (layer_current, layer_total) in self.layers.items():
+            if layer_image == image:
+                current += layer_current
+                total += layer_total
+
+        return current, total
+
+    def get_message(self):
+        """
+        Returns the aggregated progress of all images on one line.
+        """
+        current = total = 0
+
+        for layer_current, layer_total in self.layers.values():
+            current += layer_current
+            total += layer_total
+
+        message = 'Pulled {0:.1f}/{1:.1f} MB'.format(current / 1048576.0, total / 1048576.0)
+
+        if total:
+            message += ' ({0}%)'.format(int(current * 100 / total))
+
+        image_messages = []
+
+        for image in self.images:
+            image_status = self.statuses[image]
+
+            if image_status == 'Downloading':
+                image_current, image_total = self.get_image_bytes(image)
+
+                if image_total:
+                    image_status = '{0}%'.format(int(image_current * 100 / image_total))
+
+            # "ciwater/postgis:latest" shows as "postgis"
+            image_messages.append('{0}: {1}'.format(image.split('/')[-1].split(':')[0], image_status))
+
+        return '{0} | {1}'.format(message, ' | '.join(image_messages))
+
+    def _render(self):
+        """
+        Draw the progress. Called with the lock held.
+        """
+        self._last_render = time.time()
+        message = self.get_message()
+
+        if self.is_tty:
+            # A wrapped line can not be overwritten
+            message = message[:get_terminal_width(self.stream) - 1]
+            padding = ' ' * max(self._previous_length - len(message), 0)
+            self.stream.write('\r' + message + padding)
+            self._previous_length = len(message)
+        else:
+            self.stream.write(message + '\n')
 
-        # Overwrite current line if id is the same
-        elif current_id == previous_id:
-            sys.stdout.write(backspaces)
-            sys.stdout.write(spaces)
-            sys.stdout.write(backspaces)
-            sys.stdout.write(current_message.strip())
+        self.stream.flush()
 
-        # Start new line
-        else:
-            sys.stdout.write(current_message)
+    def write_summary(self):
+        """
+        Print the duration, size and outcome of each image pull.
+        """
+        header = ('Image', 'Layers', 'Size (MB)', 'Time (s)', 'Status')
+        rows = []
 
-        # Flush to out
-        sys.stdout.flush()
+        for image in self.images:
+            current, total = self.get_image_bytes(image)
+            layer_count = len([layer_id for layer_image, layer_id in self.layers if layer_image == image])
+            rows.append((image,
+                         str(layer_count),
+                         '{0:.1f}'.format(total / 1048576.0),
+                         '{0:.2f}'.format(self.durations.get(image, 0)),
+                         'Failed' if image in self.errors else 'Pulled'))
 
-        # Save state
-        previous_message = current_message
-        previous_id = current_id
-    print()
+        print('\nPull Summary:')
 
+        for line in format_table(header, rows):
+            print(line)
 
-def get_docker_container_dicts(docker_client):
-    # Check status of containers
-    containers = docker_client.containers(all=True)
-    container_dicts = dict()
 
-    for container in containers:
+def pull_docker_images(docker_client, images, workers=MAX_PULL_WORKERS):
+    """
+    Pull Docker images at the same time with at most the given number of workers.
 
-        if '/' + POSTGIS_CONTAINER in container['Names']:
-            container_dicts[POSTGIS_CONTAINER] = container
+    Args:
+      docker_client(docker.client.Client): docker-py client.
+      images(list): The image tags to pull.
+      workers(int): The maximum number of images pulled at the same time.
+    """
+    if not images:
+        return
 
-        elif '/' + GEOSERVER_CONTAINER in container['Names']:
-            container_dicts[GEOSERVER_CONTAINER] = container
+    progress = ImagePullProgress(images)
 
-        elif '/' + N52WPS_CONTAINER in container['Names']:
-            container_dicts[N52WPS_CONTAINER] = container
+    def pull_image(image):
+        progress.start(image)
 
-    return container_dicts
+        try:
+            for line in docker_client.pull(image, stream=True):
+                progress.update(image, json.loads(line))
+        except Exception as e:
+            progress.finish(image, error=str(e))
+        else:
+            progress.finish(image)
 
+    if len(images) > 1:
+        pool = ThreadPool(max(1, min(workers, len(images))))
 
-def get_docker_container_status(docker_client):
-    """
-    Returns a dictionary representing the container status. If a container is included in the dictionary keys, it is
-    installed. If its key is not included, it means it is not installed. If its value is False, it is not running.
-    If its value is True, it is running.
-    """
-    # Check status of containers
-    containers = docker_client.containers()
-    all_containers = docker_client.containers(all=True)
-    container_status = dict()
+        try:
+            pool.map(pull_image, images)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        pull_image(images[0])
 
-    # If in all containers list, assume off (False) until verified in only running containers list
-    for container in all_containers:
-        if '/' + POSTGIS_CONTAINER in container['Names']:
-            container_status[POSTGIS_CONTAINER] = False
+    progress.close()
+    progress.write_summary()
 
-        elif '/' + GEOSERVER_CONTAINER in container['Names']:
-            container_status[GEOSERVER_CONTAINER] = False
+    if progress.errors:
+        for image in images:
+            if image in progress.errors:
+                print('ERROR: Could not pull {0}: {1}'.format(image, progress.errors[image]))
 
-        elif '/' + N52WPS_CONTAINER in container['Names']:
-            container_status[N52WPS_CONTAINER] = False
+        exit(1)
 
-    # Verify running containers
-    for container in containers:
 
-        if '/' + POSTGIS_CONTAINER in container['Names']:
-            container_status[POSTGIS_CONTAINER] = True
+class ContainerSnapshot(object):
+    """
+    State of the Tethys Docker containers read with a single request to the Docker daemon. Commands read the state once
+    and share the snapshot instead of listing the containers for each check.
+    """
 
-        elif '/' + GEOSERVER_CONTAINER in container['Names']:
-            container_status[GEOSERVER_CONTAINER] = True
+    def __init__(self, docker_client):
+        """
+        Constructor
+        """
+        self.containers = dict()
+
+        for container in docker_client.containers(all=True):
+            for container_name in REQUIRED_DOCKER_CONTAINERS:
+                if '/' + container_name in container['Names']:
+                    self.containers[container_name] = container
+
+    def __repr__(self):
+        """
+        String representation
+        """
+        return '<ContainerSnapshot: {0}>'.format(', '.join('{0}={1}'.format(name, self.get_state(name))
+                                                          for name in REQUIRED_DOCKER_CONTAINERS))
+
+    def is_installed(self, container_name):
+        """
+        Returns True if the container given exists.
+        """
+        return container_name in self.containers
+
+    def is_running(self, container_name):
+        """
+        Returns True if the container given is running.
+        """
+        return self.containers.get(container_name, {}).get('Status', '').startswith('Up')
+
+    def get_state(self, container_name):
+        """
+        Returns the state of the container given: "running", "stopped" or "not installed".
+        """
+        if not self.is_installed(container_name):
+            return 'not installed'
+
+        return 'running' if self.is_running(container_name) else 'stopped'
+
+    def get_public_port(self, container_name):
+        """
+        Returns the public port of the container given or None if it is not running.
+        """
+        for port in self.containers.get(container_name, {}).get('Ports') or ():
+            if port.get('PublicPort'):
+                return port['PublicPort']
+
+        return None
+
+    def as_dict(self):
+        """
+        Returns a dictionary with the state, image, status and public port of each container.
+        """
+        snapshot_dict = dict()
+
+        for container_name in REQUIRED_DOCKER_CONTAINERS:
+            container = self.containers.get(container_name, {})
+            snapshot_dict[container_name] = {'state': self.get_state(container_name),
+                                             'image': container.get('Image'),
+                                             'status': container.get('Status'),
+                                             'port': self.get_public_port(container_name)}
+
+        return snapshot_dict
+
+
+def get_docker_container_dicts(docker_client, snapshot=None):
+    """
+    Returns a dictionary mapping the name of each installed container to its Docker description.
+    """
+    snapshot = snapshot or ContainerSnapshot(docker_client)
+    return dict(snapshot.containers)
 
-        elif '/' + N52WPS_CONTAINER in container['Names']:
-            container_status[N52WPS_CONTAINER] = True
 
-    return container_status
+def get_docker_container_status(docker_client, snapshot=None):
+    """
+    Returns a dictionary representing the container status. If a container is included in the dictionary keys, it is
+    installed. If its key is not included, it means it is not installed. If its value is False, it is not running.
+    If its value is True, it is running.
+    """
+    snapshot = snapshot or ContainerSnapshot(docker_client)
+    return dict((container_name, snapshot.is_running(container_name)) for container_name in snapshot.containers)
 
 
-def install_docker_containers(docker_client, force=False, container=None, defaults=False):
+def install_docker_containers(docker_client, force=False, container=None, defaults=False, snapshot=None):
     """
     Install all Docker containers
     """
     # Check for containers that need to be created
-    containers_to_create = get_containers_to_create(docker_client, container=container)
+    containers_to_create = get_containers_to_create(docker_client, container=container, snapshot=snapshot)
 
     # PostGIS
     if POSTGIS_CONTAINER in containers_to_create or (force and (not container or container == POSTGIS_INPUT)):
@@ -538,12 +891,13 @@ def install_docker_containers(docker_client, force=False, container=None, defaul
     print("\nThe Docker containers have been successfully installed.")
 
 
-def container_check(docker_client, container=None):
+def container_check(docker_client, container=None, snapshot=None):
     """
     Check to ensure containers are installed.
     """
     # Perform this check to make sure the "tethys docker init" command has been run
-    containers_needing_to_be_installed = get_containers_to_create(docker_client, container=container)
+    containers_needing_to_be_installed = get_containers_to_create(docker_client, container=container,
+                                                                  snapshot=snapshot)
 
     if len(containers_needing_to_be_installed) > 0:
         print('The following Docker containers have not been installed: {0}'.format(
@@ -553,68 +907,192 @@ def container_check(docker_client, container=None):
         exit(1)
 
 
-def start_docker_containers(docker_client, container=None):
+def start_docker_containers(docker_client, container=None, snapshot=None):
     """
-    Start Docker containers
+    Start Docker containers. The containers do not depend on each other and are started at the same time.
+
+    Returns:
+      (list): The names of the containers that are running or were started.
     """
+    snapshot = snapshot or ContainerSnapshot(docker_client)
+
     # Perform check
-    container_check(docker_client, container=container)
+    container_check(docker_client, container=container, snapshot=snapshot)
 
     # Get container dicts
-    container_status = get_docker_container_status(docker_client)
+    container_status = get_docker_container_status(docker_client, snapshot=snapshot)
+
+    containers_to_start = []
+    running_containers = []
+
+    for container_input, container_name, display_name, port_bindings in (
+            (POSTGIS_INPUT, POSTGIS_CONTAINER, 'PostGIS', {5432: DEFAULT_POSTGIS_PORT}),
+            (GEOSERVER_INPUT, GEOSERVER_CONTAINER, 'GeoServer', {8080: DEFAULT_GEOSERVER_PORT}),
+            (N52WPS_INPUT, N52WPS_CONTAINER, '52 North WPS', {8080: DEFAULT_N52WPS_PORT})):
+        if container and container != container_input:
+            continue
+
+        if container_name not in container_status:
+            print('{0} container not installed...'.format(display_name))
+        elif container_status[container_name]:
+            print('{0} container already running...'.format(display_name))
+            running_containers.append(container_name)
+        else:
+            print('Starting {0} container...'.format(display_name))
+            containers_to_start.append((container_name, port_bindings))
+
+    def start_container(container_to_start):
+        container_name, port_bindings = container_to_start
+        docker_client.start(container=container_name, port_bindings=port_bindings)
+
+    if len(containers_to_start) > 1:
+        pool = ThreadPool(len(containers_to_start))
+
+        try:
+            pool.map(start_container, containers_to_start)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for container_to_start in containers_to_start:
+            start_container(container_to_start)
+
+    return running_containers + [container_name for container_name, port_bindings in containers_to_start]
+
 
-    # Start PostGIS
+def is_postgis_ready(host, port, timeout):
+    """
+    Returns True if PostgreSQL answers on the host and port given. The Docker port proxy accepts connections before the
+    database does, so an SSL request is sent, which the server answers before authentication.
+    """
     try:
-        if not container_status[POSTGIS_CONTAINER] and (not container or container == POSTGIS_INPUT):
-            print('Starting PostGIS container...')
-            docker_client.start(container=POSTGIS_CONTAINER,
-                                port_bindings={5432: DEFAULT_POSTGIS_PORT})
-        elif not container or container == POSTGIS_INPUT:
-            print('PostGIS container already running...')
-    except KeyError:
-        if not container or container == POSTGIS_INPUT:
-            print('PostGIS container not installed...')
-    except:
-        raise
+        connection = socket.create_connection((host, int(port)), timeout)
+
+        try:
+            # SSLRequest message: length and the SSL request code
+            connection.sendall(struct.pack('!ii', 8, 80877103))
+            return connection.recv(1) in (b'S', b'N')
+        finally:
+            connection.close()
 
+    except (socket.error, socket.timeout):
+        return False
+
+
+def is_http_ready(url, timeout, ready_statuses=()):
+    """
+    Returns True if the url given answers with a successful status or one of the statuses given. Tomcat answers 404
+    while the application is still deploying, so other client errors do not mean the application is up.
+
+    Args:
+      url(str): The url to request.
+      timeout(float): The number of seconds to wait for the answer.
+      ready_statuses(tuple): Error statuses that mean the application is up (e.g.: an authentication challenge).
+    """
     try:
-        if not container_status[GEOSERVER_CONTAINER] and (not container or container == GEOSERVER_INPUT):
-            # Start GeoServer
-            print('Starting GeoServer container...')
-            docker_client.start(container=GEOSERVER_CONTAINER,
-                                port_bindings={8080: DEFAULT_GEOSERVER_PORT})
-        elif not container or container == GEOSERVER_INPUT:
-            print('GeoServer container already running...')
-    except KeyError:
-        if not container or container == GEOSERVER_INPUT:
-            print('GeoServer container not installed...')
-    except:
-        raise
+        urllib2.urlopen(url, timeout=timeout).close()
+        return True
+
+    except urllib2.HTTPError as e:
+        return e.code in ready_statuses
+
+    except (urllib2.URLError, socket.error, socket.timeout, httplib.HTTPException):
+        return False
+
+
+def get_readiness_checks(docker_client):
+    """
+    Returns a dictionary mapping the name of each container to its display name and a function that returns True when
+    its service is ready.
+    """
+    host = docker_client.host
+
+    return {
+        POSTGIS_CONTAINER: ('PostGIS', lambda timeout: is_postgis_ready(host, DEFAULT_POSTGIS_PORT, timeout)),
+        GEOSERVER_CONTAINER: ('GeoServer', lambda timeout: is_http_ready(
+            'http://{0}:{1}/geoserver/rest'.format(host, DEFAULT_GEOSERVER_PORT), timeout, ready_statuses=(401, 403))),
+        N52WPS_CONTAINER: ('52 North WPS', lambda timeout: is_http_ready(
+            'http://{0}:{1}/wps/WebProcessingService?Request=GetCapabilities&Service=WPS'.format(
+                host, DEFAULT_N52WPS_PORT), timeout)),
+    }
+
+
+def wait_for_docker_containers(docker_client, container_names, timeout=DEFAULT_WAIT_TIMEOUT):
+    """
+    Wait for the services of the containers given to be ready. The services are polled at the same time with an
+    exponential backoff until they are ready or the timeout expires.
+
+    Args:
+      docker_client(docker.client.Client): docker-py client.
+      container_names(list): The names of the containers to wait for.
+      timeout(int): The number of seconds to wait for all services.
+
+    Returns:
+      (dict): The number of seconds each container took to be ready, or None if it was not ready in time.
+    """
+    readiness_checks = get_readiness_checks(docker_client)
+    start = time.time()
+    deadline = start + timeout
+
+    def wait_for_container(container_name):
+        display_name, is_ready = readiness_checks[container_name]
+        delay = WAIT_INITIAL_DELAY
+
+        while True:
+            if is_ready(min(WAIT_MAX_DELAY, max(deadline - time.time(), 0.1))):
+                ready_time = time.time() - start
+                print('{0} is ready ({1:.1f} seconds).'.format(display_name, ready_time))
+                return container_name, ready_time
+
+            remaining = deadline - time.time()
+
+            if remaining <= 0:
+                print('{0} was not ready after {1} seconds.'.format(display_name, timeout))
+                return container_name, None
+
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, WAIT_MAX_DELAY)
+
+    container_names = [container_name for container_name in container_names if container_name in readiness_checks]
+
+    if not container_names:
+        return dict()
+
+    print('Waiting for the services to be ready...')
+    pool = ThreadPool(len(container_names))
 
     try:
-        if not container_status[N52WPS_CONTAINER] and (not container or container == N52WPS_INPUT):
-            # Start 52 North WPS
-            print('Starting 52 North WPS container...')
-            docker_client.start(container=N52WPS_CONTAINER,
-                                port_bindings={8080: DEFAULT_N52WPS_PORT})
-        elif not container or container == N52WPS_INPUT:
-            print('52 North WPS container already running...')
-    except KeyError:
-        if not container or container == N52WPS_INPUT:
-            print('52 North WPS container not installed...')
-    except:
-        raise
+        return dict(pool.map(wait_for_container, container_names))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def wait_for_services(docker_client, container_names, timeout):
+    """
+    Wait for the services of the containers given to be ready and exit with an error if any is not ready in time.
+    """
+    start = time.time()
+    ready_times = wait_for_docker_containers(docker_client, container_names, timeout=timeout)
+
+    if None in ready_times.values():
+        print('ERROR: The services were not ready after {0} seconds.'.format(timeout))
+        exit(1)
+
+    print('Services ready in {0:.1f} seconds.'.format(time.time() - start))
 
 
-def stop_docker_containers(docker_client, silent=False, container=None):
+def stop_docker_containers(docker_client, silent=False, container=None, snapshot=None):
     """
     Stop Docker containers
     """
+    snapshot = snapshot or ContainerSnapshot(docker_client)
+
     # Perform check
-    container_check(docker_client, container=container)
+    container_check(docker_client, container=container, snapshot=snapshot)
 
     # Get container dicts
-    container_status = get_docker_container_status(docker_client)
+    container_status = get_docker_container_status(docker_client, snapshot=snapshot)
 
     # Stop PostGIS
     try:
@@ -665,12 +1143,12 @@ def stop_docker_containers(docker_client, silent=False, container=None):
         raise
 
 
-def remove_docker_containers(docker_client, container=None):
+def remove_docker_containers(docker_client, container=None, snapshot=None):
     """
     Remove all docker containers
     """
     # Perform check
-    container_check(docker_client, container=container)
+    container_check(docker_client, container=container, snapshot=snapshot)
 
     # Remove PostGIS
     if not container or container == POSTGIS_INPUT:
@@ -704,23 +1182,25 @@ def docker_init(container=None, defaults=False):
         print("Pulling Docker images...")
 
     # Pull the Docker images
-    for image in images_to_install:
-        pull_stream = docker_client.pull(image, stream=True)
-        log_pull_stream(pull_stream)
+    pull_docker_images(docker_client, images_to_install)
 
     # Install docker containers
     install_docker_containers(docker_client, container=container, defaults=defaults)
 
 
-def docker_start(container=None):
+def docker_start(container=None, wait=False, timeout=DEFAULT_WAIT_TIMEOUT):
     """
-    Start the docker containers
+    Start the docker containers. With wait, wait for their services to be ready and exit with an error if they are not
+    ready within the timeout.
     """
     # Retrieve a Docker client
     docker_client = get_docker_client()
 
     # Start the Docker containers
-    start_docker_containers(docker_client, container=container)
+    container_names = start_docker_containers(docker_client, container=container)
+
+    if wait:
+        wait_for_services(docker_client, container_names, timeout)
 
 
 def docker_stop(container=None, boot2docker=False):
@@ -731,16 +1211,16 @@ def docker_stop(container=None, boot2docker=False):
     docker_client = get_docker_client()
 
     # Stop the Docker containers
-    stop_docker_containers(docker_client, container=container)
+    stop_docker_containers(docker_client, container=container, snapshot=ContainerSnapshot(docker_client))
 
     # Shutdown boot2docker if applicable
     if boot2docker and not container:
         stop_boot2docker()
 
 
-def docker_restart(container=None):
+def docker_restart(container=None, wait=False, timeout=DEFAULT_WAIT_TIMEOUT):
     """
-    Restart Docker containers
+    Restart Docker containers. With wait, wait for their services to be ready like docker_start.
     """
     # Retrieve a Docker client
     docker_client = get_docker_client()
@@ -749,7 +1229,10 @@ def docker_restart(container=None):
     stop_docker_containers(docker_client, container=container)
 
     # Start the Docker containers
-    start_docker_containers(docker_client, container=container)
+    container_names = start_docker_containers(docker_client, container=container)
+
+    if wait:
+        wait_for_services(docker_client, container_names, timeout)
 
 
 def docker_remove(container=None):
@@ -759,46 +1242,35 @@ def docker_remove(container=None):
     # Retrieve a Docker client
     docker_client = get_docker_client()
 
+    # Read the containers once, stopping them does not change which are installed
+    snapshot = ContainerSnapshot(docker_client)
+
     # Stop the Docker containers
-    stop_docker_containers(docker_client, container=container)
+    stop_docker_containers(docker_client, container=container, snapshot=snapshot)
 
     # Remove Docker containers
-    remove_docker_containers(docker_client, container=container)
+    remove_docker_containers(docker_client, container=container, snapshot=snapshot)
 
 
-def docker_status():
+def docker_status(as_json=False):
     """
-    Returns the status of the Docker containers: either Running or Stopped.
+    Returns the status of the Docker containers: either Running or Stopped. With as_json, prints the state, image,
+    status and public port of each container as JSON.
     """
     # Retrieve a Docker client
     docker_client = get_docker_client()
 
-    # Get container dicts
-    container_status = get_docker_container_status(docker_client)
+    # Read the containers once
+    snapshot = ContainerSnapshot(docker_client)
 
-    # PostGIS
-    if POSTGIS_CONTAINER in container_status and container_status[POSTGIS_CONTAINER]:
-        print('PostGIS/Database: Running')
-    elif POSTGIS_CONTAINER in container_status and not container_status[POSTGIS_CONTAINER]:
-        print('PostGIS/Database: Stopped')
-    else:
-        print('PostGIS/Database: Not Installed')
-
-    # GeoServer
-    if GEOSERVER_CONTAINER in container_status and container_status[GEOSERVER_CONTAINER]:
-        print('GeoServer: Running')
-    elif GEOSERVER_CONTAINER in container_status and not container_status[GEOSERVER_CONTAINER]:
-        print('GeoServer: Stopped')
-    else:
-        print('GeoServer: Not Installed')
+    if as_json:
+        print(json.dumps(snapshot.as_dict(), indent=2, separators=(',', ': '), sort_keys=True))
+        return
 
-    # 52 North WPS
-    if N52WPS_CONTAINER in container_status and container_status[N52WPS_CONTAINER]:
-        print('52 North WPS: Running')
-    elif N52WPS_CONTAINER in container_status and not container_status[N52WPS_CONTAINER]:
-        print('52 North WPS: Stopped')
-    else:
-        print('52 North WPS: Not Installed')
+    for container_name, display_name in ((POSTGIS_CONTAINER, 'PostGIS/Database'),
+                                          (GEOSERVER_CONTAINER, 'GeoServer'),
+                                          (N52WPS_CONTAINER, '52 North WPS')):
+        print('{0}: {1}'.format(display_name, snapshot.get_state(container_name).title()))
 
 
 def docker_update(container=None, defaults=False):
@@ -808,11 +1280,14 @@ def docker_update(container=None, defaults=False):
     # Retrieve a Docker client
     docker_client = get_docker_client()
 
+    # Read the containers once, stopping them does not change which are installed
+    snapshot = ContainerSnapshot(docker_client)
+
     # Stop containers
-    stop_docker_containers(docker_client, container=container)
+    stop_docker_containers(docker_client, container=container, snapshot=snapshot)
 
     # Remove containers
-    remove_docker_containers(docker_client, container=container)
+    remove_docker_containers(docker_client, container=container, snapshot=snapshot)
 
     # Force pull all the images without check to get latest version
     if not container:
@@ -826,9 +1301,7 @@ def docker_update(container=None, defaults=False):
     else:
         required_docker_images = []
 
-    for image in required_docker_images:
-        pull_stream = docker_client.pull(image, stream=True)
-        log_pull_stream(pull_stream)
+    pull_docker_images(docker_client, required_docker_images)
 
     # Reinstall containers
     install_docker_containers(docker_client, force=True, container=container, defaults=defaults)
@@ -842,8 +1315,9 @@ def docker_ip():
     docker_client = get_docker_client()
 
     # Containers
-    containers = get_docker_container_dicts(docker_client)
-    container_status = get_docker_container_status(docker_client)
+    snapshot = ContainerSnapshot(docker_client)
+    containers = get_docker_container_dicts(docker_client, snapshot=snapshot)
+    container_status = get_docker_container_status(docker_client, snapshot=snapshot)
     docker_host = docker_client.host
 
     # PostGIS
@@ -1,33 +1,30 @@
 from tethys_apps.app_harvester import SingletonAppHarvester
 
+# The app root_url is the path item following the apps root
+APPS_ROOT = '/apps/'
+
+
+def get_app_context(path):
+    """
+    Get the metadata of the Tethys app that the url path given belongs to or None if it does not belong to an app.
+    """
+    start = path.find(APPS_ROOT)
+
+    if start < 0:
+        return None
+
+    start += len(APPS_ROOT)
+    end = path.find('/', start)
+    app_root_url = path[start:end] if end >= 0 else path[start:]
+
+    app_context = SingletonAppHarvester().app_contexts.get(app_root_url)
+
+    # The indexed contexts are shared by all requests
+    return dict(app_context) if app_context is not None else None
+
 
 def tethys_apps_context(request):
     """
     Add the current Tethys app metadata to the template context.
     """
-    # Setup variables
-    harvester = SingletonAppHarvester()
-    context = {'tethys_app': None}
-    apps_root = 'apps'
-
-    # Get url and parts
-    url = request.path
-    url_parts = url.split('/')
-
-    # Find the app key
-    if apps_root in url_parts:
-        # The app root_url is the path item following (+1) the apps_root item
-        app_root_url_index = url_parts.index(apps_root) + 1
-        app_root_url = url_parts[app_root_url_index]
-
-        # Get list of app dictionaries from the harvester
-        apps = harvester.apps
-
-        # If a match can be made, return the app dictionary as part of the context
-        for app in apps:
-            if app.root_url == app_root_url:
-                context['tethys_app'] = {'name': app.name,
-                                         'index': app.index,
-                                         'icon': app.icon,
-                                         'color': app.color}
-    return context
\ No newline at end of file
+    return {'tethys_app': get_app_context(request.path)}
@@ -1,4 +1,19 @@
 import os
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Entry point group that app distributions register their app package in. The entry point name is the app package
+# name and the entry point module is the app package (e.g.: "my_app = tethysapp.my_app").
+APP_ENTRY_POINT_GROUP = 'tethys_apps.apps'
+
+# Discovery backends (see get_discovery_backend)
+DIRECTORY_DISCOVERY = 'directory'
+ENTRY_POINTS_DISCOVERY = 'entry_points'
+
+# App entry points read from the installed package metadata, read once per process
+_app_entry_points = None
 
 
 def get_tethysapp_dir():
@@ -8,19 +23,82 @@ def get_tethysapp_dir():
     return os.path.join(os.path.abspath(os.path.dirname(__file__)), 'tethysapp')
 
 
-def get_installed_tethys_apps():
+def get_discovery_backend():
+    """
+    Returns the app discovery backend set with TETHYS_APPS_DISCOVERY: "directory" (default) to discover the apps in the
+    tethysapp directory or "entry_points" to discover the apps registered in the "tethys_apps.apps" entry point group
+    of the installed distributions. The directory backend is used outside of a Django project.
+    """
+    if not settings.configured and not os.environ.get('DJANGO_SETTINGS_MODULE'):
+        return DIRECTORY_DISCOVERY
+
+    try:
+        return getattr(settings, 'TETHYS_APPS_DISCOVERY', DIRECTORY_DISCOVERY)
+    except (ImportError, ImproperlyConfigured):
+        return DIRECTORY_DISCOVERY
+
+
+def get_app_entry_points(refresh=False):
     """
-    Returns a list apps installed in the tethysapp directory.
+    Returns an ordered dictionary mapping the app package name of each app entry point to the module name and the
+    absolute path of the app package. The entry points are read once and cached unless refresh is True.
     """
+    global _app_entry_points
+
+    if _app_entry_points is None or refresh:
+        import pkg_resources
+
+        # A new working set sees the distributions installed since the process started
+        working_set = pkg_resources.WorkingSet() if refresh else pkg_resources.working_set
+        app_entry_points = dict()
+
+        for entry_point in working_set.iter_entry_points(APP_ENTRY_POINT_GROUP):
+            package_dir = os.path.join(entry_point.dist.location, *entry_point.module_name.split('.'))
+
+            # The first distribution on the path wins, like imports
+            if entry_point.name not in app_entry_points and os.path.isdir(package_dir):
+                app_entry_points[entry_point.name] = (entry_point.module_name, package_dir)
+
+        _app_entry_points = OrderedDict(sorted(app_entry_points.items()))
+
+    return _app_entry_points
+
+
+def get_installed_tethys_apps(refresh=False):
+    """
+    Returns a dictionary mapping the app package name of the installed apps to the absolute path of the app package,
+    ordered like the discovery backend lists them.
+    """
+    if get_discovery_backend() == ENTRY_POINTS_DISCOVERY:
+        return OrderedDict((app_package, package_dir)
+                           for app_package, (module_name, package_dir) in get_app_entry_points(refresh).items())
+
     tethysapp_dir = get_tethysapp_dir()
 
     tethysapp_contents = os.listdir(tethysapp_dir)
 
-    tethys_apps = {}
+    tethys_apps = OrderedDict()
 
     for item in tethysapp_contents:
         item_path = os.path.join(tethysapp_dir, item)
         if os.path.isdir(item_path):
             tethys_apps[item] = item_path
 
-    return tethys_apps
\ No newline at end of file
+    return tethys_apps
+
+
+def format_table(header, rows):
+    """
+    Returns the lines of a plain text table with left-aligned columns as wide as their longest value.
+
+    Args:
+      header(tuple): The column titles.
+      rows(list): The rows, tuples of strings with one value per column.
+
+    Returns:
+      list: The header line followed by one line per row.
+    """
+    widths = [max(len(row[column]) for row in [header] + list(rows)) for column in range(len(header))]
+    row_format = '  '.join('{{{0}:<{1}}}'.format(column, width) for column, width in enumerate(widths))
+
+    return [row_format.format(*row) for row in [header] + list(rows)]
@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from multiprocessing import Pool, cpu_count
+
+from django.core.management.base import BaseCommand, CommandError, make_option
+
+from tethys_apps.terminal_colors import TerminalColors
+from tethys_apps.utilities import TethysAppsStaticFinder, get_static_build_root, STATIC_BUILD_MANIFEST_NAME
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Patterns of the files that are skipped, same as the collectstatic defaults
+IGNORE_PATTERNS = ['CVS', '.*', '*~']
+
+# Extensions of the files that are worth compressing
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.html', '.svg', '.txt', '.xml', '.map', '.eot', '.ttf')
+
+
+def build_asset(args):
+    """
+    Write the content-hashed copy of a static file and its compressed siblings. Runs in a worker process.
+
+    Args:
+      args(tuple): The absolute path of the source file, its prefixed static path and the output directory.
+
+    Returns:
+      tuple: The static path, the hashed static path and the sizes of the original, gzip and brotli files.
+    """
+    source_path, static_path, output_dir = args
+
+    with open(source_path, 'rb') as source_file:
+        content = source_file.read()
+
+    # Insert the hash before the extension (e.g.: "my_app/js/main.1a2b3c4d5e6f.js")
+    root, extension = os.path.splitext(static_path)
+    hashed_path = '{0}.{1}{2}'.format(root, hashlib.md5(content).hexdigest()[:12], extension)
+    destination_path = os.path.join(output_dir, *hashed_path.split('/'))
+
+    destination_dir = os.path.dirname(destination_path)
+
+    if not os.path.isdir(destination_dir):
+        try:
+            os.makedirs(destination_dir)
+        except OSError:
+            # Created by another worker in the meantime
+            if not os.path.isdir(destination_dir):
+                raise
+
+    with open(destination_path, 'wb') as destination_file:
+        destination_file.write(content)
+
+    gzip_size = brotli_size = None
+
+    if extension.lower() in COMPRESSIBLE_EXTENSIONS:
+        # Fixed mtime so that unchanged files produce identical archives
+        with open(destination_path + '.gz', 'wb') as gzip_file:
+            compressed_file = gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=gzip_file, mtime=0)
+            compressed_file.write(content)
+            compressed_file.close()
+            gzip_size = gzip_file.tell()
+
+        if brotli is not None:
+            compressed = brotli.compress(content)
+
+            with open(destination_path + '.br', 'wb') as brotli_file:
+                brotli_file.write(compressed)
+
+            brotli_size = len(compressed)
+
+    return static_path, hashed_path, len(content), gzip_size, brotli_size
+
+
+class Command(BaseCommand):
+    """
+    Command class that handles the buildstatic command. Writes content-hashed and precompressed copies of the static
+    files of the Tethys apps, so that they can be served with far-future cache headers, and a manifest used by the
+    tethys_static template tag. Write the copies to STATIC_ROOT after collectstatic so that relative urls in
+    stylesheets still resolve to the original files.
+    """
+    option_list = BaseCommand.option_list + (
+        make_option('-o', '--output',
+                    dest='output',
+                    help='Directory to write the files to. Defaults to TETHYS_APPS_STATIC_BUILD_ROOT or STATIC_ROOT.'),
+        make_option('-p', '--processes',
+                    type='int',
+                    dest='processes',
+                    help='Number of worker processes. Defaults to the number of CPUs.')
+    )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command
+        """
+        start = time.time()
+        output_dir = options['output'] or get_static_build_root()
+
+        if not output_dir:
+            raise CommandError('No output directory. Set STATIC_ROOT or use the "--output" option.')
+
+        # List the static files of the Tethys apps
+        finder = TethysAppsStaticFinder()
+        assets = []
+
+        for path, storage in finder.list(IGNORE_PATTERNS):
+            static_path = '/'.join((storage.prefix, path.replace(os.sep, '/')))
+            assets.append((storage.path(path), static_path, output_dir))
+
+        self.stdout.write(TerminalColors.BLUE + 'Building {0} Tethys app static files in "{1}"...'.format(
+            len(assets), output_dir) + TerminalColors.ENDC)
+
+        # Build the files in parallel
+        pool = Pool(options['processes'] or cpu_count())
+
+        try:
+            results = pool.map(build_asset, assets, chunksize=16)
+        finally:
+            pool.close()
+            pool.join()
+
+        paths = dict()
+        original_total = compressed_total = 0
+
+        for static_path, hashed_path, original_size, gzip_size, brotli_size in results:
+            paths[static_path] = hashed_path
+            original_total += original_size
+            compressed_total += min(size for size in (original_size, gzip_size, brotli_size) if size is not None)
+
+        # Write the manifest last so that it never points to files that have not been written
+        manifest_path = os.path.join(output_dir, STATIC_BUILD_MANIFEST_NAME)
+        temporary_path = '{0}.{1}.tmp'.format(manifest_path, os.getpid())
+
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump({'paths': paths}, manifest_file, indent=2, sort_keys=True)
+
+        os.rename(temporary_path, manifest_path)
+
+        self.stdout.write('Built {0} files ({1} bytes, {2} bytes compressed{3}) in {4:.2f} seconds.'.format(
+            len(results),
+            original_total,
+            compressed_total,
+            '' if brotli is not None else ', brotli not installed',
+            time.time() - start
+        ))
@@ -0,0 +1,90 @@
+import json
+
+from django.core.management.base import BaseCommand, make_option
+
+from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.terminal_colors import TerminalColors
+
+# Phases of the harvest of each app package in the order they run
+HARVEST_PHASES = ('import', 'discovery', 'instantiation')
+
+
+class Command(BaseCommand):
+    """
+    Command class that handles the harvestreport command. Reports the wall time, CPU time, resident memory and new
+    modules used to import, discover and instantiate each Tethys app when the apps were harvested by this process.
+    """
+    option_list = BaseCommand.option_list + (
+        make_option('--json',
+                    action='store_true',
+                    dest='json',
+                    default=False,
+                    help='Write the report as JSON instead of a table.'),
+        make_option('-o', '--output',
+                    dest='output',
+                    help='Write the JSON report to the file given.')
+    )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command
+        """
+        harvest_report = SingletonAppHarvester().harvest_report
+
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                json.dump(harvest_report, report_file, indent=2)
+
+            self.stdout.write('Harvest report written to "{0}".'.format(options['output']))
+            return
+
+        if options['json']:
+            self.stdout.write(json.dumps(harvest_report, indent=2))
+            return
+
+        self.write_table(harvest_report)
+
+    def write_table(self, harvest_report):
+        """
+        Write the harvest report as a table with the slowest app packages first.
+        """
+        self.stdout.write(TerminalColors.BLUE + 'Tethys Apps Harvest Report:' + TerminalColors.ENDC)
+        row_format = '{0:<24} {1:<9} {2:<14} {3:>9} {4:>9} {5:>11} {6:>8}'
+        self.stdout.write(row_format.format('Package', 'Source', 'Phase', 'Wall (s)', 'CPU (s)', 'RSS (KiB)',
+                                            'Modules'))
+
+        def total_wall_time(entry):
+            return sum(phase['wall_time'] for phase in entry['phases'].values())
+
+        totals = {'wall_time': 0, 'cpu_time': 0, 'rss_delta': 0, 'new_modules': 0}
+
+        for entry in sorted(harvest_report, key=total_wall_time, reverse=True):
+            package, source = entry['package'], entry['source']
+
+            for phase_name in HARVEST_PHASES:
+                phase = entry['phases'].get(phase_name)
+
+                if phase is None:
+                    continue
+
+                self.stdout.write(row_format.format(package[:24], source, phase_name,
+                                                    '{0:.3f}'.format(phase['wall_time']),
+                                                    '{0:.3f}'.format(phase['cpu_time']),
+                                                    phase['rss_delta'] // 1024,
+                                                    phase['new_modules']))
+
+                for key in totals:
+                    totals[key] += phase[key]
+
+                # Only name the package on its first row
+                package = source = ''
+
+            if entry['prewarm_time'] is not None:
+                self.stdout.write(row_format.format('', '', 'pre-warm', '{0:.3f}'.format(entry['prewarm_time']),
+                                                    '', '', ''))
+
+        self.stdout.write(row_format.format('Total', '', '',
+                                            '{0:.3f}'.format(totals['wall_time']),
+                                            '{0:.3f}'.format(totals['cpu_time']),
+                                            totals['rss_delta'] // 1024,
+                                            totals['new_modules']))
@@ -1,11 +1,41 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
 from django.core.management.base import BaseCommand, make_option
 from django.conf import settings
 
 from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.base.persistent_store import PersistentStoreEngineRegistry, PersistentStoreIndex
+from tethys_apps.helpers import format_table
 from tethys_apps.terminal_colors import TerminalColors
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 
 ALL_APPS = 'all'
+GOLDEN_SUFFIX = 'golden'
+
+
+class PersistentStoreTask(object):
+    """
+    Provisioning state and timing of one persistent store in the syncstores plan.
+    """
+
+    def __init__(self, app, persistent_store):
+        """
+        Constructor
+        """
+        self.app = app
+        self.persistent_store = persistent_store
+        self.full_db_name = '_'.join((app.package, persistent_store.name))
+        self.golden_db_name = '_'.join((self.full_db_name, GOLDEN_SUFFIX))
+        self.initializer_hash = None
+        self.new_database = True
+        self.cloned = False
+        self.provision_time = 0.0
+        self.initialize_time = 0.0
+
 
 class Command(BaseCommand):
     """
@@ -25,7 +55,18 @@ class Command(BaseCommand):
                     help='Call with this option to force the initializer functions to be executed with '
                          '"first_time" parameter True.'),
         make_option('-d', '--database',
-                    help='Name of database to sync.')
+                    help='Name of database to sync.'),
+        make_option('-j', '--jobs',
+                    type='int',
+                    dest='jobs',
+                    default=1,
+                    help='Number of persistent stores to provision in parallel. Defaults to 1.'),
+        make_option('-t', '--template',
+                    action='store_true',
+                    dest='template',
+                    default=False,
+                    help='Keep a golden template copy of each initialized database and create refreshed databases '
+                         'from it. The initializer is only run again when its module has changed.')
     )
 
     def handle(self, *args, **options):
@@ -38,8 +79,11 @@ class Command(BaseCommand):
         """
         Provision all persistent stores for all apps or for only the app name given.
         """
-        # Set refresh parameter
-        database_refresh = options['refresh']
+        # Set refresh and first time parameters
+        self.database_refresh = options['refresh']
+        self.first_time = options['first_time']
+        self.use_template = options.get('template', False)
+        jobs = max(options.get('jobs') or 1, 1)
 
         # Get the app harvester
         app_harvester = SingletonAppHarvester()
@@ -77,179 +121,360 @@ class Command(BaseCommand):
                                                                          database_manager_db['PORT'] if 'PORT' in database_manager_db else '5435',
                                                                          database_manager_db['NAME'] if 'NAME' in database_manager_db else 'tethys_db_manager')
 
-        database_manager_name = database_manager_url.split('://')[1].split(':')[0]
+        self.database_manager_name = database_manager_url.split('://')[1].split(':')[0]
+
+        # Create connection engine with a connection for each job
+        self.engine = create_engine(database_manager_url, pool_size=jobs)
+
+        #--------------------------------------------------------------------------------------------------------------#
+        # Assemble the provisioning plan: one task per target persistent store, grouped by app
+        #--------------------------------------------------------------------------------------------------------------#
+        app_tasks = OrderedDict()
+
+        for app in target_apps:
+            persistent_stores = app.persistent_stores()
+
+            if persistent_stores:
+                for persistent_store in persistent_stores:
+                    # Target the persistent store provided or all persistent stores
+                    if not options['database'] or options['database'] == persistent_store.name:
+                        app_tasks.setdefault(app.package, []).append(PersistentStoreTask(app, persistent_store))
+
+        tasks = [task for persistent_store_tasks in app_tasks.values() for task in persistent_store_tasks]
 
         #--------------------------------------------------------------------------------------------------------------#
         # Get a list of existing databases
         #--------------------------------------------------------------------------------------------------------------#
+        self.persistent_store_index = PersistentStoreIndex()
+        self.existing_db_names = self.persistent_store_index.refresh([task.full_db_name for task in tasks])
 
-        # Create connection engine
-        engine = create_engine(database_manager_url)
+        # Get the initializer hashes recorded on the golden template databases
+        self.golden_hashes = self.get_golden_hashes(tasks) if self.use_template else {}
 
-        # Cannot create databases in a transaction: connect and commit to close transaction
-        connection = engine.connect()
+        try:
+            self.provision_apps(app_tasks, jobs)
+        finally:
+            self.engine.dispose()
 
-        # Check for Database
-        existing_dbs_statement = '''
-                                 SELECT d.datname as name
-                                 FROM pg_catalog.pg_database d
-                                 LEFT JOIN pg_catalog.pg_user u ON d.datdba = u.usesysid
-                                 ORDER BY 1;
-                                 '''
+            # Let the running server processes know that databases were dropped or created
+            if tasks:
+                self.persistent_store_index.invalidate()
 
-        existing_dbs = connection.execute(existing_dbs_statement)
-        connection.close()
+        if tasks:
+            self.write_summary(tasks)
 
-        # Compile list of db names
-        existing_db_names = []
+    def provision_apps(self, app_tasks, jobs):
+        """
+        Provision the persistent stores of the apps given and run the initializers of each app. Steps 1-3 are
+        independent for each persistent store. Step 4 runs the initializers of an app as soon as all of the persistent
+        stores of that app are provisioned, in the job that provisioned the last of them, while the persistent stores of
+        the other apps are still being provisioned. The initializers of an app are not run if any of its persistent
+        stores failed to provision.
+
+        Args:
+          app_tasks(OrderedDict): The tasks of each app, by app package name.
+          jobs(int): Number of persistent stores to provision in parallel.
+        """
+        pending_counts = dict((app_package, len(tasks)) for app_package, tasks in app_tasks.items())
+        pending_lock = threading.Lock()
 
-        for existing_db in existing_dbs:
-            existing_db_names.append(existing_db.name)
+        def provision_persistent_store(task):
+            self.provision_persistent_store(task)
 
-        # Get apps and provision persistent stores if not already created
-        for app in target_apps:
-            # Create multiple persistent stores if necessary
-            persistent_stores = app.persistent_stores()
+            with pending_lock:
+                pending_counts[task.app.package] -= 1
+                app_provisioned = pending_counts[task.app.package] == 0
 
-            if persistent_stores:
-                # Assemble list of target persistent stores
-                target_persistent_stores = []
-
-                # Target the persistent store provided
-                if options['database']:
-                    for persistent_store in persistent_stores:
-                        if options['database'] == persistent_store.name:
-                            target_persistent_stores.append(persistent_store)
-
-                # Target all persistent stores
-                else:
-                    target_persistent_stores = persistent_stores
-
-                for persistent_store in target_persistent_stores:
-                    full_db_name = '_'.join((app.package, persistent_store.name))
-                    new_database = True
-
-                    #--------------------------------------------------------------------------------------------------#
-                    # 1. Drop database if refresh option is included
-                    #--------------------------------------------------------------------------------------------------#
-                    if database_refresh and full_db_name in existing_db_names:
-                        # Provide update for user
-                        self.stdout.write('Dropping database {2}"{0}"{3} for app {2}"{1}"{3}...'.format(
-                            persistent_store.name,
-                            app.package,
-                            TerminalColors.BLUE,
-                            TerminalColors.ENDC
-                        ))
-
-                        # Connection
-                        delete_connection = engine.connect()
-
-                        # Drop db
-                        drop_db_statement = 'DROP DATABASE IF EXISTS {0}'.format(full_db_name)
-
-                        # Close transaction first then execute.
-                        delete_connection.execute('commit')
-                        delete_connection.execute(drop_db_statement)
-                        delete_connection.close()
-
-                        # Update the existing dbs query
-                        existing_db_names.pop(existing_db_names.index(full_db_name))
-
-                    #--------------------------------------------------------------------------------------------------#
-                    # 2. Create the database if it does not already exist
-                    #--------------------------------------------------------------------------------------------------#
-                    if full_db_name not in existing_db_names:
-                        # Provide Update for User
-                        self.stdout.write('Creating database {2}"{0}"{3} for app {2}"{1}"{3}...'.format(
-                            persistent_store.name,
-                            app.package,
-                            TerminalColors.BLUE,
-                            TerminalColors.ENDC
-                        ))
-
-                        # Cannot create databases in a transaction: connect and commit to close transaction
-                        create_connection = engine.connect()
-
-                        # Create db
-                        create_db_statement = '''
-                                              CREATE DATABASE {0}
-                                              WITH OWNER {1}
-                                              TEMPLATE template0
-                                              ENCODING 'UTF8'
-                                              '''.format(full_db_name, database_manager_name)
-
-                        # Close transaction first and then execute
-                        create_connection.execute('commit')
-                        create_connection.execute(create_db_statement)
-                        create_connection.close()
-
-                    else:
-                        # Provide Update for User
-                        self.stdout.write('Database {2}"{0}"{3} already exists for app {2}"{1}"{3}, skipping...'.format(
-                            persistent_store.name,
-                            app.package,
-                            TerminalColors.BLUE,
-                            TerminalColors.ENDC
-                        ))
-
-                        # Set var that is passed to initialization functions
-                        new_database = False
-
-                    #--------------------------------------------------------------------------------------------------#
-                    # 3. Enable PostGIS extension
-                    #--------------------------------------------------------------------------------------------------#
-                    if (hasattr(persistent_store, 'spatial') and persistent_store.spatial) or persistent_store.postgis:
-                        # Get URL for Tethys Superuser to enable extensions
-                        super_db = settings.TETHYS_DATABASES['tethys_super']
-                        super_url = 'postgresql://{0}:{1}@{2}:{3}/{4}'.format(super_db['USER'] if 'USER' in super_db else 'tethys_super',
-                                                                              super_db['PASSWORD'] if 'PASSWORD' in super_db else 'pass',
-                                                                              super_db['HOST'] if 'HOST' in super_db else '127.0.0.1',
-                                                                              super_db['PORT'] if 'PORT' in super_db else '5435',
-                                                                              super_db['NAME'] if 'NAME' in super_db else 'tethys_super')
-                        super_parts = super_url.split('/')
-                        new_db_url = '{0}//{1}/{2}'.format(super_parts[0], super_parts[2], full_db_name)
-
-                        # Connect to new database
-                        new_db_engine = create_engine(new_db_url)
-                        new_db_connection = new_db_engine.connect()
-
-                        # Notify user
-                        self.stdout.write('Enabling PostGIS on database {2}"{0}"{3} for app {2}"{1}"{3}...'.format(
-                            persistent_store.name,
-                            app.package,
-                            TerminalColors.BLUE,
-                            TerminalColors.ENDC
-                        ))
-                        enable_postgis_statement = 'CREATE EXTENSION IF NOT EXISTS postgis'
-
-                        # Execute postgis statement
-                        new_db_connection.execute(enable_postgis_statement)
-                        new_db_connection.close()
-
-                #------------------------------------------------------------------------------------------------------#
-                # 4. Run initialization functions for each store here
-                #------------------------------------------------------------------------------------------------------#
-                for persistent_store in target_persistent_stores:
-                    # Split into module name and function name
-                    initializer_mod, initializer_function = persistent_store.initializer.split(':')
-
-                    self.stdout.write('Initializing database {3}"{0}"{4} for app {3}"{1}"{4} using initializer '
-                                      '{3}"{2}"{4}...'.format(persistent_store.name,
-                                                              app.package,
-                                                              initializer_function,
-                                                              TerminalColors.BLUE,
-                                                              TerminalColors.ENDC
-                                                              ))
-
-                    # Pre-process initializer path
-                    initializer_path = '.'.join(('tethys_apps.tethysapp', app.package, initializer_mod))
-
-                    # Import module
-                    module = __import__(initializer_path, fromlist=[initializer_function])
-
-                    # Get the function
-                    initializer = getattr(module, initializer_function)
-                    if options['first_time']:
-                        initializer(True)
-                    else:
-                        initializer(new_database)
+            if app_provisioned:
+                self.initialize_persistent_stores(app_tasks[task.app.package])
+
+        self._run_jobs(provision_persistent_store,
+                       [task for persistent_store_tasks in app_tasks.values() for task in persistent_store_tasks],
+                       jobs)
+
+    @staticmethod
+    def _run_jobs(function, items, jobs):
+        """
+        Call the function with each item, using a pool of threads when more than one job is allowed.
+        """
+        if jobs < 2 or len(items) < 2:
+            return [function(item) for item in items]
+
+        pool = ThreadPool(min(jobs, len(items)))
+
+        try:
+            return pool.map(function, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def provision_persistent_store(self, task):
+        """
+        Drop (on refresh), create and enable PostGIS on the persistent store database of the task given.
+        """
+        start = time.time()
+        persistent_store = task.persistent_store
+        app = task.app
+        full_db_name = task.full_db_name
+
+        #--------------------------------------------------------------------------------------------------------------#
+        # 1. Drop database if refresh option is included
+        #--------------------------------------------------------------------------------------------------------------#
+        if self.database_refresh and full_db_name in self.existing_db_names:
+            # Provide update for user
+            self.stdout.write('Dropping database {2}"{0}"{3} for app {2}"{1}"{3}...'.format(
+                persistent_store.name,
+                app.package,
+                TerminalColors.BLUE,
+                TerminalColors.ENDC
+            ))
+
+            # Release pooled connections to the database so that it can be dropped
+            PersistentStoreEngineRegistry().dispose(app.package, persistent_store.name)
+
+            # Connection
+            delete_connection = self.engine.connect()
+
+            # Drop db
+            drop_db_statement = 'DROP DATABASE IF EXISTS {0}'.format(full_db_name)
+
+            # Close transaction first then execute.
+            delete_connection.execute('commit')
+            delete_connection.execute(drop_db_statement)
+            delete_connection.close()
+
+            # Update the existing dbs query
+            self.existing_db_names.discard(full_db_name)
+            self.persistent_store_index.discard(full_db_name)
+
+        #--------------------------------------------------------------------------------------------------------------#
+        # 2. Create the database if it does not already exist
+        #--------------------------------------------------------------------------------------------------------------#
+        if full_db_name not in self.existing_db_names:
+            # Provide Update for User
+            self.stdout.write('Creating database {2}"{0}"{3} for app {2}"{1}"{3}...'.format(
+                persistent_store.name,
+                app.package,
+                TerminalColors.BLUE,
+                TerminalColors.ENDC
+            ))
+
+            # Clone the golden template database if the initializer has not changed since it was taken
+            template_db_name = 'template0'
+
+            if self.use_template and not self.first_time:
+                task.initializer_hash = self.get_initializer_hash(task)
+
+                if self.golden_hashes.get(task.golden_db_name) == task.initializer_hash:
+                    template_db_name = task.golden_db_name
+                    task.cloned = True
+
+            # Cannot create databases in a transaction: connect and commit to close transaction
+            create_connection = self.engine.connect()
+
+            # Create db
+            create_db_statement = '''
+                                  CREATE DATABASE {0}
+                                  WITH OWNER {1}
+                                  TEMPLATE {2}
+                                  ENCODING 'UTF8'
+                                  '''.format(full_db_name, self.database_manager_name, template_db_name)
+
+            # Close transaction first and then execute
+            create_connection.execute('commit')
+            create_connection.execute(create_db_statement)
+            create_connection.close()
+
+            # Update the existing dbs query
+            self.existing_db_names.add(full_db_name)
+            self.persistent_store_index.add(full_db_name)
+
+        else:
+            # Provide Update for User
+            self.stdout.write('Database {2}"{0}"{3} already exists for app {2}"{1}"{3}, skipping...'.format(
+                persistent_store.name,
+                app.package,
+                TerminalColors.BLUE,
+                TerminalColors.ENDC
+            ))
+
+            # Set var that is passed to initialization functions
+            task.new_database = False
+
+        #--------------------------------------------------------------------------------------------------------------#
+        # 3. Enable PostGIS extension
+        #--------------------------------------------------------------------------------------------------------------#
+        if ((hasattr(persistent_store, 'spatial') and persistent_store.spatial) or persistent_store.postgis) \
+                and not task.cloned:
+            # Get URL for Tethys Superuser to enable extensions
+            super_db = settings.TETHYS_DATABASES['tethys_super']
+            super_url = 'postgresql://{0}:{1}@{2}:{3}/{4}'.format(super_db['USER'] if 'USER' in super_db else 'tethys_super',
+                                                                  super_db['PASSWORD'] if 'PASSWORD' in super_db else 'pass',
+                                                                  super_db['HOST'] if 'HOST' in super_db else '127.0.0.1',
+                                                                  super_db['PORT'] if 'PORT' in super_db else '5435',
+                                                                  super_db['NAME'] if 'NAME' in super_db else 'tethys_super')
+            super_parts = super_url.split('/')
+            new_db_url = '{0}//{1}/{2}'.format(super_parts[0], super_parts[2], full_db_name)
+
+            # Connect to new database
+            new_db_engine = create_engine(new_db_url)
+            new_db_connection = new_db_engine.connect()
+
+            # Notify user
+            self.stdout.write('Enabling PostGIS on database {2}"{0}"{3} for app {2}"{1}"{3}...'.format(
+                persistent_store.name,
+                app.package,
+                TerminalColors.BLUE,
+                TerminalColors.ENDC
+            ))
+            enable_postgis_statement = 'CREATE EXTENSION IF NOT EXISTS postgis'
+
+            # Execute postgis statement
+            new_db_connection.execute(enable_postgis_statement)
+            new_db_connection.close()
+            new_db_engine.dispose()
+
+        task.provision_time = time.time() - start
+
+    def initialize_persistent_stores(self, tasks):
+        """
+        Run the initialization functions for the persistent stores of one app in the order they were registered.
+        """
+        #--------------------------------------------------------------------------------------------------------------#
+        # 4. Run initialization functions for each store here
+        #--------------------------------------------------------------------------------------------------------------#
+        for task in tasks:
+            start = time.time()
+            persistent_store = task.persistent_store
+
+            # Databases cloned from a golden template are already initialized
+            if task.cloned:
+                self.stdout.write('Database {2}"{0}"{3} for app {2}"{1}"{3} created from template, skipping '
+                                  'initializer...'.format(persistent_store.name,
+                                                          task.app.package,
+                                                          TerminalColors.BLUE,
+                                                          TerminalColors.ENDC))
+                continue
+
+            # Split into module name and function name
+            initializer_mod, initializer_function = persistent_store.initializer.split(':')
+
+            self.stdout.write('Initializing database {3}"{0}"{4} for app {3}"{1}"{4} using initializer '
+                              '{3}"{2}"{4}...'.format(persistent_store.name,
+                                                      task.app.package,
+                                                      initializer_function,
+                                                      TerminalColors.BLUE,
+                                                      TerminalColors.ENDC
+                                                      ))
+
+            # Pre-process initializer path
+            initializer_path = '.'.join(('tethys_apps.tethysapp', task.app.package, initializer_mod))
+
+            # Import module
+            module = __import__(initializer_path, fromlist=[initializer_function])
+
+            # Get the function
+            initializer = getattr(module, initializer_function)
+            if self.first_time:
+                initializer(True)
+            else:
+                initializer(task.new_database)
+
+            # Take a new golden template if it is missing or out of date
+            if self.use_template:
+                task.initializer_hash = task.initializer_hash or self.get_initializer_hash(task)
+
+                if self.golden_hashes.get(task.golden_db_name) != task.initializer_hash:
+                    self.snapshot_persistent_store(task)
+
+            task.initialize_time = time.time() - start
+
+    def get_golden_hashes(self, tasks):
+        """
+        Returns a dictionary mapping the names of the existing golden template databases to the initializer hash
+        recorded in their comment.
+        """
+        golden_dbs_statement = text('SELECT d.datname as name, '
+                                    "shobj_description(d.oid, 'pg_catalog.pg_database') as description "
+                                    'FROM pg_catalog.pg_database d '
+                                    'WHERE d.datname = ANY(:names)')
+
+        connection = self.engine.connect()
+
+        try:
+            golden_dbs = connection.execute(golden_dbs_statement, names=[task.golden_db_name for task in tasks])
+            return dict((golden_db.name, golden_db.description) for golden_db in golden_dbs)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def get_initializer_hash(task):
+        """
+        Returns the SHA-1 hash of the source of the module that contains the initializer of the task given.
+        """
+        initializer_mod = task.persistent_store.initializer.split(':')[0]
+        initializer_path = '.'.join(('tethys_apps.tethysapp', task.app.package, initializer_mod))
+        module = __import__(initializer_path, fromlist=[''])
+
+        # Hash the source rather than the compiled module
+        module_file = module.__file__
+
+        if module_file.endswith(('.pyc', '.pyo')):
+            module_file = module_file[:-1]
+
+        with open(module_file, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def snapshot_persistent_store(self, task):
+        """
+        Copy the initialized persistent store database to its golden template database and record the initializer hash.
+        """
+        self.stdout.write('Saving template of database {2}"{0}"{3} for app {2}"{1}"{3}...'.format(
+            task.persistent_store.name,
+            task.app.package,
+            TerminalColors.BLUE,
+            TerminalColors.ENDC
+        ))
+
+        # A database cannot be copied while other sessions are connected to it
+        PersistentStoreEngineRegistry().dispose(task.app.package, task.persistent_store.name)
+
+        snapshot_connection = self.engine.connect()
+
+        # Close transaction first and then execute each statement that cannot run in a transaction
+        snapshot_connection.execute('commit')
+        snapshot_connection.execute('DROP DATABASE IF EXISTS {0}'.format(task.golden_db_name))
+        snapshot_connection.execute('commit')
+        snapshot_connection.execute('CREATE DATABASE {0} WITH OWNER {1} TEMPLATE {2}'.format(
+            task.golden_db_name,
+            self.database_manager_name,
+            task.full_db_name
+        ))
+
+        # Record the initializer hash the template was taken with
+        snapshot_connection.execute("COMMENT ON DATABASE {0} IS '{1}'".format(task.golden_db_name,
+                                                                              task.initializer_hash))
+        snapshot_connection.execute('commit')
+        snapshot_connection.close()
+
+        self.golden_hashes[task.golden_db_name] = task.initializer_hash
+
+    def write_summary(self, tasks):
+        """
+        Write a table with the time spent provisioning and initializing each persistent store.
+        """
+        header = ('App', 'Persistent Store', 'Database', 'Provision (s)', 'Initialize (s)', 'Total (s)')
+        rows = []
+
+        for task in tasks:
+            rows.append((task.app.package,
+                         task.persistent_store.name,
+                         'cloned' if task.cloned else 'created' if task.new_database else 'existing',
+                         '{0:.2f}'.format(task.provision_time),
+                         '{0:.2f}'.format(task.initialize_time),
+                         '{0:.2f}'.format(task.provision_time + task.initialize_time)))
+
+        self.stdout.write(TerminalColors.BLUE + '\nPersistent Store Summary:' + TerminalColors.ENDC)
+
+        for line in format_table(header, rows):
+            self.stdout.write(line)
@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError, make_option
+
+from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.helpers import format_table
+from tethys_apps.terminal_colors import TerminalColors
+from tethys_apps.warmup import warm_up_apps
+
+
+class Command(BaseCommand):
+    """
+    Command class that handles the warmup command. Imports the controllers, parses the templates and creates the
+    persistent store engines of the harvested apps and exits with an error if anything failed to load, so that it can
+    be used as a startup probe. The command runs in its own process: it only primes the bytecode and the file cache of
+    the OS for the server processes, which load the apps again. Call tethys_apps.warmup.warm_up_apps() from wsgi.py to
+    warm up the server processes themselves.
+    """
+    option_list = BaseCommand.option_list + (
+        make_option('-a', '--app',
+                    dest='app',
+                    help='Package name of the app to warm up. Defaults to all apps.'),
+        make_option('-j', '--jobs',
+                    type='int',
+                    dest='jobs',
+                    default=4,
+                    help='Number of apps to warm up in parallel. Defaults to 4.'),
+        make_option('--no-engines',
+                    action='store_false',
+                    dest='engines',
+                    default=True,
+                    help='Do not create the persistent store engines.')
+    )
+
+    def handle(self, *args, **options):
+        """
+        Handle the command
+        """
+        start = time.time()
+
+        if options['app'] and not any(app.package == options['app'] for app in SingletonAppHarvester().apps):
+            raise CommandError('No app named "{0}" is installed.'.format(options['app']))
+
+        self.stdout.write(TerminalColors.BLUE + 'Warming up Tethys apps...' + TerminalColors.ENDC)
+
+        tasks = warm_up_apps(app_package=options['app'], jobs=options['jobs'], engines=options['engines'])
+
+        self.write_summary(tasks)
+        self.stdout.write('Warmed up {0} apps in {1:.2f} seconds.'.format(len(tasks), time.time() - start))
+
+        errors = [(task.app.package, error) for task in tasks for error in task.errors]
+
+        if errors:
+            for app_package, error in errors:
+                self.stderr.write('ERROR: {0}: {1}'.format(app_package, error))
+
+            raise CommandError('{0} errors while warming up the apps.'.format(len(errors)))
+
+    def write_summary(self, tasks):
+        """
+        Write a table with the time spent warming up each app, slowest first.
+        """
+        header = ('App', 'Controllers', 'Templates', 'Engines', 'Controllers (s)', 'Templates (s)', 'Engines (s)',
+                  'Total (s)')
+        rows = []
+
+        for task in sorted(tasks, key=lambda task: task.total_time, reverse=True):
+            rows.append((task.app.package,
+                         str(task.controllers),
+                         str(task.templates),
+                         str(task.engines),
+                         '{0:.2f}'.format(task.controller_time),
+                         '{0:.2f}'.format(task.template_time),
+                         '{0:.2f}'.format(task.engine_time),
+                         '{0:.2f}'.format(task.total_time)))
+
+        self.stdout.write(TerminalColors.BLUE + '\nWarm-up Summary:' + TerminalColors.ENDC)
+
+        for line in format_table(header, rows):
+            self.stdout.write(line)
@@ -0,0 +1,40 @@
+import os
+import threading
+
+from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.app_installation import get_reload_marker_path
+
+# Connect the receivers that clear the caches built from the apps
+import tethys_apps.utilities
+
+
+class TethysAppsReloadMiddleware(object):
+    """
+    Reload the apps that were installed or changed since they were harvested without restarting the server. Apps
+    installed with the custom install and develop commands touch a marker file in the tethysapp directory. The apps
+    are reharvested on the next request each process serves after the marker was touched.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self._lock = threading.Lock()
+        self.marker_path = get_reload_marker_path()
+
+    def _is_stale(self, harvester):
+        """
+        Returns True if the marker was touched after the apps were harvested.
+        """
+        try:
+            return os.path.getmtime(self.marker_path) > harvester.harvested_at
+        except OSError:
+            return False
+
+    def process_request(self, request):
+        harvester = SingletonAppHarvester()
+
+        if self._is_stale(harvester):
+            with self._lock:
+                if self._is_stale(harvester):
+                    harvester.reharvest()
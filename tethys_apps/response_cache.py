@@ -0,0 +1,182 @@
+import hashlib
+import time
+
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.utils.cache import patch_response_headers, patch_vary_headers
+from django.utils.encoding import force_bytes
+
+# Prefix of the cache keys of the Tethys apps responses
+CACHE_KEY_PREFIX = 'tethys_apps'
+
+
+def get_app_cache_generation(cache, app_root_url):
+    """
+    Returns the current generation of the cached responses of the app given. Responses are cached under the generation
+    so that purging an app only needs to start a new generation.
+    """
+    generation_key = ':'.join((CACHE_KEY_PREFIX, app_root_url, 'generation'))
+    generation = cache.get(generation_key)
+
+    if generation is None:
+        # Start from the time so that an evicted generation is never reused
+        cache.add(generation_key, int(time.time() * 1000), None)
+        generation = cache.get(generation_key)
+
+    return generation
+
+
+def purge_app_cache(app_root_url, cache_alias=None):
+    """
+    Purge the cached responses of an app.
+
+    Args:
+      app_root_url(string): The root url of the app (e.g.: "my-first-app").
+      cache_alias(string, optional): Alias of the cache to purge. Defaults to the caches used by the url maps of the
+        app.
+
+    Example:
+
+    ::
+
+        from tethys_apps.sdk import purge_app_cache
+
+        purge_app_cache('my-first-app')
+    """
+    if cache_alias:
+        cache_aliases = [cache_alias]
+    else:
+        # Imported here, the harvester imports the url maps that use this module
+        from tethys_apps.app_harvester import SingletonAppHarvester
+
+        cache_aliases = set([DEFAULT_CACHE_ALIAS])
+
+        for app in SingletonAppHarvester().apps:
+            if app.root_url == app_root_url and hasattr(app, 'url_maps'):
+                cache_aliases.update(getattr(url_map, 'cache_alias', None) or DEFAULT_CACHE_ALIAS
+                                     for url_map in app.url_maps())
+
+    generation_key = ':'.join((CACHE_KEY_PREFIX, app_root_url, 'generation'))
+
+    for alias in cache_aliases:
+        cache = caches[alias]
+
+        try:
+            cache.incr(generation_key)
+        except ValueError:
+            cache.set(generation_key, int(time.time() * 1000), None)
+
+
+class CachedController(object):
+    """
+    Wraps a controller to cache its successful responses to GET and HEAD requests. Responses are cached per full path
+    and the values of the request headers given in vary_on, under a key namespaced by the app root url. The responses
+    to authenticated users are also cached per cookie. Like the Django cache middleware, responses that set cookies,
+    use the CSRF token or depend on the session are not cached.
+    """
+
+    def __init__(self, view, app_root_url, cache_timeout, vary_on=None, cache_alias=None):
+        """
+        Constructor
+        """
+        self.view = view
+        self.app_root_url = app_root_url
+        self.cache_timeout = cache_timeout
+        self.vary_on = list(vary_on or ())
+        self.cache_alias = cache_alias or DEFAULT_CACHE_ALIAS
+
+        # Django names views by module and name
+        self.__module__ = view.__module__
+        self.__name__ = view.__name__
+
+    def __repr__(self):
+        """
+        String representation
+        """
+        return '<CachedController: {0!r}>'.format(self.view)
+
+    @staticmethod
+    def is_authenticated(request):
+        """
+        Returns True if the user of the request given is authenticated, without marking the session as accessed.
+        """
+        user = getattr(request, 'user', None)
+        session = getattr(request, 'session', None)
+
+        if user is None:
+            return False
+
+        accessed = getattr(session, 'accessed', False)
+
+        try:
+            return user.is_authenticated()
+        finally:
+            if session is not None:
+                session.accessed = accessed
+
+    def get_vary_on(self, request):
+        """
+        Returns the request headers that the response to the request given is cached per.
+        """
+        if 'Cookie' not in self.vary_on and self.is_authenticated(request):
+            return self.vary_on + ['Cookie']
+
+        return self.vary_on
+
+    def get_cache_key(self, cache, request, vary_on=None):
+        """
+        Returns the cache key of the response to the request given.
+        """
+        request_hash = hashlib.md5(force_bytes(request.get_full_path()))
+
+        for header in self.vary_on if vary_on is None else vary_on:
+            meta_key = header.upper().replace('-', '_')
+
+            if meta_key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                meta_key = 'HTTP_' + meta_key
+
+            request_hash.update(b'\n' + force_bytes(request.META.get(meta_key, '')))
+
+        return ':'.join((CACHE_KEY_PREFIX, self.app_root_url, str(get_app_cache_generation(cache, self.app_root_url)),
+                         request.method, request_hash.hexdigest()))
+
+    def __call__(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return self.view(request, *args, **kwargs)
+
+        cache = caches[self.cache_alias]
+        vary_on = self.get_vary_on(request)
+        cache_key = self.get_cache_key(cache, request, vary_on)
+        response = cache.get(cache_key)
+
+        if response is not None:
+            return response
+
+        response = self.view(request, *args, **kwargs)
+
+        if response.status_code != 200 or response.streaming:
+            return response
+
+        # Template responses are rendered after the view returns
+        if hasattr(response, 'render') and callable(response.render) and not response.is_rendered:
+            response.render()
+
+        # Responses that are specific to the client
+        if response.cookies or request.META.get('CSRF_COOKIE_USED') or \
+                getattr(getattr(request, 'session', None), 'accessed', False):
+            return response
+
+        patch_response_headers(response, self.cache_timeout)
+
+        if vary_on:
+            patch_vary_headers(response, vary_on)
+
+        cache.set(cache_key, response, self.cache_timeout)
+
+        return response
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the wrapper (e.g.: csrf_exempt)
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return getattr(self.view, name)
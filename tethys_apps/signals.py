@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after SingletonAppHarvester.reharvest() has replaced the apps of the app packages that were added, changed or
+# removed. Receivers clear the caches that were built from the previous apps.
+apps_reharvested = Signal(providing_args=['app_packages'])
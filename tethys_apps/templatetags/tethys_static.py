@@ -0,0 +1,22 @@
+from django import template
+from django.contrib.staticfiles.templatetags.staticfiles import static
+
+from tethys_apps.utilities import get_static_build_manifest
+
+register = template.Library()
+
+
+@register.simple_tag
+def tethys_static(path):
+    """
+    Returns the url of the content-hashed copy of a static file written by the buildstatic command. Falls back to the
+    regular static url if the file has not been built.
+
+    Example:
+
+    ::
+
+        {% load tethys_static %}
+        <script src="{% tethys_static 'my_first_app/js/main.js' %}"></script>
+    """
+    return static(get_static_build_manifest().get(path, path))
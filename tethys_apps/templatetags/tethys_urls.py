@@ -0,0 +1,20 @@
+from django import template
+
+from tethys_apps.utilities import tethys_reverse
+
+register = template.Library()
+
+
+@register.simple_tag
+def tethys_url(viewname, *args, **kwargs):
+    """
+    Returns the url of an app url map like the url tag, but from the reverse table built when the apps were harvested.
+
+    Example:
+
+    ::
+
+        {% load tethys_urls %}
+        <a href="{% tethys_url 'my_first_app:resource' resource.id %}">{{ resource.name }}</a>
+    """
+    return tethys_reverse(viewname, args=args, kwargs=kwargs)
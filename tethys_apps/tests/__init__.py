@@ -0,0 +1,26 @@
+"""
+Tests for Tethys Apps. Run them in a Tethys Platform project with "python manage.py test tethys_apps". Outside of a
+project, minimal settings are configured when the tests are imported (e.g.: "python setup.py test").
+"""
+import os
+
+from django.conf import settings
+
+if not settings.configured and not os.environ.get('DJANGO_SETTINGS_MODULE'):
+    import django
+
+    settings.configure(
+        SECRET_KEY='tethys_apps_tests',
+        INSTALLED_APPS=('django.contrib.contenttypes',
+                        'django.contrib.auth',
+                        'django.contrib.sessions',
+                        'django.contrib.staticfiles',
+                        'tethys_apps'),
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        TETHYS_DATABASES={'tethys_db_manager': {}, 'tethys_super': {}},
+        ROOT_URLCONF='tethys_apps.urls',
+        STATIC_URL='/static/',
+    )
+
+    django.setup()
@@ -0,0 +1,91 @@
+import imp
+import os
+import shutil
+import sys
+import tempfile
+
+from tethys_apps.helpers import get_tethysapp_dir
+
+
+class AppPackages(object):
+    """
+    Temporary app packages that can be imported as "tethys_apps.tethysapp.<app_package>" like installed apps.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.root = tempfile.mkdtemp()
+        self.app_packages = []
+
+        try:
+            self.tethysapp = __import__('tethys_apps.tethysapp', fromlist=[''])
+        except ImportError:
+            # The tethysapp directory only becomes a package when an app is installed
+            import tethys_apps
+            self.tethysapp = imp.new_module('tethys_apps.tethysapp')
+            self.tethysapp.__path__ = [get_tethysapp_dir()]
+            sys.modules['tethys_apps.tethysapp'] = self.tethysapp
+            tethys_apps.tethysapp = self.tethysapp
+
+        self.tethysapp.__path__.append(self.root)
+
+    def add(self, app_package, files, root=None):
+        """
+        Write an app package with the files given and return its directory.
+
+        Args:
+          app_package(string): Name of the app package.
+          files(dict): Source of each file keyed by path relative to the app package.
+          root(string, optional): Directory to write the app package in. Defaults to the tethysapp path.
+        """
+        package_dir = os.path.join(root or self.root, app_package)
+        files = dict(files)
+        files.setdefault('__init__.py', '')
+
+        for relative_path, source in files.items():
+            self.write(package_dir, relative_path, source)
+
+        self.app_packages.append(app_package)
+        return package_dir
+
+    @staticmethod
+    def write(package_dir, relative_path, source):
+        """
+        Write a file of an app package.
+        """
+        path = os.path.join(package_dir, relative_path)
+
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        with open(path, 'w') as source_file:
+            source_file.write(source)
+
+        # Remove the bytecode, a rewrite within the same second would not invalidate it
+        for bytecode_path in (path + 'c', path + 'o'):
+            if os.path.exists(bytecode_path):
+                os.remove(bytecode_path)
+
+    def unload(self):
+        """
+        Remove the modules of the app packages from the imported modules.
+        """
+        for module_name in list(sys.modules):
+            for app_package in self.app_packages:
+                for prefix in ('tethys_apps.tethysapp.', 'tethysapp.'):
+                    if module_name == prefix + app_package or module_name.startswith(prefix + app_package + '.'):
+                        sys.modules.pop(module_name, None)
+
+        for app_package in self.app_packages:
+            if hasattr(self.tethysapp, app_package):
+                delattr(self.tethysapp, app_package)
+
+    def cleanup(self):
+        """
+        Unload and delete the app packages.
+        """
+        self.unload()
+        self.tethysapp.__path__.remove(self.root)
+        shutil.rmtree(self.root)
@@ -0,0 +1,79 @@
+import os
+import sys
+
+from django.test import SimpleTestCase
+
+from tethys_apps.app_harvester import alias_app_packages, app_package_alias_importer
+from tethys_apps.tests.app_packages import AppPackages
+
+DISTRIBUTION_PACKAGE = 'tethys_test_distribution'
+APP_PACKAGE = 'tethys_test_alias'
+MODULE_NAME = '.'.join([DISTRIBUTION_PACKAGE, APP_PACKAGE])
+ALIAS = '.'.join(['tethys_apps.tethysapp', APP_PACKAGE])
+
+MODEL_SOURCE = '''
+class Base(object):
+    pass
+'''
+
+CONTROLLERS_SOURCE = '''
+from tethys_test_distribution.tethys_test_alias.model import Base
+
+
+def home(request):
+    return Base
+'''
+
+
+class AppPackageAliasTests(SimpleTestCase):
+    """
+    The modules of an app package discovered from an entry point are the same objects under the alias the url maps
+    use and under the name the app imports them by.
+    """
+
+    def setUp(self):
+        self.app_packages = AppPackages()
+
+        # The distribution is on the path like an installed app distribution, not in the tethysapp directory
+        distribution_root = os.path.join(self.app_packages.root, 'distribution')
+        self.app_packages.write(distribution_root, os.path.join(DISTRIBUTION_PACKAGE, '__init__.py'), '')
+        package_dir = self.app_packages.add(APP_PACKAGE, {'model.py': MODEL_SOURCE,
+                                                          'controllers.py': CONTROLLERS_SOURCE},
+                                            root=os.path.join(distribution_root, DISTRIBUTION_PACKAGE))
+        sys.path.insert(0, distribution_root)
+        self.distribution_root = distribution_root
+
+        alias_app_packages({APP_PACKAGE: (MODULE_NAME, package_dir)})
+
+    def tearDown(self):
+        self.app_packages.unload()
+
+        for module_name in list(sys.modules):
+            if module_name == DISTRIBUTION_PACKAGE or module_name.startswith(DISTRIBUTION_PACKAGE + '.'):
+                del sys.modules[module_name]
+
+        sys.path.remove(self.distribution_root)
+        app_package_alias_importer.aliases.pop(ALIAS, None)
+        self.app_packages.cleanup()
+
+    def test_package(self):
+        self.assertIs(sys.modules[ALIAS], sys.modules[MODULE_NAME])
+
+    def test_submodules_imported_through_alias_first(self):
+        controllers = __import__(ALIAS + '.controllers', fromlist=[''])
+        model = __import__(MODULE_NAME + '.model', fromlist=[''])
+
+        self.assertIs(controllers, sys.modules[MODULE_NAME + '.controllers'])
+        self.assertIs(__import__(ALIAS + '.model', fromlist=['']), model)
+
+        # The controllers use the same declarative base as the app
+        self.assertIs(controllers.home(None), model.Base)
+
+    def test_submodules_imported_by_name_first(self):
+        model = __import__(MODULE_NAME + '.model', fromlist=[''])
+        self.assertIs(__import__(ALIAS + '.model', fromlist=['']), model)
+
+    def test_other_modules_are_not_aliased(self):
+        self.assertIsNone(app_package_alias_importer.find_module('tethys_apps.tethysapp'))
+        self.assertIsNone(app_package_alias_importer.find_module('tethys_apps.tethysapp.other_app.model'))
+        self.assertIsNone(app_package_alias_importer.find_module(MODULE_NAME + '.model'))
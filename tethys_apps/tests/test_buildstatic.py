@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from tethys_apps import utilities
+from tethys_apps.management.commands.buildstatic import build_asset
+from tethys_apps.utilities import STATIC_BUILD_MANIFEST_NAME
+
+MAIN_JS = 'console.log("Hello, Tethys!");\n' * 10
+
+
+@override_settings(TETHYS_APPS_STATIC_MANIFEST=None)
+class BuildStaticTests(SimpleTestCase):
+    """
+    The static files of the apps are copied to content-hashed names next to their gzip copies and listed in a manifest.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.static_dir = os.path.join(self.root, 'test_app', 'public')
+        self.output_dir = os.path.join(self.root, 'build')
+
+        os.makedirs(os.path.join(self.static_dir, 'js'))
+        os.makedirs(os.path.join(self.static_dir, 'images'))
+
+        with open(os.path.join(self.static_dir, 'js', 'main.js'), 'wb') as static_file:
+            static_file.write(MAIN_JS)
+
+        with open(os.path.join(self.static_dir, 'images', 'icon.gif'), 'wb') as static_file:
+            static_file.write('GIF89a')
+
+        self.get_directories_in_tethys_apps = utilities.get_directories_in_tethys_apps
+        utilities.get_directories_in_tethys_apps = lambda directory_names, with_app_name=False: [
+            ('test_app', self.static_dir)]
+
+    def tearDown(self):
+        utilities.get_directories_in_tethys_apps = self.get_directories_in_tethys_apps
+        shutil.rmtree(self.root)
+
+    def test_build_asset(self):
+        static_path, hashed_path, original_size, gzip_size, brotli_size = build_asset(
+            (os.path.join(self.static_dir, 'js', 'main.js'), 'test_app/js/main.js', self.output_dir))
+
+        self.assertEqual(static_path, 'test_app/js/main.js')
+        self.assertEqual(hashed_path, 'test_app/js/main.{0}.js'.format(hashlib.md5(MAIN_JS).hexdigest()[:12]))
+        self.assertEqual(original_size, len(MAIN_JS))
+
+        destination_path = os.path.join(self.output_dir, *hashed_path.split('/'))
+
+        with open(destination_path, 'rb') as destination_file:
+            self.assertEqual(destination_file.read(), MAIN_JS)
+
+        compressed_file = gzip.open(destination_path + '.gz', 'rb')
+
+        try:
+            self.assertEqual(compressed_file.read(), MAIN_JS)
+        finally:
+            compressed_file.close()
+
+        self.assertEqual(os.path.getsize(destination_path + '.gz'), gzip_size)
+        self.assertLess(gzip_size, original_size)
+
+    def test_not_compressible(self):
+        static_path, hashed_path, original_size, gzip_size, brotli_size = build_asset(
+            (os.path.join(self.static_dir, 'images', 'icon.gif'), 'test_app/images/icon.gif', self.output_dir))
+
+        self.assertIsNone(gzip_size)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, *hashed_path.split('/')) + '.gz'))
+
+    def test_command(self):
+        call_command('buildstatic', output=self.output_dir, processes=1, stdout=StringIO(), stderr=StringIO())
+
+        with open(os.path.join(self.output_dir, STATIC_BUILD_MANIFEST_NAME)) as manifest_file:
+            paths = json.load(manifest_file)['paths']
+
+        self.assertEqual(paths, {
+            'test_app/js/main.js': 'test_app/js/main.{0}.js'.format(hashlib.md5(MAIN_JS).hexdigest()[:12]),
+            'test_app/images/icon.gif': 'test_app/images/icon.{0}.gif'.format(hashlib.md5('GIF89a').hexdigest()[:12])
+        })
+
+        for hashed_path in paths.values():
+            self.assertTrue(os.path.isfile(os.path.join(self.output_dir, *hashed_path.split('/'))))
+
+    @override_settings(STATIC_ROOT=None, TETHYS_APPS_STATIC_BUILD_ROOT=None)
+    def test_no_output_directory(self):
+        with self.assertRaises(CommandError):
+            call_command('buildstatic', stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,39 @@
+from django.test import RequestFactory, SimpleTestCase
+
+from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.context_processors import tethys_apps_context
+
+
+class TethysAppsContextTests(SimpleTestCase):
+    """
+    The context processor adds the metadata of the app of the request as a dictionary.
+    """
+
+    def setUp(self):
+        self.harvester = SingletonAppHarvester()
+        self.app_contexts = self.harvester.app_contexts
+        self.harvester.app_contexts = {'test-app': {'name': 'Test App', 'index': 'test_app:home',
+                                                    'icon': 'test_app/images/icon.gif', 'color': '#ffffff'}}
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        self.harvester.app_contexts = self.app_contexts
+
+    def test_app_page(self):
+        context = tethys_apps_context(self.factory.get('/apps/test-app/items/42/'))
+        self.assertEqual(context['tethys_app']['name'], 'Test App')
+        self.assertEqual(context['tethys_app']['index'], 'test_app:home')
+
+    def test_app_root(self):
+        context = tethys_apps_context(self.factory.get('/apps/test-app'))
+        self.assertEqual(context['tethys_app']['name'], 'Test App')
+
+    def test_not_an_app_page(self):
+        self.assertIsNone(tethys_apps_context(self.factory.get('/apps/'))['tethys_app'])
+        self.assertIsNone(tethys_apps_context(self.factory.get('/apps/other-app/'))['tethys_app'])
+        self.assertIsNone(tethys_apps_context(self.factory.get('/user/test-app/'))['tethys_app'])
+
+    def test_context_is_not_shared(self):
+        context = tethys_apps_context(self.factory.get('/apps/test-app/'))
+        context['tethys_app']['name'] = 'Changed'
+        self.assertEqual(tethys_apps_context(self.factory.get('/apps/test-app/'))['tethys_app']['name'], 'Test App')
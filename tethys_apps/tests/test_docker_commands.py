@@ -0,0 +1,380 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from StringIO import StringIO
+
+from django.test import SimpleTestCase
+
+from tethys_apps.cli import docker_commands
+from tethys_apps.cli.docker_commands import (POSTGIS_CONTAINER, GEOSERVER_CONTAINER, N52WPS_CONTAINER,
+                                             REQUIRED_DOCKER_CONTAINERS, DOCKER_ENVIRONMENT_VARIABLES,
+                                             MAX_CLIENT_DOCKER_API_VERSION)
+
+
+class FakeDockerClient(object):
+    """
+    Stands in for the docker-py client with containers that are started and stopped in memory.
+    """
+
+    host = '127.0.0.1'
+
+    def __init__(self, installed=REQUIRED_DOCKER_CONTAINERS):
+        """
+        Constructor
+        """
+        self.installed = list(installed)
+        self.running = set()
+        self.container_requests = 0
+        self.started = []
+
+    def containers(self, all=False):
+        self.container_requests += 1
+        return [{'Names': ['/' + container_name],
+                 'Image': 'ciwater/{0}:latest'.format(container_name),
+                 'Status': 'Up 5 minutes' if container_name in self.running else 'Exited (0) 5 minutes ago',
+                 'Ports': [{'PrivatePort': 5432, 'PublicPort': 5435}] if container_name in self.running else []}
+                for container_name in self.installed]
+
+    def start(self, container, port_bindings=None):
+        self.started.append(container)
+        self.running.add(container)
+
+    def stop(self, container):
+        self.running.discard(container)
+
+
+class DockerCommandsTestCase(SimpleTestCase):
+    """
+    Replaces the Docker client and captures the output of the commands.
+    """
+
+    def setUp(self):
+        self.docker_client = FakeDockerClient()
+        self.module_attributes = dict((name, getattr(docker_commands, name))
+                                      for name in ('get_docker_client', 'get_readiness_checks', 'WAIT_INITIAL_DELAY'))
+        docker_commands.get_docker_client = lambda: self.docker_client
+        docker_commands.WAIT_INITIAL_DELAY = 0.01
+        self.stdout = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+
+        for name, value in self.module_attributes.items():
+            setattr(docker_commands, name, value)
+
+
+class DockerStartTests(DockerCommandsTestCase):
+    """
+    Starting the containers waits for their services to be ready when asked to.
+    """
+
+    def setUp(self):
+        super(DockerStartTests, self).setUp()
+        self.checks = dict((container_name, 0) for container_name in REQUIRED_DOCKER_CONTAINERS)
+        self.ready_after = {POSTGIS_CONTAINER: 3, GEOSERVER_CONTAINER: 1, N52WPS_CONTAINER: 1}
+
+        def readiness_check(container_name):
+            def is_ready(timeout):
+                self.checks[container_name] += 1
+                return self.checks[container_name] >= self.ready_after[container_name]
+
+            return container_name, is_ready
+
+        docker_commands.get_readiness_checks = lambda docker_client: dict(
+            (container_name, readiness_check(container_name)) for container_name in REQUIRED_DOCKER_CONTAINERS)
+
+    def test_start_and_wait(self):
+        docker_commands.docker_start(wait=True, timeout=5)
+
+        self.assertEqual(sorted(self.docker_client.started), sorted(REQUIRED_DOCKER_CONTAINERS))
+        self.assertEqual(self.checks[POSTGIS_CONTAINER], 3)
+        self.assertEqual(self.checks[GEOSERVER_CONTAINER], 1)
+        self.assertIn('Services ready in', sys.stdout.getvalue())
+
+    def test_start_without_wait(self):
+        docker_commands.docker_start(container='postgis')
+
+        self.assertEqual(self.docker_client.started, [POSTGIS_CONTAINER])
+        self.assertEqual(sum(self.checks.values()), 0)
+
+    def test_not_ready_in_time(self):
+        self.ready_after[POSTGIS_CONTAINER] = float('inf')
+
+        self.assertRaises(SystemExit, docker_commands.docker_start, wait=True, timeout=0.1)
+        self.assertIn('ERROR: The services were not ready', sys.stdout.getvalue())
+
+    def test_restart_and_wait(self):
+        self.docker_client.running.add(POSTGIS_CONTAINER)
+        docker_commands.docker_restart(container='postgis', wait=True, timeout=5)
+
+        self.assertEqual(self.docker_client.started, [POSTGIS_CONTAINER])
+        self.assertEqual(self.checks[POSTGIS_CONTAINER], 3)
+        self.assertIn('Services ready in', sys.stdout.getvalue())
+
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with the status of the server.
+    """
+
+    def do_GET(self):
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpReadinessTests(SimpleTestCase):
+    """
+    GeoServer is ready when its REST endpoint answers or asks for credentials. The WPS is ready when GetCapabilities
+    succeeds. Tomcat answers 404 while the applications are still deploying.
+    """
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), StatusRequestHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+        self.ports = (docker_commands.DEFAULT_GEOSERVER_PORT, docker_commands.DEFAULT_N52WPS_PORT)
+        docker_commands.DEFAULT_GEOSERVER_PORT = docker_commands.DEFAULT_N52WPS_PORT = str(self.server.server_port)
+        self.readiness_checks = docker_commands.get_readiness_checks(FakeDockerClient())
+
+    def tearDown(self):
+        docker_commands.DEFAULT_GEOSERVER_PORT, docker_commands.DEFAULT_N52WPS_PORT = self.ports
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+
+    def is_ready(self, container_name, status):
+        self.server.status = status
+        return self.readiness_checks[container_name][1](5)
+
+    def test_geoserver(self):
+        self.assertTrue(self.is_ready(GEOSERVER_CONTAINER, 200))
+        self.assertTrue(self.is_ready(GEOSERVER_CONTAINER, 401))
+        self.assertTrue(self.is_ready(GEOSERVER_CONTAINER, 403))
+        self.assertFalse(self.is_ready(GEOSERVER_CONTAINER, 404))
+        self.assertFalse(self.is_ready(GEOSERVER_CONTAINER, 503))
+
+    def test_wps(self):
+        self.assertTrue(self.is_ready(N52WPS_CONTAINER, 200))
+        self.assertFalse(self.is_ready(N52WPS_CONTAINER, 401))
+        self.assertFalse(self.is_ready(N52WPS_CONTAINER, 404))
+        self.assertFalse(self.is_ready(N52WPS_CONTAINER, 500))
+
+
+class ContainerSnapshotTests(DockerCommandsTestCase):
+    """
+    The state of the containers is read with a single request and shared by the checks of a command.
+    """
+
+    def setUp(self):
+        super(ContainerSnapshotTests, self).setUp()
+        self.docker_client = FakeDockerClient(installed=(POSTGIS_CONTAINER, GEOSERVER_CONTAINER))
+        self.docker_client.running.add(POSTGIS_CONTAINER)
+
+    def test_state(self):
+        snapshot = docker_commands.ContainerSnapshot(self.docker_client)
+
+        self.assertEqual(self.docker_client.container_requests, 1)
+        self.assertEqual(snapshot.get_state(POSTGIS_CONTAINER), 'running')
+        self.assertEqual(snapshot.get_state(GEOSERVER_CONTAINER), 'stopped')
+        self.assertEqual(snapshot.get_state(N52WPS_CONTAINER), 'not installed')
+        self.assertEqual(snapshot.get_public_port(POSTGIS_CONTAINER), 5435)
+        self.assertIsNone(snapshot.get_public_port(GEOSERVER_CONTAINER))
+        self.assertEqual(docker_commands.get_docker_container_status(self.docker_client, snapshot=snapshot),
+                         {POSTGIS_CONTAINER: True, GEOSERVER_CONTAINER: False})
+        self.assertEqual(self.docker_client.container_requests, 1)
+
+    def test_as_dict(self):
+        snapshot_dict = docker_commands.ContainerSnapshot(self.docker_client).as_dict()
+
+        self.assertEqual(snapshot_dict[POSTGIS_CONTAINER], {'state': 'running',
+                                                            'image': 'ciwater/tethys_postgis:latest',
+                                                            'status': 'Up 5 minutes',
+                                                            'port': 5435})
+        self.assertEqual(snapshot_dict[N52WPS_CONTAINER], {'state': 'not installed', 'image': None, 'status': None,
+                                                           'port': None})
+
+    def test_docker_status(self):
+        docker_commands.docker_status()
+
+        self.assertEqual(sys.stdout.getvalue().splitlines(), ['PostGIS/Database: Running', 'GeoServer: Stopped',
+                                                              '52 North WPS: Not Installed'])
+        self.assertEqual(self.docker_client.container_requests, 1)
+
+    def test_docker_status_json(self):
+        docker_commands.docker_status(as_json=True)
+
+        self.assertEqual(json.loads(sys.stdout.getvalue()),
+                         docker_commands.ContainerSnapshot(self.docker_client).as_dict())
+
+    def test_start_reads_containers_once(self):
+        docker_commands.docker_start(container='geoserver')
+
+        self.assertEqual(self.docker_client.started, [GEOSERVER_CONTAINER])
+        self.assertEqual(self.docker_client.container_requests, 1)
+
+
+class ImagePullProgressTests(DockerCommandsTestCase):
+    """
+    The pull summary lists the size, duration and outcome of each image.
+    """
+
+    def test_write_summary(self):
+        progress = docker_commands.ImagePullProgress(['ciwater/postgis:latest', 'ciwater/geoserver:latest'],
+                                                     stream=StringIO())
+        progress.start('ciwater/postgis:latest')
+        progress.update('ciwater/postgis:latest', {'id': 'a', 'status': 'Downloading',
+                                                   'progressDetail': {'current': 1048576, 'total': 2097152}})
+        progress.update('ciwater/postgis:latest', {'id': 'b', 'status': 'Pull complete'})
+        progress.finish('ciwater/postgis:latest')
+        progress.finish('ciwater/geoserver:latest', error='not found')
+        progress.write_summary()
+
+        self.assertEqual([line.split() for line in sys.stdout.getvalue().splitlines()],
+                         [[],
+                          ['Pull', 'Summary:'],
+                          ['Image', 'Layers', 'Size', '(MB)', 'Time', '(s)', 'Status'],
+                          ['ciwater/postgis:latest', '2', '2.0', '0.00', 'Pulled'],
+                          ['ciwater/geoserver:latest', '0', '0.0', '0.00', 'Failed']])
+
+
+class FakeDockerAPIClient(object):
+    """
+    Stands in for the docker-py client class and counts the requests for the API version of the daemon.
+    """
+
+    version_requests = 0
+    reachable = True
+
+    def __init__(self, **kwargs):
+        """
+        Constructor
+        """
+        self.kwargs = kwargs
+
+    def version(self):
+        FakeDockerAPIClient.version_requests += 1
+        return {'ApiVersion': '1.18'}
+
+    def ping(self):
+        if not FakeDockerAPIClient.reachable:
+            # Like the ConnectionError of requests
+            raise IOError('Connection refused')
+
+        return 'OK'
+
+
+class NoBoot2Docker(object):
+    """
+    Stands in for the subprocess module on a host without boot2docker.
+    """
+
+    @staticmethod
+    def Popen(*args, **kwargs):
+        raise OSError('No such file or directory')
+
+
+class DockerClientCacheTests(SimpleTestCase):
+    """
+    The settings of the Docker client are cached per environment for a limited time.
+    """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.module_attributes = dict((name, getattr(docker_commands, name))
+                                      for name in ('DOCKER_CLIENT_CACHE_PATH', 'DockerClient', 'subprocess'))
+        self.environment = dict((variable, os.environ.get(variable)) for variable in DOCKER_ENVIRONMENT_VARIABLES)
+        docker_commands.DOCKER_CLIENT_CACHE_PATH = os.path.join(self.cache_dir, '.tethys', 'docker_client.json')
+        docker_commands.DockerClient = FakeDockerAPIClient
+        docker_commands.subprocess = NoBoot2Docker
+        FakeDockerAPIClient.version_requests = 0
+        FakeDockerAPIClient.reachable = True
+
+        for variable in DOCKER_ENVIRONMENT_VARIABLES:
+            os.environ.pop(variable, None)
+
+    def tearDown(self):
+        for name, value in self.module_attributes.items():
+            setattr(docker_commands, name, value)
+
+        for variable, value in self.environment.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+        shutil.rmtree(self.cache_dir)
+
+    def test_round_trip(self):
+        key = docker_commands.get_docker_client_cache_key()
+        docker_commands.write_docker_client_cache(key, '1.17', '127.0.0.1', base_url='unix://var/run/docker.sock')
+        cached = docker_commands.read_docker_client_cache()
+
+        self.assertEqual((cached['version'], cached['host'], cached['base_url']),
+                         ('1.17', '127.0.0.1', 'unix://var/run/docker.sock'))
+
+    def test_other_environment(self):
+        docker_commands.write_docker_client_cache(docker_commands.get_docker_client_cache_key(), '1.17', '127.0.0.1',
+                                                  base_url='unix://var/run/docker.sock')
+        os.environ['DOCKER_HOST'] = 'tcp://192.168.59.103:2376'
+
+        self.assertIsNone(docker_commands.read_docker_client_cache())
+
+    def test_expired(self):
+        docker_commands.write_docker_client_cache(docker_commands.get_docker_client_cache_key(), '1.17', '127.0.0.1',
+                                                  base_url='unix://var/run/docker.sock')
+
+        with open(docker_commands.DOCKER_CLIENT_CACHE_PATH) as cache_file:
+            cached = json.load(cache_file)
+
+        cached['cached_at'] = time.time() - docker_commands.DOCKER_CLIENT_CACHE_TTL
+
+        with open(docker_commands.DOCKER_CLIENT_CACHE_PATH, 'w') as cache_file:
+            json.dump(cached, cache_file)
+
+        self.assertIsNone(docker_commands.read_docker_client_cache())
+
+    def test_clear(self):
+        docker_commands.write_docker_client_cache(docker_commands.get_docker_client_cache_key(), '1.17', '127.0.0.1',
+                                                  base_url='unix://var/run/docker.sock')
+        docker_commands.clear_docker_client_cache()
+        docker_commands.clear_docker_client_cache()
+
+        self.assertIsNone(docker_commands.read_docker_client_cache())
+
+    def test_get_docker_client(self):
+        expected_version = docker_commands.get_api_version(MAX_CLIENT_DOCKER_API_VERSION, '1.18')
+
+        # The first client negotiates the API version with the daemon
+        docker_client = docker_commands.get_docker_client()
+        self.assertEqual(FakeDockerAPIClient.version_requests, 1)
+        self.assertEqual(docker_client.kwargs, {'base_url': 'unix://var/run/docker.sock',
+                                                'version': expected_version})
+        self.assertTrue(os.path.exists(docker_commands.DOCKER_CLIENT_CACHE_PATH))
+
+        # The next clients are created from the cache
+        docker_client = docker_commands.get_docker_client()
+        self.assertEqual(FakeDockerAPIClient.version_requests, 1)
+        self.assertEqual(docker_client.kwargs, {'base_url': 'unix://var/run/docker.sock',
+                                                'version': expected_version})
+        self.assertEqual(docker_client.host, docker_commands.DEFAULT_DOCKER_HOST)
+
+    def test_cached_docker_client_unreachable(self):
+        expected_version = docker_commands.get_api_version(MAX_CLIENT_DOCKER_API_VERSION, '1.18')
+        docker_commands.write_docker_client_cache(docker_commands.get_docker_client_cache_key(), '1.12', '127.0.0.1',
+                                                  base_url='unix://var/run/docker.sock')
+        FakeDockerAPIClient.reachable = False
+
+        # The daemon is asked for its API version again instead of using the cached one
+        docker_client = docker_commands.get_docker_client()
+        self.assertEqual(FakeDockerAPIClient.version_requests, 1)
+        self.assertEqual(docker_client.kwargs['version'], expected_version)
+        self.assertEqual(docker_commands.read_docker_client_cache()['version'], expected_version)
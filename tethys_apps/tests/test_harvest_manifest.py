@@ -0,0 +1,172 @@
+import json
+import os
+import sys
+from StringIO import StringIO
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from tethys_apps.app_harvester import SingletonAppHarvester, LazyTethysApp, HARVEST_MANIFEST_VERSION
+from tethys_apps.base.url_map import LazyController
+from tethys_apps.tests.app_packages import AppPackages
+
+APP_PACKAGE = 'tethys_test_manifest'
+
+APP_SOURCE = '''
+from tethys_apps.base import TethysAppBase, url_map_maker, PersistentStore
+
+
+class ManifestTestApp(TethysAppBase):
+    name = '{name}'
+    index = 'tethys-test-manifest:home'
+    icon = 'tethys_test_manifest/images/icon.gif'
+    package = 'tethys_test_manifest'
+    root_url = 'tethys-test-manifest'
+    color = 'abcdef'
+    description = 'Not recorded in the manifest'
+
+    def url_maps(self):
+        UrlMap = url_map_maker(self.root_url)
+        return (UrlMap(name='home', url='tethys-test-manifest', controller='tethys_test_manifest.controllers.home'),
+                UrlMap(name='item', url='tethys-test-manifest/items/{{item_id:int}}',
+                       controller='tethys_test_manifest.controllers.item', cache_timeout=60, vary_on=['Cookie']))
+
+    def persistent_stores(self):
+        return (PersistentStore(name='example_db', initializer='init_stores:init_example_db', spatial=True),)
+'''
+
+CONTROLLERS_SOURCE = '''
+def home(request):
+    return 'home'
+
+
+def item(request, item_id):
+    return item_id
+'''
+
+
+def describe_url_maps(app):
+    return [(url_map.name, url_map.url, url_map.controller, url_map.converters, url_map.cache_timeout,
+             url_map.vary_on) for url_map in app.url_maps()]
+
+
+class HarvestManifestTests(SimpleTestCase):
+    """
+    Apps of unchanged app packages are loaded from the harvest manifest without importing their app module.
+    """
+
+    def setUp(self):
+        self.app_packages = AppPackages()
+        self.package_dir = self.app_packages.add(APP_PACKAGE, {'app.py': APP_SOURCE.format(name='Manifest Test'),
+                                                               'controllers.py': CONTROLLERS_SOURCE})
+        self.manifest_path = os.path.join(self.app_packages.root, 'harvest.json')
+        self.settings_override = override_settings(TETHYS_APPS_HARVEST_MANIFEST=self.manifest_path)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.app_packages.cleanup()
+
+    def harvest(self, unload=True):
+        # A harvester that is not the process-wide singleton
+        harvester = object.__new__(SingletonAppHarvester)
+        harvester.package_dirs = {APP_PACKAGE: self.package_dir}
+        harvester._harvest_app_instances([APP_PACKAGE])
+
+        if unload:
+            self.app_packages.unload()
+
+        return harvester
+
+    def test_manifest_round_trip(self):
+        module_harvester = self.harvest(unload=False)
+        self.assertEqual(module_harvester.harvest_report[0]['source'], 'module')
+
+        module_app = module_harvester.apps[0]
+        module_url_maps = describe_url_maps(module_app)
+        module_persistent_stores = [vars(store) for store in module_app.persistent_stores()]
+        self.app_packages.unload()
+
+        with open(self.manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+
+        self.assertEqual(manifest['version'], HARVEST_MANIFEST_VERSION)
+        self.assertIn(APP_PACKAGE, manifest['apps'])
+
+        manifest_harvester = self.harvest()
+        self.assertEqual(manifest_harvester.harvest_report[0]['source'], 'manifest')
+
+        manifest_app = manifest_harvester.apps[0]
+        self.assertIsInstance(manifest_app, LazyTethysApp)
+
+        for attribute in ('name', 'index', 'icon', 'package', 'root_url', 'color'):
+            self.assertEqual(getattr(manifest_app, attribute), getattr(module_app, attribute))
+
+        self.assertEqual(manifest_app.color, '#abcdef')
+        self.assertEqual(describe_url_maps(manifest_app), module_url_maps)
+        self.assertEqual([vars(store) for store in manifest_app.persistent_stores()], module_persistent_stores)
+        self.assertEqual(manifest_harvester.app_contexts, module_harvester.app_contexts)
+        self.assertEqual(manifest_harvester.version, module_harvester.version)
+        self.assertEqual(sorted(manifest_harvester.reverse_table), sorted(module_harvester.reverse_table))
+
+    def test_manifest_app_is_lazy(self):
+        self.harvest()
+        app = self.harvest().apps[0]
+        app_module_name = 'tethys_apps.tethysapp.{0}.app'.format(APP_PACKAGE)
+
+        # The metadata, url maps and controllers do not need the app module
+        self.assertEqual(app.name, 'Manifest Test')
+        url_map = app.url_maps()[1]
+        self.assertIsInstance(url_map.view, LazyController)
+        self.assertNotIn(app_module_name, sys.modules)
+
+        # Other attributes import it
+        self.assertEqual(app.description, 'Not recorded in the manifest')
+        self.assertIn(app_module_name, sys.modules)
+
+        # The converters recorded in the manifest still apply
+        self.assertEqual(url_map.view(None, item_id='42'), 42)
+
+    def test_changed_app_module_is_imported(self):
+        self.harvest()
+        self.app_packages.write(self.package_dir, 'app.py', APP_SOURCE.format(name='Changed'))
+
+        harvester = self.harvest()
+        self.assertEqual(harvester.harvest_report[0]['source'], 'module')
+        self.assertEqual(harvester.apps[0].name, 'Changed')
+        self.assertEqual(self.harvest().harvest_report[0]['source'], 'manifest')
+
+    def test_changed_module_is_imported(self):
+        # The url maps or persistent stores may depend on any module of the app package
+        self.harvest()
+        self.app_packages.write(self.package_dir, 'controllers.py', CONTROLLERS_SOURCE + '\n')
+
+        self.assertEqual(self.harvest().harvest_report[0]['source'], 'module')
+        self.assertEqual(self.harvest().harvest_report[0]['source'], 'manifest')
+
+    def test_unwritable_manifest(self):
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+
+        try:
+            with override_settings(TETHYS_APPS_HARVEST_MANIFEST=os.path.join(self.manifest_path, 'missing', 'h.json')):
+                harvester = self.harvest()
+        finally:
+            output = sys.stdout.getvalue()
+            sys.stdout = stdout
+
+        self.assertEqual(harvester.apps[0].name, 'Manifest Test')
+        self.assertIn('Could not write the harvest manifest', output)
+
+    def test_manifest_of_another_version_is_ignored(self):
+        self.harvest()
+
+        with open(self.manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+
+        manifest['version'] = HARVEST_MANIFEST_VERSION - 1
+
+        with open(self.manifest_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        self.assertEqual(self.harvest().harvest_report[0]['source'], 'module')
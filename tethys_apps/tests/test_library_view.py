@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase, RequestFactory
+from django.test.utils import override_settings
+
+from tethys_apps import views
+from tethys_apps.app_harvester import SingletonAppHarvester
+
+PAGE_SOURCE = '''<html>{% block styles %}{% endblock %}{% block primary_content %}{% endblock %}
+{% block scripts %}{% endblock %}</html>'''
+
+
+class LibraryViewTests(SimpleTestCase):
+    """
+    Browsers revalidate the library page with its ETag, which changes with the apps, the templates and the deploy.
+    """
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.write_page(PAGE_SOURCE)
+        self.settings_override = override_settings(TEMPLATE_DIRS=(self.template_dir,), STATIC_URL='/static/',
+                                                   DEBUG=False)
+        self.settings_override.enable()
+
+        # Replace the process-wide harvester with one without apps
+        self.instance = SingletonAppHarvester._instance
+        self.harvester = object.__new__(SingletonAppHarvester)
+        self.harvester.apps = []
+        self.harvester.version = 'apps-1'
+        SingletonAppHarvester._instance = self.harvester
+
+        views._templates_version = None
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        views._templates_version = None
+        SingletonAppHarvester._instance = self.instance
+        self.settings_override.disable()
+        shutil.rmtree(self.template_dir)
+
+    def write_page(self, source, mtime=None):
+        page_path = os.path.join(self.template_dir, 'page.html')
+
+        with open(page_path, 'w') as page_file:
+            page_file.write(source)
+
+        if mtime is not None:
+            os.utime(page_path, (mtime, mtime))
+
+    def get(self, etag=None):
+        if etag:
+            return views.library(self.factory.get('/apps/', HTTP_IF_NONE_MATCH=etag))
+
+        return views.library(self.factory.get('/apps/'))
+
+    def test_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Apps Library', response.content)
+
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
+
+    def test_apps_changed(self):
+        etag = self.get()['ETag']
+        self.harvester.version = 'apps-2'
+
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_template_changed(self):
+        with override_settings(DEBUG=True):
+            etag = self.get()['ETag']
+            self.write_page(PAGE_SOURCE.replace('<html>', '<html lang="en">'), mtime=time.time() + 10)
+            response = self.get(etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('lang="en"', response.content)
+
+    def test_deploy_version_changed(self):
+        etag = self.get()['ETag']
+
+        with override_settings(TETHYS_APPS_LIBRARY_VERSION='2.0'):
+            self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_static_url_changed(self):
+        etag = self.get()['ETag']
+
+        with override_settings(STATIC_URL='https://cdn.example.com/static/'):
+            self.assertEqual(self.get(etag).status_code, 200)
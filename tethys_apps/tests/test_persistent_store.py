@@ -0,0 +1,196 @@
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from tethys_apps.base import persistent_store
+from tethys_apps.base.persistent_store import PersistentStoreEngineRegistry, PersistentStoreIndex
+
+
+class FakeEngine(object):
+    """
+    Stands in for an SQLAlchemy engine and records how it was created and disposed of.
+    """
+
+    def __init__(self, url, **kwargs):
+        """
+        Constructor
+        """
+        self.url = url
+        self.kwargs = kwargs
+        self.disposals = []
+
+    def dispose(self, close=True):
+        self.disposals.append(close)
+
+
+class LegacyFakeEngine(FakeEngine):
+    """
+    Stands in for an engine of SQLAlchemy < 1.4.33, which always closes the connections when disposed of.
+    """
+
+    def dispose(self):
+        self.disposals.append(True)
+
+
+class PersistentStoreTestCase(SimpleTestCase):
+    """
+    Replaces create_engine and the process-wide registry and index.
+    """
+
+    def setUp(self):
+        self.create_engine = persistent_store.create_engine
+        self.engine_class = FakeEngine
+        persistent_store.create_engine = lambda url, **kwargs: self.engine_class(url, **kwargs)
+        self.instances = (PersistentStoreEngineRegistry._instance, PersistentStoreIndex._instance)
+        PersistentStoreEngineRegistry._instance = None
+        PersistentStoreIndex._instance = None
+
+    def tearDown(self):
+        persistent_store.create_engine = self.create_engine
+        PersistentStoreEngineRegistry._instance, PersistentStoreIndex._instance = self.instances
+
+
+@override_settings(TETHYS_DATABASES={'tethys_db_manager': {'POOL_SIZE': 5, 'MAX_OVERFLOW': 2},
+                                     'test_app_tuned_db': {'POOL_SIZE': 10, 'POOL_RECYCLE': 3600}})
+class PersistentStoreEngineRegistryTests(PersistentStoreTestCase):
+    """
+    Engines are created once per persistent store, with its pool options, and discarded after a fork.
+    """
+
+    def setUp(self):
+        super(PersistentStoreEngineRegistryTests, self).setUp()
+        self.registry = PersistentStoreEngineRegistry()
+
+        # Only the databases added to the index exist; nothing reaches the database manager
+        index = PersistentStoreIndex()
+        index.refresh = lambda database_names: set()
+
+        for database_name in ('test_app_example_db', 'test_app_tuned_db'):
+            index.add(database_name)
+
+    def test_counters(self):
+        engine = self.registry.get_engine('test_app', 'example_db')
+
+        self.assertIs(self.registry.get_engine('test_app', 'example_db'), engine)
+        self.assertIsNot(self.registry.get_engine('test_app', 'tuned_db'), engine)
+        self.assertIsNone(self.registry.get_engine('test_app', 'missing_db'))
+        self.assertEqual(self.registry.stats(), {'hits': 1, 'misses': 3, 'creations': 2, 'engines': 2})
+
+    def test_pool_options(self):
+        engine = self.registry.get_engine('test_app', 'example_db')
+        self.assertTrue(engine.url.endswith('/test_app_example_db'))
+        self.assertEqual(engine.kwargs, {'pool_size': 5, 'max_overflow': 2})
+
+        engine = self.registry.get_engine('test_app', 'tuned_db')
+        self.assertEqual(engine.kwargs, {'pool_size': 10, 'max_overflow': 2, 'pool_recycle': 3600})
+
+    def test_dispose(self):
+        example_engine = self.registry.get_engine('test_app', 'example_db')
+        tuned_engine = self.registry.get_engine('test_app', 'tuned_db')
+
+        self.registry.dispose(app_name='test_app', persistent_store_name='example_db')
+        self.assertEqual(example_engine.disposals, [True])
+        self.assertEqual(tuned_engine.disposals, [])
+        self.assertIsNot(self.registry.get_engine('test_app', 'example_db'), example_engine)
+
+    def test_fork(self):
+        engine = self.registry.get_engine('test_app', 'example_db')
+        self.engine_class = LegacyFakeEngine
+        legacy_engine = self.registry.get_engine('test_app', 'tuned_db')
+
+        # As seen by a forked child that disposes of the engines before it gets one
+        self.registry._pid = -1
+        self.registry.dispose()
+
+        self.assertEqual(engine.disposals, [False])
+        self.assertEqual(legacy_engine.disposals, [])
+        self.assertIn(legacy_engine, self.registry._inherited_engines)
+        self.assertEqual(self.registry.stats()['engines'], 0)
+        self.assertIsNot(self.registry.get_engine('test_app', 'example_db'), engine)
+
+
+class PersistentStoreIndexTests(PersistentStoreTestCase):
+    """
+    Names expire after the TTL and the shared version stamp empties the index of every process.
+    """
+
+    def setUp(self):
+        super(PersistentStoreIndexTests, self).setUp()
+        self.version_check_interval = PersistentStoreIndex.VERSION_CHECK_INTERVAL
+        PersistentStoreIndex.VERSION_CHECK_INTERVAL = 0
+        self.existing_dbs = {'test_app_example_db'}
+        self.lookups = []
+        self.index = self.get_index()
+        self.index.cache.delete(PersistentStoreIndex.VERSION_CACHE_KEY)
+
+    def tearDown(self):
+        PersistentStoreIndex.VERSION_CHECK_INTERVAL = self.version_check_interval
+        super(PersistentStoreIndexTests, self).tearDown()
+
+    def get_index(self):
+        """
+        Returns a new index, as held by another process, that looks up the databases in self.existing_dbs.
+        """
+        PersistentStoreIndex._instance = None
+        index = PersistentStoreIndex()
+
+        def refresh(database_names):
+            self.lookups.extend(database_names)
+            existing_db_names = self.existing_dbs.intersection(database_names)
+
+            for database_name in database_names:
+                if database_name in existing_db_names:
+                    index.add(database_name)
+                else:
+                    index.discard(database_name)
+
+            return existing_db_names
+
+        index.refresh = refresh
+        return index
+
+    def test_lookup_cached(self):
+        self.assertTrue(self.index.exists('test_app_example_db'))
+        self.assertTrue(self.index.exists('test_app_example_db'))
+        self.assertFalse(self.index.exists('test_app_missing_db'))
+        self.assertFalse(self.index.exists('test_app_missing_db'))
+        self.assertEqual(self.lookups, ['test_app_example_db', 'test_app_missing_db', 'test_app_missing_db'])
+
+    @override_settings(TETHYS_PERSISTENT_STORE_INDEX_TTL=0)
+    def test_ttl_expired(self):
+        self.assertTrue(self.index.exists('test_app_example_db'))
+        self.existing_dbs.clear()
+        self.assertFalse(self.index.exists('test_app_example_db'))
+        self.assertEqual(self.lookups, ['test_app_example_db', 'test_app_example_db'])
+
+    def test_add_discard(self):
+        self.index.add('test_app_other_db')
+        self.assertTrue(self.index.exists('test_app_other_db'))
+        self.assertEqual(self.lookups, [])
+
+        self.index.discard('test_app_other_db')
+        self.assertFalse(self.index.exists('test_app_other_db'))
+        self.assertEqual(self.lookups, ['test_app_other_db'])
+
+    def test_invalidate(self):
+        other_index = self.get_index()
+        self.assertFalse(self.index.check_version())
+        self.assertFalse(other_index.check_version())
+        self.index.add('test_app_other_db')
+        other_index.add('test_app_other_db')
+
+        self.index.invalidate()
+        self.assertFalse(self.index.check_version())
+        self.assertFalse(self.index.exists('test_app_other_db'))
+
+        self.assertTrue(other_index.check_version())
+        self.assertFalse(other_index.check_version())
+        self.assertFalse(other_index.exists('test_app_other_db'))
+        self.assertEqual(self.lookups, ['test_app_other_db', 'test_app_other_db'])
+
+    def test_invalidate_version_stamp(self):
+        self.index.invalidate()
+        version = self.index.cache.get(PersistentStoreIndex.VERSION_CACHE_KEY)
+        self.assertIsNotNone(version)
+
+        self.index.invalidate()
+        self.assertEqual(self.index.cache.get(PersistentStoreIndex.VERSION_CACHE_KEY), version + 1)
@@ -0,0 +1,175 @@
+import imp
+import shutil
+import sys
+import time
+from collections import OrderedDict
+
+from django.core.urlresolvers import get_resolver, clear_url_caches
+from django.test import SimpleTestCase
+
+from tethys_apps import app_harvester
+from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.signals import apps_reharvested
+from tethys_apps.tests.app_packages import AppPackages
+from tethys_apps.utilities import generate_app_url_patterns, get_app_url_resolver
+
+APP_SOURCE = '''
+from tethys_apps.base import TethysAppBase, url_map_maker
+
+
+class ReloadTestApp(TethysAppBase):
+    name = '{name}'
+    index = '{namespace}:home'
+    icon = '{package}/images/icon.gif'
+    package = '{package}'
+    root_url = '{root_url}'
+    color = '#abcdef'
+
+    def url_maps(self):
+        UrlMap = url_map_maker(self.root_url)
+        return (UrlMap(name='home', url='{root_url}', controller='{package}.controllers.{controller}'),)
+'''
+
+CONTROLLERS_SOURCE = '''
+def home(request):
+    return 'home'
+
+
+def other(request):
+    return 'other'
+'''
+
+APP_PACKAGES = ('tethys_test_reload_a', 'tethys_test_reload_b')
+
+
+def get_app_source(app_package, name='Reload Test', controller='home'):
+    root_url = app_package.replace('_', '-')
+    return APP_SOURCE.format(name=name, package=app_package, root_url=root_url,
+                             namespace=root_url.replace('-', '_'), controller=controller)
+
+
+class ReharvestTests(SimpleTestCase):
+    """
+    Reharvesting replaces the apps of the app packages that were added, changed or removed and keeps the others.
+    """
+
+    def setUp(self):
+        self.app_packages = AppPackages()
+        self.package_dirs = OrderedDict((app_package, self.app_packages.add(
+            app_package, {'app.py': get_app_source(app_package), 'controllers.py': CONTROLLERS_SOURCE,
+                          'templates/{0}/home.html'.format(app_package): 'Home'}))
+            for app_package in APP_PACKAGES)
+
+        self.get_installed_tethys_apps = app_harvester.get_installed_tethys_apps
+        app_harvester.get_installed_tethys_apps = lambda refresh=False: OrderedDict(self.package_dirs)
+
+        # Replace the process-wide harvester with one that only knows the test apps
+        self.instance = SingletonAppHarvester._instance
+        self.harvester = object.__new__(SingletonAppHarvester)
+        self.harvester.package_dirs = OrderedDict(self.package_dirs)
+        self.harvester.harvested_at = time.time()
+        self.harvester._harvest_app_instances(list(self.package_dirs))
+        SingletonAppHarvester._instance = self.harvester
+
+        self.reharvested = []
+        apps_reharvested.connect(self.receive_apps_reharvested)
+
+        # The files are changed after the harvest started, with a margin for the resolution of the file times
+        time.sleep(0.05)
+
+    def tearDown(self):
+        apps_reharvested.disconnect(self.receive_apps_reharvested)
+        SingletonAppHarvester._instance = self.instance
+        app_harvester.get_installed_tethys_apps = self.get_installed_tethys_apps
+        self.app_packages.cleanup()
+
+    def receive_apps_reharvested(self, sender, app_packages, **kwargs):
+        self.reharvested.append(app_packages)
+
+    def get_app_names(self):
+        return dict((app.package, app.name) for app in self.harvester.apps)
+
+    def test_unchanged(self):
+        # Importing the apps wrote their bytecode, which is not part of the signature
+        self.assertEqual(self.harvester.reharvest(), [])
+        self.assertEqual(self.harvester.reharvest(), [])
+        self.assertEqual(self.reharvested, [])
+
+    def test_changed_package(self):
+        apps = list(self.harvester.apps)
+        self.app_packages.write(self.package_dirs['tethys_test_reload_a'], 'app.py',
+                                get_app_source('tethys_test_reload_a', name='Changed'))
+
+        self.assertEqual(self.harvester.reharvest(), ['tethys_test_reload_a'])
+        self.assertEqual(self.get_app_names(), {'tethys_test_reload_a': 'Changed',
+                                                'tethys_test_reload_b': 'Reload Test'})
+        self.assertIs(self.harvester.apps[1], apps[1])
+        self.assertEqual(self.reharvested, [['tethys_test_reload_a']])
+
+        # Later reharvests compare the signatures of the app packages
+        self.assertEqual(self.harvester.reharvest(), [])
+        self.app_packages.write(self.package_dirs['tethys_test_reload_b'], 'controllers.py',
+                                CONTROLLERS_SOURCE + '\n')
+        self.assertEqual(self.harvester.reharvest(), ['tethys_test_reload_b'])
+
+    def test_changed_template(self):
+        self.app_packages.write(self.package_dirs['tethys_test_reload_b'], 'templates/tethys_test_reload_b/home.html',
+                                'Changed')
+
+        self.assertEqual(self.harvester.reharvest(), ['tethys_test_reload_b'])
+        self.assertEqual(self.reharvested, [['tethys_test_reload_b']])
+
+    def test_removed_package(self):
+        shutil.rmtree(self.package_dirs.pop('tethys_test_reload_b'))
+
+        self.assertEqual(self.harvester.reharvest(), ['tethys_test_reload_b'])
+        self.assertEqual(self.get_app_names(), {'tethys_test_reload_a': 'Reload Test'})
+        self.assertNotIn('tethys_test_reload_b', self.harvester.package_apps)
+        self.assertNotIn('tethys_test_reload_b:home', self.harvester.reverse_table)
+
+    def test_import_failure_keeps_previous_app(self):
+        app_module_name = 'tethys_apps.tethysapp.tethys_test_reload_a.app'
+        app_module = sys.modules[app_module_name]
+        self.app_packages.write(self.package_dirs['tethys_test_reload_a'], 'app.py',
+                                'import tethys_test_missing_module\n')
+
+        self.assertEqual(self.harvester.reharvest(), [])
+        self.assertEqual(self.get_app_names(), {'tethys_test_reload_a': 'Reload Test',
+                                                'tethys_test_reload_b': 'Reload Test'})
+        self.assertIs(sys.modules[app_module_name], app_module)
+        self.assertEqual(self.reharvested, [])
+
+        # The app is reloaded once fixed
+        self.app_packages.write(self.package_dirs['tethys_test_reload_a'], 'app.py',
+                                get_app_source('tethys_test_reload_a', name='Fixed'))
+        self.assertEqual(self.harvester.reharvest(), ['tethys_test_reload_a'])
+        self.assertEqual(self.get_app_names()['tethys_test_reload_a'], 'Fixed')
+
+    def test_resolvers_swapped(self):
+        urls_module = imp.new_module('tethys_apps.urls')
+        urls_module.urlpatterns = [get_app_url_resolver(namespace, urls)
+                                   for namespace, urls in generate_app_url_patterns().items()]
+        resolvers = dict((pattern.namespace, pattern) for pattern in urls_module.urlpatterns)
+        previous_urls_module = sys.modules.get('tethys_apps.urls')
+        sys.modules['tethys_apps.urls'] = urls_module
+        clear_url_caches()
+
+        try:
+            self.assertEqual(get_resolver(None).resolve('/tethys-test-reload-a/').func.__name__, 'home')
+            self.app_packages.write(self.package_dirs['tethys_test_reload_a'], 'app.py',
+                                    get_app_source('tethys_test_reload_a', controller='other'))
+            self.harvester.reharvest()
+
+            swapped_resolvers = dict((pattern.namespace, pattern) for pattern in urls_module.urlpatterns)
+            self.assertIsNot(swapped_resolvers['tethys_test_reload_a'], resolvers['tethys_test_reload_a'])
+            self.assertIs(swapped_resolvers['tethys_test_reload_b'], resolvers['tethys_test_reload_b'])
+            self.assertEqual(get_resolver(None).resolve('/tethys-test-reload-a/').func.__name__, 'other')
+            self.assertEqual(get_resolver(None).resolve('/tethys-test-reload-b/').func.__name__, 'home')
+
+        finally:
+            if previous_urls_module is None:
+                sys.modules.pop('tethys_apps.urls', None)
+            else:
+                sys.modules['tethys_apps.urls'] = previous_urls_module
+
+            clear_url_caches()
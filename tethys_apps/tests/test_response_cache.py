@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template import Template, RequestContext
+from django.test import SimpleTestCase, RequestFactory
+from django.utils.functional import SimpleLazyObject
+
+from tethys_apps.response_cache import CachedController
+
+
+class AuthenticatedUser(object):
+    def is_authenticated(self):
+        return True
+
+
+class CachedControllerTests(SimpleTestCase):
+    """
+    Responses are cached per user and responses that are specific to the client are not cached.
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        self.factory = RequestFactory()
+        self.calls = 0
+
+    def get(self, view, cookie=None, authenticated=False):
+        request = self.factory.get('/apps/test-app/', HTTP_COOKIE=cookie or '')
+        request.session = SessionStore()
+
+        # Like the authentication middleware, which only reads the session when the user is used
+        if authenticated:
+            request.user = AuthenticatedUser()
+        else:
+            request.user = SimpleLazyObject(lambda: get_user(request))
+
+        return CachedController(view, 'test-app', 60)(request)
+
+    def page(self, request):
+        self.calls += 1
+        return HttpResponse('Page {0} of user {1}'.format(self.calls, request.user.is_authenticated()))
+
+    def test_anonymous(self):
+        first = self.get(self.page)
+        self.assertEqual(self.get(self.page).content, first.content)
+        self.assertEqual(self.get(self.page, cookie='csrftoken=abc').content, first.content)
+        self.assertEqual(self.calls, 1)
+
+    def test_authenticated(self):
+        anonymous = self.get(self.page)
+        first = self.get(self.page, cookie='sessionid=a', authenticated=True)
+
+        # Authenticated users are not served the responses of other users
+        self.assertNotEqual(first.content, anonymous.content)
+        self.assertIn('Cookie', first['Vary'])
+        self.assertEqual(self.get(self.page, cookie='sessionid=a', authenticated=True).content, first.content)
+        self.assertNotEqual(self.get(self.page, cookie='sessionid=b', authenticated=True).content, first.content)
+        self.assertEqual(self.get(self.page).content, anonymous.content)
+        self.assertEqual(self.calls, 3)
+
+    def test_csrf_form(self):
+        def form(request):
+            self.calls += 1
+            return HttpResponse(Template('<form>{% csrf_token %}</form>').render(RequestContext(request)))
+
+        self.get(form)
+        self.get(form)
+        self.assertEqual(self.calls, 2)
+
+    def test_cookie(self):
+        def page(request):
+            self.calls += 1
+            response = HttpResponse('Page')
+            response.set_cookie('visited', 'yes')
+            return response
+
+        self.get(page)
+        self.get(page)
+        self.assertEqual(self.calls, 2)
+
+    def test_session(self):
+        def page(request):
+            self.calls += 1
+            return HttpResponse(request.session.get('cart', 'Empty cart'))
+
+        self.get(page)
+        self.get(page)
+        self.assertEqual(self.calls, 2)
@@ -0,0 +1,169 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from StringIO import StringIO
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from tethys_apps import utilities
+from tethys_apps.utilities import TethysAppsStaticFinder
+
+
+@override_settings(TETHYS_APPS_STATIC_MANIFEST=None)
+class TethysAppsStaticFinderTests(SimpleTestCase):
+    """
+    The finder answers lookups from its index and checks the directories for changes at most once per interval.
+    """
+
+    def setUp(self):
+        self.finder = TethysAppsStaticFinder()
+        self.refreshes = 0
+
+        def refresh(force=False):
+            self.refreshes += 1
+
+        self.finder.refresh = refresh
+
+    @override_settings(DEBUG=True)
+    def test_staleness_checks_are_throttled(self):
+        for _ in range(50):
+            self.finder.find('test_app/js/main.js')
+
+        self.assertEqual(self.refreshes, 1)
+
+        self.finder._next_staleness_check = 0
+        self.finder.find('test_app/js/main.js')
+        self.assertEqual(self.refreshes, 2)
+
+    @override_settings(DEBUG=False)
+    def test_no_staleness_checks_without_debug(self):
+        self.finder.find('test_app/js/main.js')
+        self.assertEqual(self.refreshes, 0)
+
+    def test_find_from_index(self):
+        self.finder.index = {'test_app/js/main.js': ['/a/main.js', '/b/main.js']}
+        self.assertEqual(self.finder.find('test_app/js/main.js'), '/a/main.js')
+        self.assertEqual(self.finder.find('test_app/js/main.js', all=True), ['/a/main.js', '/b/main.js'])
+        self.assertEqual(self.finder.find('test_app/js/missing.js'), [])
+
+
+class CountingStaticFinder(TethysAppsStaticFinder):
+    """
+    Counts the scans of the static directories.
+    """
+
+    scans = 0
+
+    def _scan(self):
+        CountingStaticFinder.scans += 1
+        super(CountingStaticFinder, self)._scan()
+
+
+@override_settings(TETHYS_APPS_STATIC_MANIFEST=None)
+class TethysAppsStaticFinderScanTests(SimpleTestCase):
+    """
+    The finder indexes the files of the static directories of the apps and detects changes.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.static_dir = os.path.join(self.root, 'test_app', 'public')
+
+        for relative_path in ('js/main.js', 'js/main.js.map', 'css/main.css', 'CVS/Entries'):
+            self.write(relative_path)
+
+        self.get_directories_in_tethys_apps = utilities.get_directories_in_tethys_apps
+        utilities.get_directories_in_tethys_apps = lambda directory_names, with_app_name=False: [
+            ('test_app', self.static_dir)]
+        CountingStaticFinder.scans = 0
+
+    def tearDown(self):
+        utilities.get_directories_in_tethys_apps = self.get_directories_in_tethys_apps
+        shutil.rmtree(self.root)
+
+    def write(self, relative_path):
+        path = os.path.join(self.static_dir, relative_path)
+
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        with open(path, 'w') as static_file:
+            static_file.write(relative_path)
+
+        # Make the change visible to the modification time of the directory whatever its resolution
+        mtime = time.time() + CountingStaticFinder.scans
+        os.utime(os.path.dirname(path), (mtime, mtime))
+
+    def test_scan(self):
+        finder = CountingStaticFinder()
+
+        self.assertEqual(finder.find('test_app/js/main.js'), os.path.join(self.static_dir, 'js', 'main.js'))
+        self.assertEqual(finder.find('test_app/js/missing.js'), [])
+        self.assertEqual(finder.find('other_app/js/main.js'), [])
+        self.assertEqual(finder.locations, [('test_app', self.static_dir)])
+
+    def test_list(self):
+        finder = CountingStaticFinder()
+
+        listed = sorted(path for path, storage in finder.list(['*.map', 'CVS']))
+        self.assertEqual(listed, [os.path.join('css', 'main.css'), os.path.join('js', 'main.js')])
+        self.assertEqual(len(list(finder.list([]))), 4)
+
+        path, storage = next(finder.list(['*.map', 'CVS', '*.css']))
+        self.assertEqual(storage.prefix, 'test_app')
+        self.assertEqual(storage.path(path), os.path.join(self.static_dir, 'js', 'main.js'))
+
+    def test_staleness(self):
+        finder = CountingStaticFinder()
+        finder.refresh()
+        self.assertEqual(CountingStaticFinder.scans, 1)
+
+        self.write('js/added.js')
+        finder.refresh()
+        self.assertEqual(CountingStaticFinder.scans, 2)
+        self.assertEqual(finder.find('test_app/js/added.js'), os.path.join(self.static_dir, 'js', 'added.js'))
+
+        shutil.rmtree(os.path.join(self.static_dir, 'css'))
+        os.utime(self.static_dir, (time.time() + 10, time.time() + 10))
+        finder.refresh()
+        self.assertEqual(finder.find('test_app/css/main.css'), [])
+
+    def test_manifest_round_trip(self):
+        manifest_path = os.path.join(self.root, 'static.json')
+
+        with override_settings(TETHYS_APPS_STATIC_MANIFEST=manifest_path):
+            scanned_finder = CountingStaticFinder()
+            self.assertTrue(os.path.isfile(manifest_path))
+
+            loaded_finder = CountingStaticFinder()
+            self.assertEqual(CountingStaticFinder.scans, 1)
+            self.assertEqual(loaded_finder.index, scanned_finder.index)
+            self.assertEqual(loaded_finder.locations, scanned_finder.locations)
+            self.assertEqual(sorted((path, storage.location) for path, storage in loaded_finder.list([])),
+                             sorted((path, storage.location) for path, storage in scanned_finder.list([])))
+
+            # A stale manifest is replaced
+            self.write('js/added.js')
+            CountingStaticFinder()
+            self.assertEqual(CountingStaticFinder.scans, 2)
+
+            with open(manifest_path) as manifest_file:
+                self.assertIn('test_app/js/added.js', json.load(manifest_file)['index'])
+
+    def test_unwritable_manifest(self):
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+
+        try:
+            with override_settings(TETHYS_APPS_STATIC_MANIFEST=os.path.join(self.root, 'missing', 'static.json')):
+                finder = CountingStaticFinder()
+        finally:
+            output = sys.stdout.getvalue()
+            sys.stdout = stdout
+
+        self.assertEqual(finder.find('test_app/css/main.css'), os.path.join(self.static_dir, 'css', 'main.css'))
+        self.assertIn('Could not write the static files manifest', output)
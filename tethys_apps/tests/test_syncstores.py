@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+
+from django.test import SimpleTestCase
+
+from tethys_apps.management.commands.syncstores import Command
+
+
+class FakeApp(object):
+    def __init__(self, package):
+        self.package = package
+
+
+class FakeTask(object):
+    def __init__(self, app, name):
+        self.app = app
+        self.name = name
+
+
+class RecordingCommand(Command):
+    """
+    Records the provisioning and the initialization of the persistent stores instead of running them.
+    """
+
+    def __init__(self, failing=(), blocking=None):
+        """
+        Constructor
+        """
+        super(RecordingCommand, self).__init__()
+        self.failing = failing
+        self.blocking = blocking or dict()
+        self.events = []
+
+    def provision_persistent_store(self, task):
+        if task.name in self.blocking:
+            self.blocking[task.name].wait(5)
+
+        if task.name in self.failing:
+            raise ValueError(task.name)
+
+        self.events.append(('provision', task.name))
+
+    def initialize_persistent_stores(self, tasks):
+        self.events.append(('initialize', tasks[0].app.package))
+
+
+class ProvisionAppsTests(SimpleTestCase):
+    """
+    The initializers of an app run as soon as all of its persistent stores are provisioned.
+    """
+
+    def setUp(self):
+        self.app_tasks = OrderedDict()
+
+        for app_package, names in (('app_a', ('a1', 'a2')), ('app_b', ('b1',))):
+            app = FakeApp(app_package)
+            self.app_tasks[app_package] = [FakeTask(app, name) for name in names]
+
+    def test_sequential(self):
+        command = RecordingCommand()
+        command.provision_apps(self.app_tasks, 1)
+
+        self.assertEqual(command.events, [('provision', 'a1'), ('provision', 'a2'), ('initialize', 'app_a'),
+                                          ('provision', 'b1'), ('initialize', 'app_b')])
+
+    def test_initialized_while_other_apps_provision(self):
+        app_b_initialized = threading.Event()
+        command = RecordingCommand(blocking={'a2': app_b_initialized})
+
+        original_initialize = command.initialize_persistent_stores
+
+        def initialize_persistent_stores(tasks):
+            original_initialize(tasks)
+
+            if tasks[0].app.package == 'app_b':
+                app_b_initialized.set()
+
+        command.initialize_persistent_stores = initialize_persistent_stores
+        command.provision_apps(self.app_tasks, 3)
+
+        self.assertLess(command.events.index(('initialize', 'app_b')), command.events.index(('provision', 'a2')))
+        self.assertEqual(command.events[-2:], [('provision', 'a2'), ('initialize', 'app_a')])
+
+    def test_failed_store(self):
+        command = RecordingCommand(failing=('a2',))
+
+        with self.assertRaises(ValueError):
+            command.provision_apps(self.app_tasks, 3)
+
+        self.assertIn(('initialize', 'app_b'), command.events)
+        self.assertNotIn(('initialize', 'app_a'), command.events)
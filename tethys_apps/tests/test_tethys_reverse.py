@@ -0,0 +1,85 @@
+from django.conf.urls import include, url
+from django.core.urlresolvers import reverse, NoReverseMatch, RegexURLResolver
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from tethys_apps import utilities
+from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.base.url_map import url_map_maker
+from tethys_apps.utilities import tethys_reverse
+
+UrlMap = url_map_maker('test-app')
+
+
+def view(request, **kwargs):
+    pass
+
+
+class ReverseTestApp(object):
+    root_url = 'test-app'
+
+    def url_maps(self):
+        return (UrlMap(name='home', url='test-app', controller='test_app.controllers.home'),
+                UrlMap(name='item', url='test-app/items/{item_id:int}', controller='test_app.controllers.item'),
+                UrlMap(name='item_file', url='test-app/items/{item_id:int}/files/{file_path:path}',
+                       controller='test_app.controllers.item_file'),
+                UrlMap(name='user', url='test-app/users/{username}', controller='test_app.controllers.user'))
+
+
+app_urls = [url(url_map.url, view, name=url_map.name) for url_map in ReverseTestApp().url_maps()]
+app_urls.append(url(r'^legacy/(?P<page>[a-z]+)\.html$', view, name='legacy'))
+
+urlpatterns = [
+    url(r'^apps/', include([url(r'^$', view, name='app_library'),
+                            RegexURLResolver(r'^test-app/', app_urls, namespace='test_app')])),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class TethysReverseTests(SimpleTestCase):
+    """
+    Urls of the url maps are formatted from the reverse table like Django would reverse them.
+    """
+
+    def setUp(self):
+        harvester = SingletonAppHarvester()
+        self.reverse_table = harvester.reverse_table
+        self.apps_root = utilities._apps_root
+        harvester.reverse_table = harvester._index_app_urls([ReverseTestApp()])
+        utilities._apps_root = None
+
+    def tearDown(self):
+        SingletonAppHarvester().reverse_table = self.reverse_table
+        utilities._apps_root = self.apps_root
+
+    def assertReversesLikeDjango(self, viewname, args=None, kwargs=None):
+        self.assertEqual(tethys_reverse(viewname, args=args, kwargs=kwargs),
+                         reverse(viewname, args=args, kwargs=kwargs))
+
+    def test_indexed(self):
+        self.assertIn('test_app:item_file', SingletonAppHarvester().reverse_table)
+        self.assertEqual(tethys_reverse('test_app:item', args=[42]), '/apps/test-app/items/42/')
+
+    def test_same_urls_as_django(self):
+        self.assertReversesLikeDjango('test_app:home')
+        self.assertReversesLikeDjango('test_app:item', args=[42])
+        self.assertReversesLikeDjango('test_app:item', kwargs={'item_id': 42})
+        self.assertReversesLikeDjango('test_app:item_file', args=[42, 'data/2015/flow rate.csv'])
+        self.assertReversesLikeDjango('test_app:user', kwargs={'username': u'j-doe'})
+
+    def test_not_indexed(self):
+        # Hand written expressions and other views are reversed by Django
+        self.assertNotIn('test_app:legacy', SingletonAppHarvester().reverse_table)
+        self.assertReversesLikeDjango('test_app:legacy', kwargs={'page': 'index'})
+        self.assertReversesLikeDjango('app_library')
+
+    def test_no_reverse_match(self):
+        for args, kwargs in (([], None),
+                             (['abc'], None),
+                             ([42, 43], None),
+                             (None, {'id': 42}),
+                             (None, {'item_id': 'abc'})):
+            self.assertRaises(NoReverseMatch, tethys_reverse, 'test_app:item', args=args, kwargs=kwargs)
+            self.assertRaises(NoReverseMatch, reverse, 'test_app:item', args=args, kwargs=kwargs)
+
+        self.assertRaises(NoReverseMatch, tethys_reverse, 'test_app:missing')
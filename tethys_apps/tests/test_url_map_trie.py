@@ -0,0 +1,116 @@
+from django.conf.urls import url
+from django.core.urlresolvers import RegexURLResolver, Resolver404
+from django.test import SimpleTestCase
+
+from tethys_apps.base.url_map import url_map_maker, UrlMapTrie
+from tethys_apps.utilities import TethysAppUrlResolver
+
+UrlMap = url_map_maker('test-app')
+
+
+def home(request):
+    pass
+
+
+def item(request, item_id):
+    pass
+
+
+def new_item(request):
+    pass
+
+
+def item_file(request, item_id, file_path):
+    pass
+
+
+def legacy(request):
+    pass
+
+
+class UrlMapTrieTests(SimpleTestCase):
+    """
+    Candidates of the prefix tree of url patterns.
+    """
+
+    def setUp(self):
+        self.trie = UrlMapTrie()
+
+        for index, regex in enumerate((r'^$',
+                                       r'^items/(?P<item_id>[0-9]+)/$',
+                                       r'^items/new/$',
+                                       r'^items/(?P<item_id>[0-9]+)/files/(?P<file_path>.+)/$',
+                                       r'^legacy/.*$')):
+            self.trie.insert(regex, index, index)
+
+    def test_root(self):
+        self.assertEqual(self.trie.candidates(''), [0, 3, 4])
+
+    def test_literal_and_wildcard_in_insertion_order(self):
+        # The wildcard was inserted first, so it is tried first like in the url pattern list
+        self.assertEqual(self.trie.candidates('items/new/'), [1, 2, 3, 4])
+
+    def test_wildcard(self):
+        self.assertEqual(self.trie.candidates('items/42/'), [1, 3, 4])
+
+    def test_unindexed_patterns_are_always_candidates(self):
+        # Path variables and hand written expressions cannot be indexed
+        self.assertEqual(self.trie.candidates('unknown/path/'), [3, 4])
+        self.assertEqual(self.trie.candidates('legacy/anything'), [3, 4])
+
+    def test_empty_segment_does_not_match_wildcard(self):
+        self.assertEqual(self.trie.candidates('items//'), [3, 4])
+
+
+class TethysAppUrlResolverTests(SimpleTestCase):
+    """
+    The indexed resolver resolves every path like the resolver that tries each pattern in turn.
+    """
+
+    paths = ('test-app/',
+             'test-app/items/42/',
+             'test-app/items/new/',
+             'test-app/items/42/files/data/2015/flow.csv/',
+             'test-app/legacy/old-page',
+             'test-app/items/abc/',
+             'test-app/items/42',
+             'test-app/unknown/',
+             'other-app/items/42/')
+
+    def setUp(self):
+        url_maps = (UrlMap(name='home', url='test-app', controller='test_app.controllers.home'),
+                    UrlMap(name='item', url='test-app/items/{item_id:int}', controller='test_app.controllers.item'),
+                    UrlMap(name='new_item', url='test-app/items/new', controller='test_app.controllers.new_item'),
+                    UrlMap(name='item_file', url='test-app/items/{item_id:int}/files/{file_path:path}',
+                           controller='test_app.controllers.item_file'))
+        views = (home, item, new_item, item_file)
+        self.urls = [url(url_map.url, view, name=url_map.name) for url_map, view in zip(url_maps, views)]
+        self.urls.append(url(r'^legacy/.*$', legacy, name='legacy'))
+
+    def resolve(self, resolver_class, path):
+        resolver = resolver_class(r'^test-app/', self.urls, namespace='test_app')
+
+        try:
+            match = resolver.resolve(path)
+        except Resolver404:
+            return None
+
+        return match.func, match.args, match.kwargs, match.url_name, match.namespace
+
+    def test_same_matches_as_linear_resolution(self):
+        for path in self.paths:
+            self.assertEqual(self.resolve(TethysAppUrlResolver, path), self.resolve(RegexURLResolver, path), path)
+
+    def test_first_pattern_wins(self):
+        # "new" is not an int, so the literal pattern inserted after the int variable matches
+        self.assertEqual(self.resolve(TethysAppUrlResolver, 'test-app/items/new/')[0], new_item)
+        self.assertEqual(self.resolve(TethysAppUrlResolver, 'test-app/items/42/')[2], {'item_id': '42'})
+
+    def test_path_variable(self):
+        match = self.resolve(TethysAppUrlResolver, 'test-app/items/42/files/data/2015/flow.csv/')
+        self.assertEqual(match[0], item_file)
+        self.assertEqual(match[2], {'item_id': '42', 'file_path': 'data/2015/flow.csv'})
+
+    def test_no_match(self):
+        self.assertIsNone(self.resolve(TethysAppUrlResolver, 'test-app/unknown/'))
+        self.assertIsNone(self.resolve(TethysAppUrlResolver, 'other-app/items/42/'))
@@ -0,0 +1,71 @@
+import re
+import uuid
+
+from django.http import Http404
+from django.test import SimpleTestCase
+
+from tethys_apps.base.url_map import (url_map_maker, parse_url_variable, get_url_variable_types,
+                                      django_url_preprocessor, LazyController, DEFAULT_EXPRESSION)
+
+UrlMap = url_map_maker('test-app')
+
+
+def item(request, item_id, **kwargs):
+    return item_id, kwargs
+
+
+class UrlVariableTests(SimpleTestCase):
+    """
+    Typed url variables match a tighter expression and are converted before they are passed to the controller.
+    """
+
+    def test_parse_url_variable(self):
+        self.assertEqual(parse_url_variable('{item_id}'), ('item_id', None))
+        self.assertEqual(parse_url_variable('{item_id:int}'), ('item_id', 'int'))
+        self.assertEqual(parse_url_variable('{file_path:path}'), ('file_path', 'path'))
+
+    def test_invalid_type(self):
+        self.assertRaises(ValueError, parse_url_variable, '{item_id:integer}')
+        self.assertRaises(ValueError, UrlMap, name='item', url='test-app/items/{item_id:integer}',
+                          controller='test_app.controllers.item')
+
+    def test_get_url_variable_types(self):
+        self.assertEqual(get_url_variable_types('test-app/items/{item_id:int}/files/{file_path:path}/{name}'),
+                         {'item_id': 'int', 'file_path': 'path'})
+        self.assertEqual(get_url_variable_types('test-app/items'), {})
+
+    def test_expressions(self):
+        self.assertEqual(django_url_preprocessor('test-app/items/{item_id}', 'test-app'),
+                         r'^items/(?P<item_id>{0})/$'.format(DEFAULT_EXPRESSION))
+        self.assertEqual(django_url_preprocessor('test-app/items/{item_id:int}', 'test-app'),
+                         r'^items/(?P<item_id>[0-9]+)/$')
+        self.assertEqual(django_url_preprocessor('test-app', 'test-app'), r'^$')
+
+    def test_matches(self):
+        cases = (('int', '42', 'abc'),
+                 ('float', '-4.5', '4.5.6'),
+                 ('uuid', str(uuid.uuid4()), 'not-a-uuid'),
+                 ('slug', 'my_item-1', 'my.item'),
+                 ('path', 'data/2015/flow.csv', ''))
+
+        for variable_type, valid, invalid in cases:
+            regex = re.compile(django_url_preprocessor('test-app/{{value:{0}}}'.format(variable_type), 'test-app'))
+            self.assertTrue(regex.match(valid + '/'), variable_type)
+            self.assertFalse(regex.match(invalid + '/'), variable_type)
+
+    def test_conversion(self):
+        view = LazyController(__name__ + '.item', {'item_id': 'int', 'name': 'slug'})
+        self.assertEqual(view(None, item_id='42', name='my-item'), (42, {'name': 'my-item'}))
+
+        view = LazyController(__name__ + '.item', {'item_id': 'uuid'})
+        item_id = uuid.uuid4()
+        self.assertEqual(view(None, item_id=str(item_id))[0], item_id)
+
+    def test_untyped_variables_are_not_converted(self):
+        view = UrlMap(name='item', url='test-app/items/{item_id}', controller='test_app.controllers.item').view
+        self.assertEqual(view.converters, {})
+
+    def test_invalid_value(self):
+        # The expressions only match convertible values, but a view may be called with other keyword arguments
+        view = LazyController(__name__ + '.item', {'item_id': 'int'})
+        self.assertRaises(Http404, view, None, item_id='abc')
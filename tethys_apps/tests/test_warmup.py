@@ -0,0 +1,86 @@
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.tests.app_packages import AppPackages
+from tethys_apps.warmup import warm_up_apps
+
+APP_PACKAGE = 'tethys_test_warmup'
+
+APP_SOURCE = '''
+from tethys_apps.base import TethysAppBase, url_map_maker
+
+
+class WarmupTestApp(TethysAppBase):
+    name = 'Warmup Test'
+    index = 'tethys-test-warmup:home'
+    icon = 'tethys_test_warmup/images/icon.gif'
+    package = 'tethys_test_warmup'
+    root_url = 'tethys-test-warmup'
+    color = '#abcdef'
+
+    def url_maps(self):
+        UrlMap = url_map_maker(self.root_url)
+        return (UrlMap(name='home', url='tethys-test-warmup', controller='tethys_test_warmup.controllers.home'),
+                UrlMap(name='missing', url='tethys-test-warmup/missing',
+                       controller='tethys_test_warmup.controllers.missing'))
+'''
+
+CONTROLLERS_SOURCE = '''
+def home(request):
+    return 'home'
+'''
+
+
+class WarmUpAppsTests(SimpleTestCase):
+    """
+    The warm-up hook loads the controllers of the harvested apps in the calling process and reports what failed.
+    """
+
+    def setUp(self):
+        self.app_packages = AppPackages()
+        package_dir = self.app_packages.add(APP_PACKAGE, {'app.py': APP_SOURCE, 'controllers.py': CONTROLLERS_SOURCE})
+
+        # Replace the process-wide harvester with one that only knows the test app
+        self.instance = SingletonAppHarvester._instance
+        harvester = object.__new__(SingletonAppHarvester)
+        harvester.package_dirs = {APP_PACKAGE: package_dir}
+        harvester._harvest_app_instances([APP_PACKAGE])
+        SingletonAppHarvester._instance = harvester
+
+    def tearDown(self):
+        SingletonAppHarvester._instance = self.instance
+        self.app_packages.cleanup()
+
+    def test_warm_up_apps(self):
+        tasks = warm_up_apps(engines=False)
+
+        self.assertEqual([task.app.package for task in tasks], [APP_PACKAGE])
+        self.assertEqual(tasks[0].controllers, 1)
+        self.assertEqual(tasks[0].engines, 0)
+        self.assertEqual(len(tasks[0].errors), 1)
+        self.assertIn('missing', tasks[0].errors[0])
+
+    def test_other_app_package(self):
+        self.assertEqual(warm_up_apps(app_package='other_app', engines=False), [])
+
+    def test_command(self):
+        stdout = StringIO()
+        stderr = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('warmup', engines=False, stdout=stdout, stderr=stderr)
+
+        lines = stdout.getvalue().splitlines()
+        header = [line.startswith('Warm-up Summary:') for line in lines].index(True) + 1
+        self.assertEqual(lines[header].split(), ['App', 'Controllers', 'Templates', 'Engines', 'Controllers', '(s)',
+                                                  'Templates', '(s)', 'Engines', '(s)', 'Total', '(s)'])
+        self.assertEqual(lines[header + 1].split()[:4], [APP_PACKAGE, '1', '0', '0'])
+        self.assertIn('ERROR: {0}: '.format(APP_PACKAGE), stderr.getvalue())
+
+    def test_command_other_app_package(self):
+        with self.assertRaises(CommandError):
+            call_command('warmup', app='other_app', engines=False, stdout=StringIO(), stderr=StringIO())
@@ -1,6 +1,6 @@
-from django.conf.urls import patterns, url, include
+from django.conf.urls import patterns, url
 
-from tethys_apps.utilities import generate_app_url_patterns
+from tethys_apps.utilities import generate_app_url_patterns, get_app_url_resolver
 
 urlpatterns = patterns('',
     url(r'^$', 'tethys_apps.views.library', name='app_library'),
@@ -10,5 +10,4 @@ urlpatterns = patterns('',
 app_url_patterns = generate_app_url_patterns()
 
 for namespace, urls in app_url_patterns.iteritems():
-    root_pattern = r'^{0}/'.format(namespace.replace('_', '-'))
-    urlpatterns.append(url(root_pattern, include(urls, namespace=namespace)))
\ No newline at end of file
+    urlpatterns.append(get_app_url_resolver(namespace, urls))
@@ -1,14 +1,33 @@
+import io
+import json
 import os
+import sys
+import threading
+import time
+from collections import OrderedDict
 
-from django.conf.urls import url
+from django.conf import settings
+from django.conf.urls import url, include
 from django.contrib.staticfiles import utils
 from django.contrib.staticfiles.finders import BaseFinder
 from django.core.files.storage import FileSystemStorage
-from django.template import TemplateDoesNotExist
+from django.contrib.staticfiles.finders import get_finders
+from django.core.urlresolvers import RegexURLResolver, ResolverMatch, Resolver404, NoReverseMatch, clear_url_caches, \
+    get_resolver, get_script_prefix, reverse
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist, loader
+from django.template.loader import BaseLoader
 from django.utils._os import safe_join
 from django.utils.datastructures import SortedDict
+from django.utils.encoding import force_text, iri_to_uri
+from django.utils.http import urlquote
 
 from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.base.url_map import UrlMapTrie
+from tethys_apps.helpers import get_installed_tethys_apps
+from tethys_apps.response_cache import CachedController
+from tethys_apps.signals import apps_reharvested
+from tethys_apps.terminal_colors import TerminalColors
 
 # Other dependency imports DO NOT ERASE
 from tethys_datasets.utilities import get_dataset_engine
@@ -40,8 +59,15 @@ def generate_app_url_patterns():
                 if app_namespace not in app_url_patterns:
                     app_url_patterns[app_namespace] = []
 
+                # Wrap the controllers of url maps with a cache timeout in a cache layer
+                view = url_map.view
+
+                if getattr(url_map, 'cache_timeout', None) is not None:
+                    view = CachedController(view, app_root, url_map.cache_timeout, url_map.vary_on,
+                                            url_map.cache_alias)
+
                 # Create django url object
-                django_url = url(url_map.url, url_map.controller, name=url_map.name)
+                django_url = url(url_map.url, view, name=url_map.name)
 
                 # Append to namespace list
                 app_url_patterns[app_namespace].append(django_url)
@@ -49,55 +75,345 @@ def generate_app_url_patterns():
     return app_url_patterns
 
 
-def get_directories_in_tethys_apps(directory_names, with_app_name=False):
-    # Determine the tethysapp directory
-    tethysapp_dir = safe_join(os.path.abspath(os.path.dirname(__file__)), 'tethysapp')
+def get_app_url_resolver(namespace, urls):
+    """
+    Returns the resolver that includes the url patterns of an app under its root url.
+
+    Args:
+      namespace(string): The url namespace of the app.
+      urls(list): The url patterns of the app.
+    """
+    root_pattern = r'^{0}/'.format(namespace.replace('_', '-'))
+
+    # Resolve the app urls with a prefix tree instead of trying each pattern in turn
+    if getattr(settings, 'TETHYS_APPS_INDEXED_URLS', False):
+        return TethysAppUrlResolver(root_pattern, urls, namespace=namespace)
+
+    return url(root_pattern, include(urls, namespace=namespace))
+
+
+def _reset_url_resolvers(resolver):
+    """
+    Empty the reverse lookup caches of the resolver given and of the resolvers it includes.
+    """
+    resolver._reverse_dict = {}
+    resolver._namespace_dict = {}
+    resolver._app_dict = {}
+    resolver._populated = False
+
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, RegexURLResolver):
+            _reset_url_resolvers(pattern)
+
+
+@receiver(apps_reharvested)
+def reload_app_url_patterns(sender, app_packages, **kwargs):
+    """
+    Replace the resolvers of the reharvested apps in the tethys_apps url patterns. The resolvers of the other apps are
+    kept.
+    """
+    urls_module = sys.modules.get('tethys_apps.urls')
+
+    # The url patterns will be generated from the reharvested apps when they are first imported
+    if urls_module is None:
+        return
+
+    package_apps = SingletonAppHarvester().package_apps
+    reharvested_namespaces = set(app.root_url.replace('-', '_')
+                                 for app_package in app_packages for app in package_apps.get(app_package, ()))
+    app_url_patterns = generate_app_url_patterns()
+    urlpatterns = []
+
+    for pattern in urls_module.urlpatterns:
+        namespace = getattr(pattern, 'namespace', None)
+
+        # Keep the resolvers of unchanged apps and drop those of removed apps
+        if namespace is None or (namespace in app_url_patterns and namespace not in reharvested_namespaces):
+            urlpatterns.append(pattern)
+            app_url_patterns.pop(namespace, None)
+
+    for namespace, urls in app_url_patterns.iteritems():
+        urlpatterns.append(get_app_url_resolver(namespace, urls))
+
+    # Swap the whole list so that requests being resolved never see a partial list
+    urls_module.urlpatterns = urlpatterns
+    clear_url_caches()
+    _reset_url_resolvers(get_resolver(None))
+
+
+# Path of the apps library relative to the script prefix, found on first use
+_apps_root = None
+
+
+def get_apps_root():
+    """
+    Returns the path of the apps library relative to the script prefix (e.g.: "apps/").
+    """
+    global _apps_root
+
+    if _apps_root is None:
+        _apps_root = reverse('app_library')[len(get_script_prefix()):]
+
+    return _apps_root
+
+
+def tethys_reverse(viewname, args=None, kwargs=None):
+    """
+    Returns the url of an app url map (e.g.: "my_app:resource") from the reverse table built when the apps were
+    harvested, without walking the url resolvers. Other view names are reversed by Django.
+
+    Args:
+      viewname(string): The namespaced name of the url map.
+      args(list): Values of the url variables in order.
+      kwargs(dict): Values of the url variables by name.
+    """
+    entry = SingletonAppHarvester().reverse_table.get(viewname)
+
+    if entry is None or (args and kwargs):
+        return reverse(viewname, args=args, kwargs=kwargs)
+
+    url_format, variable_names, expressions = entry
+
+    if kwargs:
+        if set(kwargs) != set(variable_names):
+            raise NoReverseMatch('Reverse for "{0}" with keyword arguments "{1}" not found.'.format(viewname,
+                                                                                                  kwargs))
+
+        values = [force_text(kwargs[name]) for name in variable_names]
+
+    else:
+        values = [force_text(value) for value in args or ()]
+
+        if len(values) != len(variable_names):
+            raise NoReverseMatch('Reverse for "{0}" with arguments "{1}" not found.'.format(viewname, args))
+
+    for value, expression in zip(values, expressions):
+        if not expression.match(value):
+            raise NoReverseMatch('Reverse for "{0}" with arguments "{1}" not found.'.format(viewname, values))
 
+    return iri_to_uri(get_script_prefix() + get_apps_root() +
+                      url_format.format(*[urlquote(value) for value in values]))
+
+
+class TethysAppUrlResolver(RegexURLResolver):
+    """
+    Drop-in replacement for the resolver that Django creates for the included url patterns of an app. Candidate
+    patterns are looked up in a prefix tree of the literal path segments of the url maps so that only the patterns
+    that can match are tried. Falls back to trying every pattern in turn if none of the candidates match.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TethysAppUrlResolver, self).__init__(*args, **kwargs)
+        self._url_trie = None
+
+    @property
+    def url_trie(self):
+        """
+        Prefix tree of the url patterns of the app, built on first use.
+        """
+        if self._url_trie is None:
+            url_trie = UrlMapTrie()
+
+            for index, pattern in enumerate(self.url_patterns):
+                url_trie.insert(pattern.regex.pattern, pattern, index)
+
+            self._url_trie = url_trie
+
+        return self._url_trie
+
+    def resolve(self, path):
+        path = force_text(path)
+        match = self.regex.search(path)
+
+        if match:
+            new_path = path[match.end():]
+
+            for pattern in self.url_trie.candidates(new_path):
+                try:
+                    sub_match = pattern.resolve(new_path)
+                except Resolver404:
+                    continue
+
+                if sub_match:
+                    sub_match_dict = dict(match.groupdict(), **self.default_kwargs)
+                    sub_match_dict.update(sub_match.kwargs)
+                    return ResolverMatch(sub_match.func,
+                                         sub_match.args,
+                                         sub_match_dict,
+                                         sub_match.url_name,
+                                         self.app_name or sub_match.app_name,
+                                         [self.namespace] + sub_match.namespaces)
+
+        return super(TethysAppUrlResolver, self).resolve(path)
+
+
+# Name of the manifest written by the buildstatic command
+STATIC_BUILD_MANIFEST_NAME = 'tethys_static_manifest.json'
+
+# Cache of the static build manifest
+_static_build_manifest = {'mtime': None, 'paths': {}}
+
+
+def get_static_build_root():
+    """
+    Returns the directory the buildstatic command writes to: TETHYS_APPS_STATIC_BUILD_ROOT or STATIC_ROOT.
+    """
+    return getattr(settings, 'TETHYS_APPS_STATIC_BUILD_ROOT', None) or settings.STATIC_ROOT
+
+
+def get_static_build_manifest():
+    """
+    Returns a dictionary mapping static file paths to the paths of the content-hashed copies written by the
+    buildstatic command. The manifest is loaded once, or again whenever it changes when DEBUG is True.
+    """
+    if _static_build_manifest['mtime'] is not None and not settings.DEBUG:
+        return _static_build_manifest['paths']
+
+    manifest_path = os.path.join(get_static_build_root() or '', STATIC_BUILD_MANIFEST_NAME)
+
+    try:
+        mtime = os.path.getmtime(manifest_path)
+
+        if mtime != _static_build_manifest['mtime']:
+            with open(manifest_path) as manifest_file:
+                _static_build_manifest['paths'] = json.load(manifest_file)['paths']
+
+            _static_build_manifest['mtime'] = mtime
+
+    except (IOError, OSError, ValueError, KeyError):
+        _static_build_manifest['mtime'] = 0
+        _static_build_manifest['paths'] = {}
+
+    return _static_build_manifest['paths']
+
+
+def get_directories_in_tethys_apps(directory_names, with_app_name=False):
     # Assemble a list of tethysapp directories
-    tethysapp_contents = os.listdir(tethysapp_dir)
     tethysapp_match_dirs = []
 
-    for item in tethysapp_contents:
-        item_path = safe_join(tethysapp_dir, item)
-
+    for item, item_path in get_installed_tethys_apps().items():
         # Check each directory combination
         for directory_name in directory_names:
-            # Only check directories
-            if os.path.isdir(item_path):
-                match_dir = safe_join(item_path, directory_name)
+            match_dir = safe_join(item_path, directory_name)
 
-                if match_dir not in tethysapp_match_dirs and os.path.isdir(match_dir):
-                    if not with_app_name:
-                        tethysapp_match_dirs.append(match_dir)
-                    else:
-                        tethysapp_match_dirs.append((item, match_dir))
+            if match_dir not in tethysapp_match_dirs and os.path.isdir(match_dir):
+                if not with_app_name:
+                    tethysapp_match_dirs.append(match_dir)
+                else:
+                    tethysapp_match_dirs.append((item, match_dir))
 
     return tethysapp_match_dirs
 
 
-def tethys_apps_template_loader(template_name, template_dirs=None):
+class TethysAppsTemplateLoader(BaseLoader):
     """
-    Custom Django template loader for tethys apps
+    Custom Django template loader for tethys apps. The templates of all apps are indexed by name on first use and their
+    source is kept in a bounded least recently used cache (TETHYS_APPS_TEMPLATE_CACHE_SIZE entries, 256 by default).
+    When DEBUG is True, cached sources are checked against the modification time of the file and the index is rebuilt
+    when a template cannot be found.
     """
-    # Search for the template in the list of template directories
-    tethysapp_template_dirs = get_directories_in_tethys_apps(('templates',))
+    is_usable = True
+
+    def __init__(self, *args, **kwargs):
+        super(TethysAppsTemplateLoader, self).__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._template_index = None
+        self._sources = OrderedDict()
+
+    def get_template_index(self, rebuild=False):
+        """
+        Returns a dictionary mapping template names to the absolute path of the template file. The template found in
+        the first app wins if more than one app provides a template with the same name.
+        """
+        template_index = self._template_index
+
+        if template_index is None or rebuild:
+            template_index = dict()
 
-    template = None
+            for template_dir in get_directories_in_tethys_apps(('templates',)):
+                for root, dirs, files in os.walk(template_dir, followlinks=True):
+                    for filename in files:
+                        template_path = os.path.join(root, filename)
+                        template_name = os.path.relpath(template_path, template_dir).replace(os.sep, '/')
+                        template_index.setdefault(template_name, template_path)
 
-    for template_dir in tethysapp_template_dirs:
-        template_path = safe_join(template_dir, template_name)
+            self._template_index = template_index
+
+        return template_index
+
+    def load_template_source(self, template_name, template_dirs=None):
+        template_path = self.get_template_index().get(template_name)
+
+        # New templates may have been added during development
+        if template_path is None and settings.DEBUG:
+            template_path = self.get_template_index(rebuild=True).get(template_name)
+
+        if template_path is None:
+            raise TemplateDoesNotExist(template_name)
 
         try:
-            template = open(template_path).read(), template_name
-            break
-        except IOError:
-            pass
+            mtime = os.path.getmtime(template_path) if settings.DEBUG else None
+
+            with self._lock:
+                cached = self._sources.pop(template_name, None)
+
+                if cached is not None and cached[0] == mtime:
+                    self._sources[template_name] = cached
+                    return cached[1], template_name
+
+            with io.open(template_path, encoding=settings.FILE_CHARSET) as template_file:
+                source = template_file.read()
+
+        except (IOError, OSError):
+            raise TemplateDoesNotExist(template_name)
+
+        with self._lock:
+            self._sources[template_name] = (mtime, source)
+
+            while len(self._sources) > getattr(settings, 'TETHYS_APPS_TEMPLATE_CACHE_SIZE', 256):
+                self._sources.popitem(last=False)
+
+        return source, template_name
+
+    def reset(self):
+        """
+        Empty the template index and the source cache.
+        """
+        with self._lock:
+            self._template_index = None
+            self._sources.clear()
+
+
+@receiver(apps_reharvested)
+def reset_template_loaders(sender, **kwargs):
+    """
+    Empty the template caches of the Tethys apps template loaders, including those wrapped by the cached loader.
+    """
+    _template_loader.reset()
+
+    for template_loader in loader.template_source_loaders or ():
+        wrapped_loaders = getattr(template_loader, 'loaders', ())
+
+        if isinstance(template_loader, TethysAppsTemplateLoader):
+            template_loader.reset()
+
+        elif any(isinstance(wrapped_loader, TethysAppsTemplateLoader) for wrapped_loader in wrapped_loaders):
+            for wrapped_loader in wrapped_loaders:
+                if isinstance(wrapped_loader, TethysAppsTemplateLoader):
+                    wrapped_loader.reset()
+
+            template_loader.reset()
 
-    # If the template is still None, raise the exception
-    if not template:
-        raise TemplateDoesNotExist(template_name)
 
-    return template
+# Loader instance used by the function loader
+_template_loader = TethysAppsTemplateLoader()
+
+
+def tethys_apps_template_loader(template_name, template_dirs=None):
+    """
+    Custom Django template loader for tethys apps. Deprecated, use TethysAppsTemplateLoader.
+    """
+    return _template_loader.load_template_source(template_name, template_dirs)
 
 
 # This loader is always usable
@@ -108,48 +424,181 @@ class TethysAppsStaticFinder(BaseFinder):
     """
     A static files finder that looks in each app in the tethysapp directory for static files.
     This finder search for static files in a directory called 'public' or 'static'.
+
+    All static files are indexed when the finder is created and the index is only rebuilt when the modification time
+    of one of the directories changes. When DEBUG is True, the directories are checked at most once every
+    STALENESS_CHECK_INTERVAL seconds. Set TETHYS_APPS_STATIC_MANIFEST to the path of a JSON file to keep the index
+    between processes.
     """
 
+    # Seconds between checks of the indexed directories for changes when DEBUG is True
+    STALENESS_CHECK_INTERVAL = 1
+
     def __init__(self, apps=None, *args, **kwargs):
+        self._lock = threading.Lock()
+        self._next_staleness_check = 0
+
+        # Maps dir paths to their modification time when the index was built
+        self.directory_mtimes = dict()
+
+        # Maps prefixed paths (e.g.: "my_app/js/main.js") to the absolute paths of the matching files
+        self.index = dict()
+
+        # Maps location roots to the paths of their files relative to the root
+        self.location_files = dict()
+
         # List of locations with static files
-        self.locations = get_directories_in_tethys_apps(('static', 'public'), with_app_name=True)
+        self.locations = []
+
+        if not self._load_manifest():
+            self._scan()
+            self._save_manifest()
+
+        super(TethysAppsStaticFinder, self).__init__(*args, **kwargs)
+
+    def _scan(self):
+        """
+        Index the files in the Tethys apps static and public directories.
+        """
+        tethysapp_dir = safe_join(os.path.abspath(os.path.dirname(__file__)), 'tethysapp')
+        locations = get_directories_in_tethys_apps(('static', 'public'), with_app_name=True)
+        directory_mtimes = {tethysapp_dir: os.path.getmtime(tethysapp_dir)}
+        location_files = dict()
+        index = dict()
+
+        for prefix, root in locations:
+            app_dir = os.path.dirname(root)
+            directory_mtimes[app_dir] = os.path.getmtime(app_dir)
+            files = location_files.setdefault(root, [])
+
+            for directory, dirs, filenames in os.walk(root, followlinks=True):
+                directory_mtimes[directory] = os.path.getmtime(directory)
+
+                for filename in filenames:
+                    absolute_path = os.path.join(directory, filename)
+                    relative_path = os.path.relpath(absolute_path, root)
+                    files.append(relative_path)
+
+                    prefixed_path = '/'.join((prefix, relative_path.replace(os.sep, '/')))
+                    index.setdefault(prefixed_path, []).append(absolute_path)
 
+        self._set_index(locations, directory_mtimes, location_files, index)
+
+    def _set_index(self, locations, directory_mtimes, location_files, index):
+        """
+        Replace the index and the storages of the finder.
+        """
         # Maps dir paths to an appropriate storage instance
-        self.storages = SortedDict()
+        storages = SortedDict()
 
-        for prefix, root in self.locations:
+        for prefix, root in locations:
             filesystem_storage = FileSystemStorage(location=root)
             filesystem_storage.prefix = prefix
-            self.storages[root] = filesystem_storage
+            storages[root] = filesystem_storage
 
-        super(TethysAppsStaticFinder, self).__init__(*args, **kwargs)
+        self.locations = locations
+        self.storages = storages
+        self.directory_mtimes = directory_mtimes
+        self.location_files = location_files
+        self.index = index
+
+    def _is_stale(self, directory_mtimes=None):
+        """
+        Check whether any of the indexed directories has changed.
+        """
+        for directory, mtime in (directory_mtimes or self.directory_mtimes).items():
+            try:
+                if os.path.getmtime(directory) != mtime:
+                    return True
+            except OSError:
+                return True
+
+        return False
+
+    def _load_manifest(self):
+        """
+        Load the index from the manifest file if it is configured and up to date. Returns True if it was loaded.
+        """
+        manifest_path = getattr(settings, 'TETHYS_APPS_STATIC_MANIFEST', None)
+
+        if not manifest_path or not os.path.isfile(manifest_path):
+            return False
+
+        try:
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+
+            if self._is_stale(manifest['directories']):
+                return False
+
+            self._set_index([tuple(location) for location in manifest['locations']],
+                            manifest['directories'],
+                            manifest['files'],
+                            manifest['index'])
+        except (IOError, ValueError, KeyError):
+            return False
+
+        return True
+
+    def _save_manifest(self):
+        """
+        Write the index to the manifest file if it is configured. Failing to write it is reported, not raised.
+        """
+        manifest_path = getattr(settings, 'TETHYS_APPS_STATIC_MANIFEST', None)
+
+        if not manifest_path:
+            return
+
+        manifest = {'locations': self.locations,
+                    'directories': self.directory_mtimes,
+                    'files': self.location_files,
+                    'index': self.index}
+
+        # Write to a temporary file first so that other processes never read a partial manifest
+        temporary_path = '{0}.{1}.tmp'.format(manifest_path, os.getpid())
+
+        # The manifest is only an optimization, the finder scans the directories without it
+        try:
+            with open(temporary_path, 'w') as manifest_file:
+                json.dump(manifest, manifest_file)
+
+            os.rename(temporary_path, manifest_path)
+        except (IOError, OSError) as e:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+            print('{0}WARNING:{1} Could not write the static files manifest "{2}": {3}'.format(
+                TerminalColors.WARNING, TerminalColors.ENDC, manifest_path, e))
+
+    def refresh(self, force=False):
+        """
+        Rebuild the index if any of the indexed directories has changed or if forced.
+        """
+        if force or self._is_stale():
+            with self._lock:
+                if force or self._is_stale():
+                    self._scan()
+                    self._save_manifest()
 
     def find(self, path, all=False):
         """
         Looks for files in the Tethys apps static or public directories
         """
-        matches = []
-        for prefix, root in self.locations:
-            matched_path = self.find_location(root, path, prefix)
-            if matched_path:
-                if not all:
-                    return matched_path
-                matches.append(matched_path)
-        return matches
-
-    def find_location(self, root, path, prefix=None):
-        """
-        Finds a requested static file in a location, returning the found
-        absolute path (or ``None`` if no match).
-        """
-        if prefix:
-            prefix = '%s%s' % (prefix, os.sep)
-            if not path.startswith(prefix):
-                return None
-            path = path[len(prefix):]
-        path = safe_join(root, path)
-        if os.path.exists(path):
-            return path
+        # Files may be added or removed while the development server is running. Each check stats every indexed
+        # directory, so a page requesting many files only checks once.
+        if settings.DEBUG:
+            now = time.time()
+
+            if now >= self._next_staleness_check:
+                self._next_staleness_check = now + self.STALENESS_CHECK_INTERVAL
+                self.refresh()
+
+        matches = self.index.get(path.replace(os.sep, '/'), [])
+
+        if not all:
+            return matches[0] if matches else []
+
+        return list(matches)
 
     def list(self, ignore_patterns):
         """
@@ -157,5 +606,21 @@ class TethysAppsStaticFinder(BaseFinder):
         """
         for prefix, root in self.locations:
             storage = self.storages[root]
-            for path in utils.get_files(storage, ignore_patterns):
-                yield path, storage
\ No newline at end of file
+
+            for path in self.location_files.get(root, ()):
+                # Ignore the file if its name or the name of any of its directories matches
+                if ignore_patterns and any(utils.matches_patterns(part, ignore_patterns)
+                                           for part in path.split(os.sep)):
+                    continue
+
+                yield path, storage
+
+
+@receiver(apps_reharvested)
+def refresh_static_finders(sender, **kwargs):
+    """
+    Rebuild the index of the Tethys apps static files finders, files of reharvested apps may have changed in place.
+    """
+    for finder in get_finders():
+        if isinstance(finder, TethysAppsStaticFinder):
+            finder.refresh(force=True)
@@ -1,16 +1,132 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.template.loaders.app_directories import calculate_app_template_dirs
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.encoding import force_bytes
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
 
 from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.utilities import get_static_build_root, STATIC_BUILD_MANIFEST_NAME
+
+# Hash of the template files, computed once per process
+_templates_version = None
+
+
+def get_permissions_key(request):
+    """
+    Returns a key that is the same for all users with the same permissions.
+    """
+    user = getattr(request, 'user', None)
+
+    if user is None or not user.is_authenticated():
+        return 'anonymous'
+
+    if user.is_superuser:
+        return 'superuser'
+
+    return hashlib.sha1(force_bytes(','.join(sorted(user.get_all_permissions())))).hexdigest()
+
+
+def get_templates_version():
+    """
+    Returns a hash of the location, size and modification time of the project and app template files and of the
+    static build manifest. Computed once per process, or on each call when DEBUG is True.
+    """
+    global _templates_version
+
+    if _templates_version is None or settings.DEBUG:
+        version = hashlib.sha1()
+        manifest_path = os.path.join(get_static_build_root() or '', STATIC_BUILD_MANIFEST_NAME)
+
+        for template_dir in tuple(settings.TEMPLATE_DIRS) + calculate_app_template_dirs():
+            for root, dirs, files in os.walk(template_dir, followlinks=True):
+                dirs.sort()
+
+                for filename in sorted(files):
+                    template_path = os.path.join(root, filename)
+                    template_stat = os.stat(template_path)
+                    version.update(force_bytes('{0}:{1}:{2}\n'.format(template_path, template_stat.st_size,
+                                                                       template_stat.st_mtime)))
+
+        if os.path.isfile(manifest_path):
+            version.update(force_bytes('{0}:{1}\n'.format(manifest_path, os.path.getmtime(manifest_path))))
+
+        _templates_version = version.hexdigest()
+
+    return _templates_version
 
 
+def get_library_version():
+    """
+    Returns the version of the library page: the harvested apps, the templates, the static url and the deploy version
+    set with TETHYS_APPS_LIBRARY_VERSION (e.g.: the release of the project).
+    """
+    return hashlib.sha1(force_bytes(':'.join((SingletonAppHarvester().version or '',
+                                              get_templates_version(),
+                                              settings.STATIC_URL or '',
+                                              str(getattr(settings, 'TETHYS_APPS_LIBRARY_VERSION', '')))))).hexdigest()
+
+
+def get_library_etag(request):
+    """
+    Returns the ETag of the library page for the request given. The page changes with the version of the library (see
+    get_library_version), the user, the CSRF token and the language. Returns None for pages that show messages, which
+    are never the same twice.
+    """
+    messages = getattr(request, '_messages', None)
+
+    if messages is not None and len(messages):
+        return None
+
+    user = getattr(request, 'user', None)
+    user_key = str(user.pk) if user is not None and user.is_authenticated() else 'anonymous'
+
+    return hashlib.sha1(force_bytes(':'.join((get_library_version(),
+                                              user_key,
+                                              request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+                                              get_language() or '')))).hexdigest()
+
+
+def get_app_list(request, apps, version):
+    """
+    Returns the rendered list of apps of the library page. The list is cached in the cache named by
+    TETHYS_APPS_LIBRARY_CACHE ("default") per version of the library and user permissions.
+    """
+    cache = caches[getattr(settings, 'TETHYS_APPS_LIBRARY_CACHE', DEFAULT_CACHE_ALIAS)]
+    cache_key = ':'.join(('tethys_apps', 'library', version, get_permissions_key(request)))
+    app_list = cache.get(cache_key)
+
+    if app_list is None:
+        app_list = render_to_string('tethys_apps/app_list.html', {'apps': apps})
+        cache.set(cache_key, app_list)
+
+    return mark_safe(app_list)
+
+
+@condition(etag_func=get_library_etag)
 def library(request):
     """
     Handle the library view
     """
     # Retrieve the app harvester
     harvester = SingletonAppHarvester()
+    apps = harvester.apps
 
     # Define the context object
-    context = {'apps': harvester.apps}
+    context = {'apps': apps,
+               'app_list': get_app_list(request, apps, get_library_version()) if apps else ''}
+
+    response = render(request, 'tethys_apps/app_library.html', context)
+
+    # Browsers revalidate the page with its ETag on each visit
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
 
-    return render(request, 'tethys_apps/app_library.html', context)
+    return response
@@ -0,0 +1,158 @@
+import os
+import time
+from multiprocessing.pool import ThreadPool
+
+from django.template.loader import get_template
+
+from tethys_apps.app_harvester import SingletonAppHarvester
+from tethys_apps.base.persistent_store import PersistentStoreEngineRegistry
+from tethys_apps.utilities import _template_loader
+
+# Extensions of the app templates that are parsed
+TEMPLATE_EXTENSIONS = ('.html',)
+
+
+class AppWarmupTask(object):
+    """
+    Warm-up counts, timing and errors of one app.
+    """
+
+    def __init__(self, app):
+        """
+        Constructor
+        """
+        self.app = app
+        self.controllers = 0
+        self.templates = 0
+        self.engines = 0
+        self.controller_time = 0
+        self.template_time = 0
+        self.engine_time = 0
+        self.errors = []
+
+    @property
+    def total_time(self):
+        return self.controller_time + self.template_time + self.engine_time
+
+
+def warm_up_apps(app_package=None, jobs=4, engines=True):
+    """
+    Import the controllers, parse the templates and create the persistent store engines of the harvested apps in the
+    calling process. Call it from the wsgi.py module of the project so that each server process loads the apps before
+    its first request rather than during it::
+
+        from tethys_apps.warmup import warm_up_apps
+
+        application = get_wsgi_application()
+        warm_up_apps()
+
+    Pass engines=False if the application server imports wsgi.py before forking its workers (e.g.: gunicorn
+    --preload). Workers discard the engines inherited from the parent process.
+
+    Args:
+      app_package(string, optional): Package name of the app to warm up. Defaults to all apps.
+      jobs(int): Number of apps to warm up in parallel.
+      engines(bool): Create the persistent store engines and open a pooled connection to each.
+
+    Returns:
+      list: An AppWarmupTask with the counts, timing and errors of each app.
+    """
+    apps = [app for app in SingletonAppHarvester().apps if not app_package or app.package == app_package]
+    tasks = [AppWarmupTask(app) for app in apps]
+    jobs = min(jobs or 1, len(tasks))
+
+    def warm_up_app(task):
+        warm_up_controllers(task)
+        warm_up_templates(task)
+
+        if engines:
+            warm_up_engines(task)
+
+    if jobs < 2:
+        for task in tasks:
+            warm_up_app(task)
+    else:
+        pool = ThreadPool(jobs)
+
+        try:
+            pool.map(warm_up_app, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    return tasks
+
+
+def warm_up_controllers(task):
+    """
+    Import the controller of each url map of the app.
+    """
+    app = task.app
+    start = time.time()
+
+    if hasattr(app, 'url_maps'):
+        url_maps = app.url_maps()
+    elif hasattr(app, 'controllers'):
+        url_maps = app.controllers()
+    else:
+        url_maps = None
+
+    for url_map in url_maps or ():
+        try:
+            url_map.view.resolve()
+            task.controllers += 1
+        except Exception as e:
+            task.errors.append(str(e))
+
+    task.controller_time = time.time() - start
+
+
+def warm_up_templates(task):
+    """
+    Parse the templates of the app through the configured template loaders, which caches their source.
+    """
+    start = time.time()
+    package_dir = SingletonAppHarvester().package_dirs.get(task.app.package)
+
+    if package_dir:
+        templates_dir = os.path.join(os.path.realpath(package_dir), 'templates') + os.sep
+
+        for template_name, template_path in sorted(_template_loader.get_template_index().items()):
+            if not template_name.endswith(TEMPLATE_EXTENSIONS) or \
+                    not os.path.realpath(template_path).startswith(templates_dir):
+                continue
+
+            try:
+                get_template(template_name)
+                task.templates += 1
+            except Exception as e:
+                task.errors.append('Template "{0}": {1}'.format(template_name, e))
+
+    task.template_time = time.time() - start
+
+
+def warm_up_engines(task):
+    """
+    Create the engine of each persistent store of the app and open a pooled connection.
+    """
+    app = task.app
+    start = time.time()
+    registry = PersistentStoreEngineRegistry()
+
+    for persistent_store in app.persistent_stores() or ():
+        try:
+            engine = registry.get_engine(app.package, persistent_store.name)
+
+            if engine is None:
+                task.errors.append('Persistent store "{0}" does not exist. Run "tethys syncstores {1}".'.format(
+                    persistent_store.name, app.package))
+                continue
+
+            # Return the connection to the pool for the first request to use
+            engine.connect().close()
+            task.engines += 1
+
+        except Exception as e:
+            task.errors.append('Persistent store "{0}": {1}'.format(persistent_store.name, e))
+
+    task.engine_time = time.time() - start